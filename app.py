@@ -10,13 +10,47 @@ sys.path.append(os.path.dirname(__file__))
 
 from utils.sample_data import get_sample_dataset, get_dataset_description
 from utils.data_processor import DataProcessor
-from utils.forecasting import ForecastingEngine
+from utils.forecasting import ForecastingEngine, COMPARISON_METHODS
 from utils.visualizations import DashboardVisualizations
 from utils.scenario_modeling import ScenarioModeler
 from utils.database import init_db
 from utils.data_storage import DataStorage
-
-init_db()
+from utils.dataset_cache import DatasetCache
+from utils.forecast_cache import ForecastCache
+from utils.incremental import ModelStateStore
+from utils.job_queue import ForecastJobQueue
+from utils.resampling import resample_frame, future_dates
+
+@st.cache_resource
+def setup_database():
+    init_db()
+    return True
+
+@st.cache_resource
+def get_storage():
+    return DataStorage(cache=DatasetCache())
+
+@st.cache_resource
+def get_forecast_cache():
+    return ForecastCache(get_storage())
+
+@st.cache_resource
+def get_model_states():
+    return ModelStateStore(get_storage())
+
+@st.cache_resource
+def get_job_queue():
+    return ForecastJobQueue(get_storage(), ForecastingEngine(cache=get_forecast_cache(), states=get_model_states()))
+
+def get_precomputed(analysis_type):
+    # Results written by the precompute scheduler, only while they match the saved dataset
+    dataset_id = st.session_state.get('current_dataset_id')
+    if dataset_id is None:
+        return None
+    storage = get_storage()
+    return storage.get_analytics_result(dataset_id, analysis_type, storage.get_dataset_hash(dataset_id))
+
+setup_database()
 
 st.set_page_config(
     page_title="Executive Business Performance Dashboard",
@@ -286,6 +320,7 @@ def show_home_page():
         if st.button("Load Demo Data", key="load_demo"):
             st.session_state.data = get_sample_dataset(selected_demo)
             st.session_state.data_source = f"Demo: {selected_demo}"
+            st.session_state.current_dataset_id = None
             st.toast(f"✅ Successfully loaded {selected_demo} dataset with {len(st.session_state.data):,} records!", icon="✅")
             st.success(f"✅ Loaded {selected_demo} dataset with {len(st.session_state.data)} records!")
             st.rerun()
@@ -364,6 +399,7 @@ def show_home_page():
                 if st.button("Use This Data", key="use_upload"):
                     st.session_state.data = data
                     st.session_state.data_source = f"Uploaded: {uploaded_file.name}"
+                    st.session_state.current_dataset_id = None
                     st.session_state.validation_report = validation_report
                     st.toast(f"✅ Successfully loaded {uploaded_file.name} with {len(data):,} records!", icon="✅")
                     st.success("✅ Data loaded successfully!")
@@ -447,15 +483,22 @@ def show_executive_overview():
         if 'id' not in col.lower():
             kpi_cols.append(col)
     
+    precomputed = get_precomputed('kpi_snapshot') if date_col else None
+    snapshot = (precomputed['data'] or {}).get(date_range, {}) if precomputed else {}
+    
     cols = st.columns(len(kpi_cols) if kpi_cols else 1)
     
     for idx, col in enumerate(kpi_cols):
         with cols[idx]:
-            current_value = df_filtered[col].iloc[-1] if len(df_filtered) > 0 else 0
-            previous_value = df_filtered[col].iloc[0] if len(df_filtered) > 1 else current_value
-            
-            change = current_value - previous_value
-            change_pct = (change / previous_value * 100) if previous_value != 0 else 0
+            if col in snapshot:
+                current_value = snapshot[col]['current']
+                change_pct = snapshot[col]['change_pct']
+            else:
+                current_value = df_filtered[col].iloc[-1] if len(df_filtered) > 0 else 0
+                previous_value = df_filtered[col].iloc[0] if len(df_filtered) > 1 else current_value
+                
+                change = current_value - previous_value
+                change_pct = (change / previous_value * 100) if previous_value != 0 else 0
             
             st.metric(
                 label=col.replace('_', ' ').title(),
@@ -463,6 +506,9 @@ def show_executive_overview():
                 delta=f"{change_pct:+.1f}%"
             )
     
+    if snapshot:
+        st.caption(f"Precomputed KPI snapshot · computed at {precomputed['parameters'].get('computed_at', '')[:16].replace('T', ' ')} UTC")
+    
     st.markdown("---")
     
     viz = DashboardVisualizations()
@@ -715,6 +761,240 @@ def show_analytics_page():
     if summary and 'numeric' in summary:
         st.dataframe(summary['numeric'], use_container_width=True)
 
+@st.fragment(run_every=1)
+def poll_job(job_id):
+    queue = get_job_queue()
+    job = queue.status(job_id)
+    if job is None or job['finished']:
+        # Rerun the whole page so it renders the result
+        st.rerun()
+    
+    st.progress(min(job['progress'], 1.0), text=f"⏳ {job['message']} · {job['elapsed']:.1f}s")
+    if st.button("Cancel", key=f"cancel_job_{job_id}"):
+        queue.cancel(job_id)
+        # Other requesters may keep a shared job running; this session stops following it either way
+        for key in ('forecast_job', 'comparison_job', 'grouped_job'):
+            if (st.session_state.get(key) or {}).get('id') == job_id:
+                st.session_state[key]['cancelled'] = True
+        st.rerun()
+
+def render_forecast_result(forecast_result, df, date_col, metric_to_forecast, forecast_periods, viz):
+    st.success(f"✅ Forecast generated using {forecast_result['method']}")
+    if forecast_result.get('computed_at'):
+        st.caption(f"Precomputed forecast · computed at {forecast_result['computed_at'][:16].replace('T', ' ')} UTC")
+    if forecast_result.get('model_update') == 'incremental':
+        st.caption(f"Updated the stored model with {forecast_result['new_observations']} new observation(s) instead of refitting.")
+    elif forecast_result.get('model_update') == 'refit':
+        st.caption(f"Model fully refitted ({forecast_result['refit_reason'].replace('_', ' ')}).")
+    elif forecast_result.get('model_update') == 'warm_start':
+        st.caption("Model refitted starting from the stored fit's parameters (warm start).")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("Confidence Level", forecast_result['confidence'])
+    
+    with col2:
+        if 'trend' in forecast_result:
+            st.metric("Trend Direction", forecast_result['trend'])
+    
+    with col3:
+        if 'r2_score' in forecast_result:
+            st.metric("Model Accuracy (R²)", f"{forecast_result['r2_score']:.2f}")
+    
+    st.markdown("### 📊 Forecast Visualization")
+    
+    df_sorted = df.sort_values(date_col)
+    if forecast_result.get('historical_dates'):
+        # The history the model saw, after duplicate dates were aggregated
+        recent_data = forecast_result['historical_data']
+        recent_dates = forecast_result['historical_dates']
+    else:
+        recent_data = df_sorted[metric_to_forecast].tail(90).values
+        recent_dates = df_sorted[date_col].tail(90).values
+    
+    if 'forecast_dates' in forecast_result:
+        forecast_dates = forecast_result['forecast_dates']
+    else:
+        last_date = pd.to_datetime(df_sorted[date_col].iloc[-1])
+        forecast_dates = future_dates(last_date, forecast_periods, forecast_result.get('frequency'))
+    
+    lower_bound = forecast_result.get('lower_bound')
+    upper_bound = forecast_result.get('upper_bound')
+    
+    fig = viz.create_forecast_chart(
+        recent_data,
+        forecast_result['forecast'],
+        recent_dates,
+        forecast_dates,
+        f"{metric_to_forecast} Forecast",
+        lower_bound,
+        upper_bound
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    
+    if forecast_result.get('has_confidence_interval'):
+        st.info("📊 The shaded area represents the confidence interval for the forecast.")
+    
+    if 'fit_time' in forecast_result:
+        st.caption(f"⏱️ Prophet fit in {forecast_result['fit_time']:.2f}s"
+                   + (f" on {forecast_result['fit_frequency']} periods" if forecast_result.get('fit_frequency') else ""))
+    
+    if 'search_time' in forecast_result:
+        st.caption(f"🔎 Auto ARIMA picked order {forecast_result['order']} by {forecast_result['criterion'].upper()} "
+                   f"after evaluating {forecast_result['candidates_evaluated']} candidates in {forecast_result['search_time']:.1f}s")
+    
+    st.markdown("### 📊 Forecast Details")
+    forecast_df = pd.DataFrame({
+        'Date': forecast_dates[:len(forecast_result['forecast'])],
+        'Forecasted Value': forecast_result['forecast']
+    })
+    st.dataframe(forecast_df, use_container_width=True, hide_index=True)
+
+def render_comparison_results(comparison_results, backtest_records, df, date_col, comparison_metric, comparison_periods, viz,
+                              ensemble=None):
+    st.success(f"✅ Generated {len(comparison_results)} forecast models")
+    
+    model_metrics = []
+    for method, result in comparison_results.items():
+        model_metrics.append({
+            'Model': result['method'],
+            'Confidence': result['confidence'],
+            'R² Score': result.get('r2_score', 'N/A'),
+            'Has CI': '✓' if result.get('has_confidence_interval') else '✗'
+        })
+        if ensemble is not None:
+            model_metrics[-1]['Ensemble Weight'] = f"{ensemble['weights'].get(method, 0.0):.0%}"
+    
+    metrics_df = pd.DataFrame(model_metrics)
+    st.dataframe(metrics_df, use_container_width=True, hide_index=True)
+    
+    if backtest_records is not None:
+        backtest_df = pd.DataFrame(backtest_records)
+        if not backtest_df.empty:
+            st.markdown("#### 🎯 Out-of-Sample Accuracy")
+            st.caption("Average error when each model forecasts held-out history from several rolling cutoffs (lower is better)")
+            st.dataframe(backtest_df.rename(columns={
+                'method': 'Model',
+                'mae': 'MAE',
+                'mape': 'MAPE (%)',
+                'rmse': 'RMSE',
+                'coverage': 'Interval Coverage',
+                'cutoffs': 'Cutoffs'
+            }).round(3), use_container_width=True, hide_index=True)
+        else:
+            st.info("Not enough history to backtest these models over the selected horizon.")
+    
+    df_sorted = df.sort_values(date_col)
+    history = next((result for result in comparison_results.values() if result.get('historical_dates')), None)
+    if history is not None:
+        recent_data = history['historical_data'][-60:]
+        recent_dates = history['historical_dates'][-60:]
+    else:
+        recent_data = df_sorted[comparison_metric].tail(60).values
+        recent_dates = df_sorted[date_col].tail(60).values
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatter(
+        x=recent_dates,
+        y=recent_data,
+        name='Historical',
+        line=dict(color=viz.color_scheme['primary'], width=2),
+        mode='lines'
+    ))
+    
+    colors = [viz.color_scheme['warning'], viz.color_scheme['success'], 
+             viz.color_scheme['info'], viz.color_scheme['danger']]
+    
+    for i, (method, result) in enumerate(comparison_results.items()):
+        forecast_dates = result.get('forecast_dates', [])
+        if not forecast_dates:
+            last_date = pd.to_datetime(df_sorted[date_col].iloc[-1])
+            forecast_dates = future_dates(last_date, comparison_periods, result.get('frequency'))
+        
+        fig.add_trace(go.Scatter(
+            x=forecast_dates,
+            y=result['forecast'],
+            name=result['method'],
+            line=dict(color=colors[i % len(colors)], width=2, dash='dash'),
+            mode='lines'
+        ))
+    
+    if ensemble is not None:
+        ensemble_dates = ensemble.get('forecast_dates') or future_dates(
+            pd.to_datetime(df_sorted[date_col].iloc[-1]), len(ensemble['forecast']), ensemble.get('frequency'))
+        if ensemble.get('lower_bound'):
+            fig.add_trace(go.Scatter(
+                x=list(ensemble_dates) + list(ensemble_dates)[::-1],
+                y=list(ensemble['upper_bound']) + list(ensemble['lower_bound'])[::-1],
+                fill='toself',
+                fillcolor='rgba(15, 32, 39, 0.12)',
+                line=dict(width=0),
+                name='Ensemble Interval',
+                hoverinfo='skip'
+            ))
+        fig.add_trace(go.Scatter(
+            x=ensemble_dates,
+            y=ensemble['forecast'],
+            name='Ensemble',
+            line=dict(color=viz.color_scheme['secondary'], width=3),
+            mode='lines'
+        ))
+    
+    fig.update_layout(
+        title=f"{comparison_metric} - Model Comparison",
+        template='plotly_white',
+        hovermode='x unified',
+        height=500,
+        margin=dict(l=20, r=20, t=40, b=20),
+        legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1)
+    )
+    
+    st.plotly_chart(fig, use_container_width=True)
+    
+    if ensemble is not None:
+        st.caption("The ensemble line weights each model by the inverse of its backtest MAE, "
+                   "so models that forecast held-out history better count for more.")
+
+def render_grouped_result(grouped_result, group_columns, grouped_metric, viz):
+    bottom = grouped_result[grouped_result['level'] == len(group_columns)]
+    total = grouped_result[grouped_result['level'] == 0]
+    
+    st.success(f"✅ Forecast {bottom.groupby(group_columns).ngroups} groups")
+    
+    summary = bottom.groupby(group_columns, as_index=False).agg(
+        Forecast=('forecast', 'sum'),
+        Base=('base_forecast', 'sum'),
+        Model=('method', 'first')
+    ).sort_values('Forecast', ascending=False)
+    st.dataframe(summary, use_container_width=True, hide_index=True)
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=total['date'],
+        y=total['forecast'],
+        name='Total',
+        line=dict(color=viz.color_scheme['primary'], width=3)
+    ))
+    for keys, group in bottom.groupby(group_columns):
+        keys = keys if isinstance(keys, tuple) else (keys,)
+        fig.add_trace(go.Scatter(
+            x=group['date'],
+            y=group['forecast'],
+            name=' / '.join(str(key) for key in keys),
+            stackgroup='groups',
+            mode='none'
+        ))
+    fig.update_layout(
+        title=f"{grouped_metric} by {', '.join(group_columns)}",
+        template='plotly_white',
+        hovermode='x unified',
+        height=500,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
 def show_forecasting_page():
     show_page_header(
         "Forecasting & Predictive Analytics",
@@ -742,7 +1022,7 @@ def show_forecasting_page():
     
     processor = DataProcessor()
     key_metrics = processor.detect_key_metrics(df)
-    forecaster = ForecastingEngine()
+    forecaster = ForecastingEngine(cache=get_forecast_cache(), states=get_model_states())
     viz = DashboardVisualizations()
     
     numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
@@ -768,14 +1048,14 @@ def show_forecasting_page():
         **1. Auto** 🤖
         - **Method**: Automatically selects best algorithm based on data characteristics
         - **When to Use**: Not sure which method to choose
-        - **Backend**: Tries multiple methods and selects highest confidence
+        - **Backend**: Backtests fast models over rolling cutoffs and picks the lowest out-of-sample error
 
         **2. Linear Regression** 📈
         - **Formula**: y = mx + b (where m is slope, b is intercept)
         - **Method**: Fits a straight line through data points using Ordinary Least Squares (OLS)
         - **Best For**: Data with consistent linear trends
-        - **Library**: scikit-learn `LinearRegression`
-        - **Output**: Includes R² score (model fit quality, 0-1 scale)
+        - **Library**: Closed-form least squares in NumPy, batched across metrics
+        - **Output**: Includes R² score (model fit quality, 0-1 scale) and a 95% prediction interval
 
         **3. Prophet (Facebook)** 🔮
         - **Method**: Additive model: y(t) = g(t) + s(t) + h(t) + εₜ
@@ -795,12 +1075,14 @@ def show_forecasting_page():
           - q: Moving average order
         - **Best For**: Stationary time series with temporal dependencies
         - **Library**: statsmodels `ARIMA`
+        - **Auto ARIMA**: Chooses d with a unit-root test, then runs a stepwise search over (p, q) that
+          fits neighbouring candidates in parallel and keeps the lowest AIC
 
         **5. Polynomial** 🌊
         - **Formula**: y = a₀ + a₁x + a₂x² + a₃x³ + ...
         - **Method**: Fits curved line using polynomial regression (degree 2-3)
         - **Best For**: Data with non-linear patterns or curves
-        - **Library**: NumPy `polyfit` + scikit-learn
+        - **Library**: Closed-form least squares in NumPy, batched across metrics
 
         **6. Moving Average** 📉
         - **Formula**: MA(t) = (xₜ + xₜ₋₁ + ... + xₜ₋ₙ₊₁) / n
@@ -812,7 +1094,12 @@ def show_forecasting_page():
         - **Formula**: Sₜ = αxₜ + (1-α)Sₜ₋₁ (where α is smoothing factor)
         - **Method**: Weighted average giving more weight to recent observations
         - **Best For**: Data where recent values are more important
-        - **Library**: statsmodels `SimpleExpSmoothing`
+        - **Library**: SciPy `lfilter` recursive filter, α chosen by one-step-ahead error
+
+        **8. Holt / Holt-Winters** 📆
+        - **Method**: Exponential smoothing with a trend component (Holt) plus additive weekly seasonality (Holt-Winters)
+        - **Best For**: Trending data with repeating weekly patterns
+        - **Parameters**: α, β and γ are grid-searched per series, with analytic prediction intervals
 
         **Confidence Intervals:**
         - Calculated using standard error of predictions
@@ -820,96 +1107,93 @@ def show_forecasting_page():
         - Formula: ŷ ± (1.96 × SE)
         """)
 
-    col1, col2, col3 = st.columns(3)
+    how_map = {
+        "Average": "mean",
+        "Sum": "sum",
+        "Last Value": "last"
+    }
+
+    def metric_aggregation(metric):
+        return how_map[st.session_state.get(f"aggregation_how_{metric}", "Average")]
+
+    col1, col2, col3, col4 = st.columns(4)
 
     with col1:
         metric_to_forecast = st.selectbox("Select Metric to Forecast", numeric_cols)
 
     with col2:
-        forecast_periods = st.slider("Forecast Periods (days)", 7, 90, 30)
+        forecast_periods = st.slider("Forecast Periods", 7, 90, 30, help="Steps ahead at the frequency the series is aggregated to")
+
+    with col4:
+        aggregation = st.selectbox("Aggregate To", ["Auto", "Daily", "Weekly", "Monthly", "Quarterly"],
+                                   help="Auto keeps the data's own frequency.")
+        # Remembered per metric: flows such as sales are summed, stocks such as active users are not
+        st.selectbox("Combine Rows By", list(how_map), key=f"aggregation_how_{metric_to_forecast}",
+                     help="How rows sharing a period are combined. Sum suits flows like sales or signups; "
+                          "average or last value suits counts of users or customers, rates and prices.")
 
     with col3:
-        forecast_method = st.selectbox("Forecast Method", ["Auto", "Linear Regression", "Prophet (Facebook)", "ARIMA", "Polynomial", "Moving Average", "Exponential Smoothing"])
+        forecast_method = st.selectbox("Forecast Method", ["Auto", "Linear Regression", "Prophet (Facebook)", "ARIMA", "Auto ARIMA", "Polynomial", "Moving Average", "Exponential Smoothing", "Holt (Trend)", "Holt-Winters (Seasonal)"])
     
     method_map = {
         "Auto": "auto",
         "Linear Regression": "linear",
         "Prophet (Facebook)": "prophet",
         "ARIMA": "arima",
+        "Auto ARIMA": "auto_arima",
         "Polynomial": "polynomial",
         "Moving Average": "moving_average",
-        "Exponential Smoothing": "exponential"
+        "Exponential Smoothing": "exponential",
+        "Holt (Trend)": "holt",
+        "Holt-Winters (Seasonal)": "holt_winters"
     }
     
-    df_sorted = df.sort_values(date_col)
-    data_length = len(df_sorted[metric_to_forecast].dropna())
+    freq_map = {
+        "Auto": "auto",
+        "Daily": "D",
+        "Weekly": "W",
+        "Monthly": "MS",
+        "Quarterly": "QS"
+    }
+    freq_labels = {'D': 'daily', 'B': 'business-daily', 'W': 'weekly', 'MS': 'monthly', 'ME': 'monthly', 'QS': 'quarterly',
+                   'QE': 'quarterly', 'YS': 'yearly', 'YE': 'yearly', 'h': 'hourly'}
+    
+    # Models fit the compact calendar series: one row per period instead of one per uploaded record
+    forecast_df, forecast_freq = resample_frame(df, [metric_to_forecast], date_col, freq_map[aggregation],
+                                                metric_aggregation(metric_to_forecast))
+    data_length = len(forecast_df[metric_to_forecast].dropna())
+    freq_label = freq_labels.get(forecast_freq.split('-')[0], forecast_freq) if forecast_freq else 'unknown'
     
-    st.info(f"📊 Available data points: {data_length}. Minimum required: 10 for basic forecasts, 15 for polynomial.")
+    st.info(f"📊 Available data points: {data_length} ({freq_label}, from {len(df):,} records). Minimum required: 10 for basic forecasts, 15 for polynomial.")
     
     if st.button("Generate Forecast", type="primary"):
-        with st.spinner("Generating forecast..."):
-            forecast_result = forecaster.forecast_metric(
-                df, 
+        # Fits run on the job queue so the page stays responsive; identical requests share one job
+        st.session_state.forecast_job = {
+            'id': get_job_queue().submit_forecast(
+                forecast_df, 
                 metric_to_forecast, 
                 date_col, 
                 forecast_periods, 
-                method_map[forecast_method]
-            )
-            
-            if forecast_result:
-                st.success(f"✅ Forecast generated using {forecast_result['method']}")
-                
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.metric("Confidence Level", forecast_result['confidence'])
-                
-                with col2:
-                    if 'trend' in forecast_result:
-                        st.metric("Trend Direction", forecast_result['trend'])
-                
-                with col3:
-                    if 'r2_score' in forecast_result:
-                        st.metric("Model Accuracy (R²)", f"{forecast_result['r2_score']:.2f}")
-                
-                st.markdown("### 📊 Forecast Visualization")
-                
-                df_sorted = df.sort_values(date_col)
-                recent_data = df_sorted[metric_to_forecast].tail(90).values
-                recent_dates = df_sorted[date_col].tail(90).values
-                
-                if 'forecast_dates' in forecast_result:
-                    forecast_dates = forecast_result['forecast_dates']
-                else:
-                    last_date = pd.to_datetime(df_sorted[date_col].iloc[-1])
-                    forecast_dates = pd.date_range(start=last_date, periods=forecast_periods+1, freq='D')[1:]
-                
-                lower_bound = forecast_result.get('lower_bound')
-                upper_bound = forecast_result.get('upper_bound')
-                
-                fig = viz.create_forecast_chart(
-                    recent_data,
-                    forecast_result['forecast'],
-                    recent_dates,
-                    forecast_dates,
-                    f"{metric_to_forecast} Forecast",
-                    lower_bound,
-                    upper_bound
-                )
-                st.plotly_chart(fig, use_container_width=True)
-                
-                if forecast_result.get('has_confidence_interval'):
-                    st.info("📊 The shaded area represents the confidence interval for the forecast.")
-                
-                st.markdown("### 📊 Forecast Details")
-                forecast_df = pd.DataFrame({
-                    'Date': forecast_dates[:len(forecast_result['forecast'])],
-                    'Forecasted Value': forecast_result['forecast']
-                })
-                st.dataframe(forecast_df, use_container_width=True, hide_index=True)
-            else:
-                st.error("❌ Unable to generate forecast. Insufficient data points or the selected method requires more historical data.")
-                st.info("💡 Try: (1) Using 'Auto' or 'Moving Average' methods, or (2) Loading a dataset with more historical data.")
+                method_map[forecast_method],
+                dataset_id=st.session_state.current_dataset_id
+            ),
+            'metric': metric_to_forecast,
+            'periods': forecast_periods,
+            'data_source': st.session_state.data_source
+        }
+    
+    forecast_job = st.session_state.get('forecast_job')
+    if forecast_job and forecast_job['data_source'] == st.session_state.data_source:
+        job = get_job_queue().status(forecast_job['id'])
+        if forecast_job.get('cancelled') or (job is not None and job['status'] == 'cancelled'):
+            st.info("Forecast cancelled.")
+        elif job is not None and not job['finished']:
+            poll_job(forecast_job['id'])
+        elif job is not None and job['status'] == 'completed':
+            render_forecast_result(job['result'], df, date_col, forecast_job['metric'], forecast_job['periods'], viz)
+        else:
+            st.error("❌ Unable to generate forecast. Insufficient data points or the selected method requires more historical data.")
+            st.info("💡 Try: (1) Using 'Auto' or 'Moving Average' methods, or (2) Loading a dataset with more historical data.")
     
     st.markdown("---")
     st.markdown("### 🔄 Model Comparison")
@@ -917,70 +1201,96 @@ def show_forecasting_page():
     
     comparison_metric = st.selectbox("Select Metric for Comparison", numeric_cols, key="comparison_metric")
     comparison_periods = st.slider("Comparison Forecast Periods", 7, 60, 30, key="comparison_periods")
+    include_backtest = st.checkbox("Score models on historical data (rolling backtest) and combine them into a weighted ensemble",
+                                   key="comparison_backtest")
     
     if st.button("Compare Models", type="primary"):
-        with st.spinner("Generating forecasts across multiple models..."):
-            comparison_results = forecaster.compare_forecasts(df, comparison_metric, date_col, comparison_periods)
-            
-            if comparison_results:
-                st.success(f"✅ Generated {len(comparison_results)} forecast models")
-                
-                model_metrics = []
-                for method, result in comparison_results.items():
-                    model_metrics.append({
-                        'Model': result['method'],
-                        'Confidence': result['confidence'],
-                        'R² Score': result.get('r2_score', 'N/A'),
-                        'Has CI': '✓' if result.get('has_confidence_interval') else '✗'
-                    })
-                
-                metrics_df = pd.DataFrame(model_metrics)
-                st.dataframe(metrics_df, use_container_width=True, hide_index=True)
-                
-                df_sorted = df.sort_values(date_col)
-                recent_data = df_sorted[comparison_metric].tail(60).values
-                recent_dates = df_sorted[date_col].tail(60).values
-                
-                fig = go.Figure()
-                
-                fig.add_trace(go.Scatter(
-                    x=recent_dates,
-                    y=recent_data,
-                    name='Historical',
-                    line=dict(color=viz.color_scheme['primary'], width=2),
-                    mode='lines'
-                ))
-                
-                colors = [viz.color_scheme['warning'], viz.color_scheme['success'], 
-                         viz.color_scheme['info'], viz.color_scheme['danger']]
-                
-                for i, (method, result) in enumerate(comparison_results.items()):
-                    forecast_dates = result.get('forecast_dates', [])
-                    if not forecast_dates:
-                        last_date = pd.to_datetime(df_sorted[date_col].iloc[-1])
-                        forecast_dates = pd.date_range(start=last_date, periods=comparison_periods+1, freq='D')[1:]
-                    
-                    fig.add_trace(go.Scatter(
-                        x=forecast_dates,
-                        y=result['forecast'],
-                        name=result['method'],
-                        line=dict(color=colors[i % len(colors)], width=2, dash='dash'),
-                        mode='lines'
-                    ))
-                
-                fig.update_layout(
-                    title=f"{comparison_metric} - Model Comparison",
-                    template='plotly_white',
-                    hovermode='x unified',
-                    height=500,
-                    margin=dict(l=20, r=20, t=40, b=20),
-                    legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1)
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.error("❌ Unable to generate forecast comparisons. Insufficient data.")
+        st.session_state.comparison_job = {
+            'id': get_job_queue().submit_comparison(
+                resample_frame(df, [comparison_metric], date_col, freq_map[aggregation], metric_aggregation(comparison_metric))[0],
+                comparison_metric,
+                date_col,
+                comparison_periods,
+                COMPARISON_METHODS,
+                dataset_id=st.session_state.current_dataset_id,
+                backtest=include_backtest
+            ),
+            'metric': comparison_metric,
+            'periods': comparison_periods,
+            'data_source': st.session_state.data_source
+        }
     
+    comparison_job = st.session_state.get('comparison_job')
+    if comparison_job and comparison_job['data_source'] == st.session_state.data_source:
+        job = get_job_queue().status(comparison_job['id'])
+        if comparison_job.get('cancelled') or (job is not None and job['status'] == 'cancelled'):
+            st.info("Model comparison cancelled.")
+        elif job is not None and not job['finished']:
+            poll_job(comparison_job['id'])
+        elif job is not None and job['status'] == 'completed' and job['result']['results']:
+            if job['result'].get('timed_out'):
+                st.warning(f"⏱️ Stopped waiting for models that exceeded the time limit: {', '.join(job['result']['timed_out'])}")
+            render_comparison_results(job['result']['results'], job['result'].get('backtest'), df, date_col,
+                                      comparison_job['metric'], comparison_job['periods'], viz,
+                                      ensemble=job['result'].get('ensemble'))
+        else:
+            st.error("❌ Unable to generate forecast comparisons. Insufficient data.")
+
+    group_candidates = [col for col in df.select_dtypes(include=['object', 'category']).columns if col != date_col]
+
+    if group_candidates:
+        st.markdown("---")
+        st.markdown("### 🧩 Grouped Forecast")
+        st.caption("Forecast a metric for every group and reconcile the group forecasts so they add up to the total")
+
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            grouped_metric = st.selectbox("Select Metric", numeric_cols, key="grouped_metric")
+            group_columns = st.multiselect("Group By", group_candidates, default=group_candidates[:1], key="group_columns")
+
+        with col2:
+            grouped_periods = st.slider("Forecast Periods", 7, 90, 30, key="grouped_periods",
+                                        help="Steps ahead at the frequency the series is aggregated to")
+            grouped_method = st.selectbox("Forecast Method", list(method_map.keys()), key="grouped_method")
+
+        with col3:
+            reconciliation_options = {
+                "Bottom-up": "bottom_up",
+                "Optimal (OLS)": "ols",
+                "None": None
+            }
+            reconciliation_choice = st.selectbox("Reconciliation", list(reconciliation_options.keys()), key="grouped_reconciliation")
+
+        if group_columns and st.button("Generate Grouped Forecast", type="primary"):
+            st.session_state.grouped_job = {
+                'id': get_job_queue().submit_grouped(
+                    df,
+                    grouped_metric,
+                    group_columns,
+                    date_col,
+                    grouped_periods,
+                    method_map[grouped_method],
+                    reconciliation_options[reconciliation_choice],
+                    dataset_id=st.session_state.current_dataset_id
+                ),
+                'metric': grouped_metric,
+                'group_columns': group_columns,
+                'data_source': st.session_state.data_source
+            }
+
+        grouped_job = st.session_state.get('grouped_job')
+        if grouped_job and grouped_job['data_source'] == st.session_state.data_source:
+            job = get_job_queue().status(grouped_job['id'])
+            if grouped_job.get('cancelled') or (job is not None and job['status'] == 'cancelled'):
+                st.info("Grouped forecast cancelled.")
+            elif job is not None and not job['finished']:
+                poll_job(grouped_job['id'])
+            elif job is not None and job['status'] == 'completed':
+                render_grouped_result(job['result'], grouped_job['group_columns'], grouped_job['metric'], viz)
+            else:
+                st.error("❌ Unable to generate grouped forecasts. Insufficient data.")
+
     st.markdown("---")
     st.markdown("### 📊 Trend Analysis")
 
@@ -1017,7 +1327,12 @@ def show_forecasting_page():
         data_series = df_sorted[selected_metric].dropna()
         
         if len(data_series) > 10:
-            trend_analysis = forecaster.detect_trends(data_series)
+            precomputed = get_precomputed('trend_analysis')
+            trend_analysis = (precomputed['data'] or {}).get(selected_metric) if precomputed else None
+            if trend_analysis:
+                st.caption(f"Precomputed trend analysis · computed at {precomputed['parameters'].get('computed_at', '')[:16].replace('T', ' ')} UTC")
+            else:
+                trend_analysis = forecaster.detect_trends(data_series)
             
             if trend_analysis:
                 col1, col2, col3 = st.columns(3)
@@ -1031,7 +1346,10 @@ def show_forecasting_page():
                 with col3:
                     st.metric("Recent Average", f"{trend_analysis['recent_average']:,.2f}")
                 
-                growth = forecaster.calculate_growth_rate(data_series)
+                if 'growth_rate' in trend_analysis:
+                    growth = {'growth_rate': trend_analysis['growth_rate']} if trend_analysis['growth_rate'] is not None else None
+                else:
+                    growth = forecaster.calculate_growth_rate(data_series)
                 if growth:
                     st.info(f"📈 Growth Rate: {growth['growth_rate']:+.2f}% over the period")
 
@@ -1296,15 +1614,44 @@ def show_data_management_page():
         "💾"
     )
     
-    storage = DataStorage()
+    storage = get_storage()
     
     tab1, tab2 = st.tabs(["📁 Saved Datasets", "💾 Save Current Data"])
     
     with tab1:
         st.subheader("Saved Datasets")
-        
-        datasets = storage.list_datasets()
-        
+
+        col1, col2, col3 = st.columns([3, 2, 1])
+
+        with col1:
+            dataset_search = st.text_input("Search by name", key="dataset_search")
+
+        with col2:
+            sort_options = {
+                "Recently Updated": ("updated_at", True),
+                "Recently Created": ("created_at", True),
+                "Name (A-Z)": ("name", False),
+                "Largest First": ("rows", True)
+            }
+            sort_choice = st.selectbox("Sort by", list(sort_options.keys()), key="dataset_sort")
+
+        with col3:
+            page_size = st.selectbox("Per page", [10, 25, 50], key="dataset_page_size")
+
+        total_datasets = storage.count_datasets(dataset_search)
+        total_pages = max(1, -(-total_datasets // page_size))
+        page = st.number_input("Page", min_value=1, max_value=total_pages, value=1, step=1, key="dataset_page") if total_pages > 1 else 1
+        st.caption(f"{total_datasets:,} saved datasets")
+
+        sort_by, descending = sort_options[sort_choice]
+        datasets = storage.list_datasets(
+            search=dataset_search,
+            sort_by=sort_by,
+            descending=descending,
+            limit=page_size,
+            offset=(page - 1) * page_size
+        )
+
         if datasets:
             for ds in datasets:
                 with st.expander(f"📊 {ds['name']} ({ds['rows']:,} rows)", expanded=False):
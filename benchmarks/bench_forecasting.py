@@ -0,0 +1,63 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp_dir = tempfile.mkdtemp(prefix='dashboard_bench_')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}")
+
+import numpy as np
+import pandas as pd
+
+from utils.forecasting import ForecastingEngine
+from utils.parallel import FORECAST_WORKERS, get_process_pool
+
+
+def make_frame(series, days):
+    rng = np.random.default_rng(42)
+    t = np.arange(days)
+    data = {'Date': pd.date_range('2022-01-01', periods=days, freq='D')}
+    for i in range(series):
+        trend = rng.normal(50, 10) * t
+        season = rng.normal(2000, 500) * np.sin(2 * np.pi * t / 7)
+        data[f'Metric_{i:03d}'] = 100000 + trend + season + rng.normal(0, 1500, days)
+    return pd.DataFrame(data).sample(frac=1, random_state=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='forecast_many throughput across numeric columns')
+    parser.add_argument('--series', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--methods', nargs='+', default=['linear', 'exponential', 'arima'])
+    parser.add_argument('--periods', type=int, default=30)
+    args = parser.parse_args()
+
+    engine = ForecastingEngine()
+    if FORECAST_WORKERS > 1:
+        # Start the workers up front so pool spawn time is not billed to the first run
+        get_process_pool().submit(int).result()
+
+    print(f"workers: {FORECAST_WORKERS}")
+    print(f"{'series':>8} {'method':>12} {'loop (s)':>10} {'many (s)':>10} {'series/s':>10} {'speedup':>8} {'rows':>8}")
+    for series in args.series:
+        df = make_frame(series, args.days)
+        columns = [col for col in df.columns if col != 'Date']
+        for method in args.methods:
+            start = time.perf_counter()
+            for column in columns:
+                engine.forecast_metric(df, column, 'Date', args.periods, method)
+            loop_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = engine.forecast_many(df, columns, 'Date', args.periods, method)
+            many_time = time.perf_counter() - start
+
+            print(f"{series:>8} {method:>12} {loop_time:>10.3f} {many_time:>10.3f} {series / many_time:>10.1f} "
+                  f"{loop_time / many_time:>7.1f}x {len(result):>8}")
+
+
+if __name__ == '__main__':
+    main()
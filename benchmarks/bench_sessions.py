@@ -0,0 +1,65 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp_dir = tempfile.mkdtemp(prefix='dashboard_bench_')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}")
+
+from utils.database import engine, init_db
+from utils.data_storage import DataStorage
+from utils.sample_data import get_sample_dataset
+
+
+def simulated_session(storage, dataset_id, iterations, latencies, errors):
+    for i in range(iterations):
+        start = time.perf_counter()
+        try:
+            with storage:
+                storage.list_datasets(limit=25)
+                df = storage.load_dataset(dataset_id, start='2024-12-01', columns=['Date', 'Revenue'])
+                storage.save_analytics_result(dataset_id, 'bench', {'rows': len(df)}, {'iteration': i})
+        except Exception as e:
+            errors.append(repr(e))
+        latencies.append(time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent DataStorage sessions against utils.database.engine')
+    parser.add_argument('--sessions', type=int, default=16)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    init_db()
+    storage = DataStorage()
+    dataset_id = storage.save_dataset(get_sample_dataset('Finance'), 'bench: Finance')
+
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+        for _ in range(args.sessions):
+            executor.submit(simulated_session, storage, dataset_id, args.iterations, latencies, errors)
+    elapsed = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    total = len(ordered)
+    print(f"engine:        {engine.url.render_as_string(hide_password=True)}")
+    print(f"sessions:      {args.sessions} x {args.iterations} units of work")
+    print(f"throughput:    {total / elapsed:,.1f} units/s")
+    print(f"latency p50:   {statistics.median(ordered) * 1000:.1f} ms")
+    print(f"latency p95:   {ordered[int(total * 0.95) - 1] * 1000:.1f} ms")
+    print(f"errors:        {len(errors)}")
+    print(f"pool status:   {engine.pool.status()}")
+    if errors:
+        print(f"first error:   {errors[0]}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
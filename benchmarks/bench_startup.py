@@ -0,0 +1,101 @@
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', '2000'))
+
+# Loaded only when a model is actually fitted; importing them at startup is a regression
+DEFERRED_MODULES = ['prophet', 'cmdstanpy', 'statsmodels', 'sklearn', 'scipy.optimize']
+
+
+def app_imports(path):
+    with open(path) as f:
+        tree = ast.parse(f.read())
+
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def profile_imports(modules):
+    # Import each module separately so one missing dependency does not hide the others
+    code = '\n'.join(
+        f"try:\n    import {module}\nexcept ImportError as e:\n    print('{module}:', e.name)"
+        for module in modules
+    )
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1])
+
+    timings = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        timings.append({
+            'module': name.strip(),
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+            'depth': depth
+        })
+
+    missing = dict(line.split(': ', 1) for line in process.stdout.splitlines() if ': ' in line)
+    return timings, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import-time breakdown of app.py with a startup budget')
+    parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    modules = app_imports(os.path.join(ROOT, 'app.py'))
+
+    # Keep the fastest run so a cold disk cache does not fail the budget
+    runs = [profile_imports(modules) for _ in range(args.repeat)]
+    timings, missing = min(runs, key=lambda run: sum(t['self_ms'] for t in run[0]))
+    total_ms = sum(t['self_ms'] for t in timings)
+
+    print(f"{'module':<40} {'cumulative (ms)':>16} {'self (ms)':>10}")
+    top_level = sorted((t for t in timings if t['depth'] <= 1), key=lambda t: t['cumulative_ms'], reverse=True)
+    for t in top_level[:args.top]:
+        print(f"{t['module']:<40} {t['cumulative_ms']:>16.1f} {t['self_ms']:>10.1f}")
+
+    loaded = {t['module'] for t in timings}
+    eager = [module for module in DEFERRED_MODULES if module in loaded]
+
+    print()
+    for module, dependency in missing.items():
+        print(f"skipped {module}: {dependency} is not installed")
+    print(f"total import time: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if eager:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: startup imports exceed the budget by {total_ms - args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("OK")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp_dir = tempfile.mkdtemp(prefix='dashboard_bench_')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}")
+
+import numpy as np
+import pandas as pd
+
+from utils.database import init_db
+from utils.data_storage import DataStorage
+from utils.serialization import encode_dataframe, resolve_storage_format
+
+
+def make_frame(rows):
+    rng = np.random.default_rng(42)
+    return pd.DataFrame({
+        'Date': pd.date_range('2015-01-01', periods=rows, freq='min'),
+        'Revenue': rng.normal(120000, 8000, rows).round(2),
+        'Expenses': rng.normal(75000, 5000, rows).round(2),
+        'Customers': rng.integers(200, 1200, rows),
+        'Department': pd.Categorical(rng.choice(['Sales', 'Marketing', 'Engineering'], rows)),
+        'Region': rng.choice(['North America', 'Europe', 'Asia Pacific'], rows)
+    })
+
+
+def timed(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dataset save/load benchmark per storage format')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--formats', nargs='+', default=['json', 'parquet', 'arrow'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    init_db()
+    storage = DataStorage()
+
+    print(f"{'rows':>10} {'format':>8} {'save (s)':>10} {'load (s)':>10} {'7d col (s)':>10} {'size (MB)':>10} {'dtypes ok':>10}")
+    for rows in args.rows:
+        df = make_frame(rows)
+        for storage_format in args.formats:
+            if resolve_storage_format(storage_format) != storage_format:
+                print(f"{rows:>10} {storage_format:>8} {'skipped (pyarrow not installed)':>54}")
+                continue
+
+            name = f'bench-{storage_format}-{rows}'
+            save_time, dataset_id = timed(lambda: storage.save_dataset(df, name, storage_format=storage_format), args.repeat)
+            load_time, loaded = timed(lambda: storage.load_dataset(dataset_id), args.repeat)
+            recent_start = df['Date'].max() - pd.Timedelta(days=7)
+            range_time, _ = timed(lambda: storage.load_dataset(dataset_id, start=recent_start, columns=['Revenue']), args.repeat)
+
+            size = len(encode_dataframe(df, storage_format)[0]) / 1e6
+            dtypes_ok = loaded.dtypes.equals(df.dtypes)
+            print(f"{rows:>10} {storage_format:>8} {save_time:>10.3f} {load_time:>10.3f} {range_time:>10.3f} {size:>10.1f} {str(dtypes_ok):>10}")
+
+            storage.delete_dataset(dataset_id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+import os
+import tempfile
+
+# utils.database builds its engine on import, so the throwaway database has to be chosen first
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='dashboard_tests_'), 'test.db')}"
+os.environ.setdefault('FORECAST_WORKERS', '1')
+
+import pytest
+from utils import data_storage
+from utils.database import Base, engine, init_db
+from utils.data_storage import DataStorage
+
+
+@pytest.fixture
+def storage():
+    Base.metadata.drop_all(engine)
+    init_db()
+    yield DataStorage()
+    # Caches and model stores built during a test register hooks that must not outlive it
+    data_storage._invalidation_hooks.clear()
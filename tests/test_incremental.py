@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.forecasting import ForecastingEngine
+from utils.incremental import ModelStateStore, fit_model_state, update_model_state
+from utils.regression import trend_regression
+from utils.smoothing import holt_winters, simple_exponential_smoothing
+
+PERIODS = 14
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(7)
+    steps = np.arange(150)
+    return 50 + 0.3 * steps + 5 * np.sin(steps * 2 * np.pi / 7) + rng.normal(size=150)
+
+
+def test_regression_update_matches_full_fit(values):
+    state, _ = fit_model_state('linear', values[:120], PERIODS)
+    _, fit, _ = update_model_state(state, values[120:], PERIODS)
+
+    np.testing.assert_allclose(fit['forecast'], trend_regression(values, PERIODS, degree=1)['forecast'], rtol=1e-10)
+
+
+@pytest.mark.parametrize('method, params', [
+    ('exponential', {}),
+    ('holt', {}),
+    ('holt_winters', {'season_length': 7})
+])
+def test_smoothing_update_matches_full_pass_with_the_same_parameters(values, method, params):
+    state, _ = fit_model_state(method, values[:120], PERIODS, params)
+    _, fit, _ = update_model_state(state, values[120:], PERIODS)
+
+    if method == 'exponential':
+        full = simple_exponential_smoothing(values, PERIODS, alphas=state['alpha'])
+    else:
+        full = holt_winters(values, PERIODS, params.get('season_length'), alphas=state['alpha'], betas=state['beta'],
+                            gammas=state['gamma'])
+    for key in ('forecast', 'lower_bound', 'upper_bound'):
+        np.testing.assert_allclose(fit[key], full[key], rtol=1e-10)
+
+
+def test_arima_update_matches_filtering_the_full_series(values):
+    from statsmodels.tsa.arima.model import ARIMA
+
+    state, _ = fit_model_state('arima', values[:120], PERIODS, {'order': (1, 1, 1)})
+    _, fit, _ = update_model_state(state, values[120:], PERIODS)
+
+    full = ARIMA(values, order=(1, 1, 1)).filter(np.asarray(state['params'])).get_forecast(PERIODS).predicted_mean
+    np.testing.assert_allclose(fit['forecast'][0], full, rtol=1e-6)
+
+
+def test_engine_updates_a_stored_model_after_append(storage, values):
+    df = pd.DataFrame({'Date': pd.date_range('2024-01-01', periods=len(values)), 'MRR': values})
+    # Fewer new rows than MODEL_REFIT_EVERY, so the stored model is updated rather than refitted on schedule
+    dataset_id = storage.save_dataset(df.iloc[:130], 'incremental')
+    engine = ForecastingEngine(states=ModelStateStore(storage))
+
+    first = engine.forecast_incremental(storage.load_dataset(dataset_id), 'MRR', periods=PERIODS, method='holt',
+                                        dataset_id=dataset_id)
+    storage.append_rows(dataset_id, df.iloc[130:])
+    updated = engine.forecast_incremental(storage.load_dataset(dataset_id), 'MRR', periods=PERIODS, method='holt',
+                                          dataset_id=dataset_id)
+
+    assert first['model_update'] == 'refit'
+    assert updated['model_update'] == 'incremental'
+    assert updated['new_observations'] == 20
+    state = engine.states.get(dataset_id, 'MRR', 'holt')
+    full = holt_winters(values, PERIODS, alphas=state['alpha'], betas=state['beta'])
+    np.testing.assert_allclose(updated['forecast'], full['forecast'][0], rtol=1e-10)
@@ -0,0 +1,102 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from utils.job_queue import ForecastJobQueue
+
+
+class BlockingEngine:
+    # Holds every fit until the test releases it, so jobs can be observed while queued or running
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def forecast_incremental(self, df, column, date_column, periods, method, dataset_id):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(10)
+        return {'forecast': [float(df[column].iloc[-1])] * periods, 'method': method, 'confidence': 'Low'}
+
+
+def wait_until_finished(queue, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.status(job_id)
+        if job['finished']:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({'Date': pd.date_range('2024-01-01', periods=40), 'Revenue': np.arange(40.0)})
+
+
+@pytest.fixture
+def engine():
+    engine = BlockingEngine()
+    yield engine
+    engine.release.set()
+
+
+@pytest.fixture
+def queue(storage, engine):
+    queue = ForecastJobQueue(storage, engine, max_workers=1)
+    yield queue
+    queue.shutdown(wait=True)
+
+
+def test_identical_requests_share_one_job(queue, engine, frame):
+    first = queue.submit_forecast(frame, 'Revenue', periods=7, method='linear', dataset_id=1)
+    second = queue.submit_forecast(frame.copy(), 'Revenue', periods=7, method='linear', dataset_id=1)
+    other_dataset = queue.submit_forecast(frame, 'Revenue', periods=7, method='linear', dataset_id=2)
+
+    assert second == first
+    assert other_dataset != first
+    assert queue.status(first)['subscribers'] == 2
+
+    engine.release.set()
+    job = wait_until_finished(queue, first)
+    wait_until_finished(queue, other_dataset)
+    assert job['status'] == 'completed'
+    assert job['result']['forecast'] == [39.0] * 7
+    assert engine.calls == 2
+
+
+def test_shared_job_runs_until_every_requester_cancels(queue, engine, frame):
+    job_id = queue.submit_forecast(frame, 'Revenue', periods=7, method='linear')
+    queue.submit_forecast(frame, 'Revenue', periods=7, method='linear')
+    assert engine.started.wait(5)
+
+    assert queue.cancel(job_id)
+    job = queue.status(job_id)
+    assert not job['cancel_requested']
+    assert job['subscribers'] == 1
+
+    assert queue.cancel(job_id)
+    assert queue.status(job_id)['cancel_requested']
+
+    # The running fit finishes, but its result is discarded
+    engine.release.set()
+    job = wait_until_finished(queue, job_id)
+    assert job['status'] == 'cancelled'
+    assert job['result'] is None
+
+
+def test_cancelling_a_queued_job_removes_it(queue, engine, frame):
+    running = queue.submit_forecast(frame, 'Revenue', periods=7, method='linear')
+    assert engine.started.wait(5)
+    queued = queue.submit_forecast(frame, 'Revenue', periods=14, method='linear')
+
+    assert queue.cancel(queued)
+    assert queue.status(queued)['status'] == 'cancelled'
+
+    engine.release.set()
+    assert wait_until_finished(queue, running)['status'] == 'completed'
+    assert engine.calls == 1
+    # A fresh request for the cancelled work starts a new job instead of attaching to it
+    assert queue.submit_forecast(frame, 'Revenue', periods=14, method='linear') != queued
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+
+def make_frame(days=90, start='2024-01-01'):
+    dates = pd.date_range(start, periods=days)
+    return pd.DataFrame({
+        'Date': dates,
+        'Department': pd.Categorical(np.resize(['Sales', 'Ops', 'R&D'], days)),
+        'Revenue': np.linspace(100.0, 200.0, days),
+        'Orders': pd.array(np.arange(days), dtype='Int64'),
+        'Region': np.resize(['North', 'South'], days).astype(object)
+    })
+
+
+def test_round_trip_preserves_values_dtypes_and_row_order(storage):
+    # Rows out of date order span several monthly partitions; a load must give them back as saved
+    df = make_frame().sample(frac=1.0, random_state=0).reset_index(drop=True)
+    dataset_id = storage.save_dataset(df, 'round trip')
+
+    pdt.assert_frame_equal(storage.load_dataset(dataset_id), df)
+
+
+def test_range_and_column_loads(storage):
+    df = make_frame()
+    dataset_id = storage.save_dataset(df, 'pushdown')
+
+    loaded = storage.load_dataset(dataset_id, start='2024-02-01', end='2024-02-29', columns=['Date', 'Revenue'])
+    expected = df[(df['Date'] >= '2024-02-01') & (df['Date'] <= '2024-02-29')][['Date', 'Revenue']]
+    pdt.assert_frame_equal(loaded, expected.reset_index(drop=True))
+
+
+def test_unchanged_save_writes_no_version(storage):
+    df = make_frame()
+    dataset_id = storage.save_dataset(df, 'unchanged')
+    content_hash = storage.get_dataset_hash(dataset_id)
+
+    assert storage.save_dataset(df.copy(), 'unchanged') == dataset_id
+    assert storage.get_current_version(dataset_id) == 1
+    assert storage.get_dataset_hash(dataset_id) == content_hash
+
+
+def test_append_adds_a_version_and_keeps_the_previous_one(storage):
+    df = make_frame(120)
+    dataset_id = storage.save_dataset(df.iloc[:90], 'append')
+
+    version = storage.append_rows(dataset_id, df.iloc[90:])
+
+    assert version == 2
+    pdt.assert_frame_equal(storage.load_dataset(dataset_id), df)
+    pdt.assert_frame_equal(storage.load_dataset(dataset_id, version=1), df.iloc[:90])
+    versions = storage.list_versions(dataset_id)
+    assert [v['version'] for v in versions] == [2, 1]
+    assert versions[0]['rows'] == 120
+
+
+def test_append_matches_a_full_save_of_the_same_rows(storage):
+    df = make_frame(120)
+    appended = storage.save_dataset(df.iloc[:90], 'appended')
+    storage.append_rows(appended, df.iloc[90:])
+    saved = storage.save_dataset(df, 'saved whole')
+
+    pdt.assert_frame_equal(storage.load_dataset(appended), storage.load_dataset(saved))
+
+
+def test_upsert_updates_in_place_and_inserts_new_keys(storage):
+    df = make_frame(60)
+    dataset_id = storage.save_dataset(df, 'upsert')
+
+    changes = df.iloc[[10, 40]].copy()
+    changes['Revenue'] = [-1.0, -2.0]
+    new_row = make_frame(1, start='2024-03-15')
+    version = storage.upsert_rows(dataset_id, pd.concat([changes, new_row]), key='Date')
+
+    expected = df.copy()
+    expected.loc[[10, 40], 'Revenue'] = [-1.0, -2.0]
+    expected = pd.concat([expected, new_row], ignore_index=True)
+    assert version == 2
+    # Updated rows keep their place; the new row goes last
+    pdt.assert_frame_equal(storage.load_dataset(dataset_id), expected)
+    pdt.assert_frame_equal(storage.load_dataset(dataset_id, version=1), df)
+
+
+def test_nested_units_of_work_commit_together(storage):
+    dataset_id = storage.save_dataset(make_frame(30), 'nested')
+
+    try:
+        with storage:
+            storage.append_rows(dataset_id, make_frame(5, start='2024-02-01'))
+            storage.save_analytics_result(dataset_id, 'kpi_snapshot', {'rows': 35})
+            raise RuntimeError('abort the unit of work')
+    except RuntimeError:
+        pass
+
+    assert storage.get_current_version(dataset_id) == 1
+    assert len(storage.load_dataset(dataset_id)) == 30
+    assert storage.get_analytics_result(dataset_id, 'kpi_snapshot') is None
@@ -0,0 +1,105 @@
+import time
+import numpy as np
+from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.stattools import adfuller
+from utils.parallel import FORECAST_TIMEOUT, run_tasks
+
+ARIMA_CRITERIA = ('aic', 'bic')
+
+
+def choose_differencing(values, max_d=2, alpha=0.05):
+    d = 0
+    series = np.asarray(values, dtype=float)
+    while d < max_d and len(series) > 10:
+        try:
+            if adfuller(series, autolag='AIC')[1] <= alpha:
+                break
+        except (ValueError, np.linalg.LinAlgError):
+            break
+        series = np.diff(series)
+        d += 1
+    return d
+
+
+def _fit_candidate(values, order, seasonal_order, criterion):
+    try:
+        fitted = ARIMA(values, order=order, seasonal_order=seasonal_order).fit()
+    except Exception:
+        return None
+    score = getattr(fitted, criterion)
+    if not np.isfinite(score):
+        return None
+    return {'score': float(score), 'params': np.asarray(fitted.params)}
+
+
+def _neighbours(candidate, bounds):
+    p, q, P, Q = candidate
+    steps = [(1, 0, 0, 0), (-1, 0, 0, 0), (0, 1, 0, 0), (0, -1, 0, 0), (1, 1, 0, 0), (-1, -1, 0, 0),
+             (0, 0, 1, 0), (0, 0, -1, 0), (0, 0, 0, 1), (0, 0, 0, -1)]
+    for dp, dq, dP, dQ in steps:
+        neighbour = (p + dp, q + dq, P + dP, Q + dQ)
+        if all(0 <= value <= limit for value, limit in zip(neighbour, bounds)):
+            yield neighbour
+
+
+def auto_arima(values, max_p=3, max_d=2, max_q=3, criterion='aic', seasonal_period=None, max_P=1, max_Q=1,
+               seasonal_d=0, timeout=None):
+    if criterion not in ARIMA_CRITERIA:
+        raise ValueError(f"Unsupported criterion '{criterion}'. Choose one of {ARIMA_CRITERIA}.")
+
+    # Every candidate fit gets a deadline so one that never converges cannot hold up the search
+    timeout = FORECAST_TIMEOUT if timeout is None else timeout
+    started = time.perf_counter()
+    values = np.asarray(values, dtype=float)
+    d = choose_differencing(values, max_d)
+
+    seasonal = bool(seasonal_period) and seasonal_period > 1 and len(values) >= 3 * seasonal_period
+    if not seasonal:
+        max_P, max_Q, seasonal_d = 0, 0, 0
+    bounds = (max_p, max_q, max_P, max_Q)
+
+    def orders(candidate):
+        p, q, P, Q = candidate
+        seasonal_order = (P, seasonal_d, Q, seasonal_period) if seasonal else (0, 0, 0, 0)
+        return (p, d, q), seasonal_order
+
+    # Stepwise search: start from a few standard models, then only expand around the current best
+    frontier = [(2, 2, 1, 1), (0, 0, 0, 0), (1, 0, 1, 0), (0, 1, 0, 1)]
+    frontier = list(dict.fromkeys(tuple(min(value, limit) for value, limit in zip(candidate, bounds)) for candidate in frontier))
+    evaluated = {}
+    timed_out = []
+    best = None
+
+    while frontier:
+        tasks = {candidate: (values,) + orders(candidate) + (criterion,) for candidate in frontier}
+        for candidate in frontier:
+            evaluated[candidate] = None
+        for candidate, fit in run_tasks(_fit_candidate, tasks, timeout, timed_out):
+            evaluated[candidate] = fit
+
+        scored = [(fit['score'], candidate) for candidate, fit in evaluated.items() if fit is not None]
+        if not scored:
+            break
+        new_best = min(scored)[1]
+        if new_best == best:
+            break
+        best = new_best
+        frontier = [candidate for candidate in _neighbours(best, bounds) if candidate not in evaluated]
+
+    if best is None:
+        return None
+
+    order, seasonal_order = orders(best)
+    # Rebuild the winner from its fitted parameters instead of optimising it again
+    fitted = ARIMA(values, order=order, seasonal_order=seasonal_order).filter(evaluated[best]['params'])
+
+    return {
+        'fitted': fitted,
+        'order': order,
+        'seasonal_order': seasonal_order if seasonal and any(seasonal_order[:3]) else None,
+        'criterion': criterion,
+        'score': evaluated[best]['score'],
+        'candidates_evaluated': len(evaluated),
+        'candidates_timed_out': len(timed_out),
+        'search_time': time.perf_counter() - started
+    }
@@ -0,0 +1,79 @@
+import asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from utils.database import DATABASE_URL, POOL_SIZE, MAX_OVERFLOW, POOL_TIMEOUT, SQLITE_BUSY_TIMEOUT_MS, sqlite_pragma_hook, create_schema
+from utils.data_storage import DataStorage, DEFAULT_PARTITION_FREQ, prepare_dataset, assemble_frames
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg'
+}
+
+def to_async_url(database_url):
+    scheme, separator, rest = database_url.partition('://')
+    if not separator:
+        raise ValueError(f"Invalid database URL '{database_url}'")
+    if scheme in ASYNC_DRIVERS:
+        return f'{ASYNC_DRIVERS[scheme]}://{rest}'
+    if '+' in scheme:
+        # An explicit driver was requested, trust it is async-capable
+        return database_url
+    raise ValueError(f"No async driver configured for '{scheme}' databases")
+
+class AsyncDataStorage:
+    
+    def __init__(self, database_url=None):
+        url = to_async_url(database_url or DATABASE_URL)
+        
+        if url.startswith('sqlite'):
+            self.engine = create_async_engine(url, connect_args={'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000})
+            event.listen(self.engine.sync_engine, 'connect', sqlite_pragma_hook(url))
+        else:
+            self.engine = create_async_engine(
+                url,
+                pool_pre_ping=True,
+                pool_recycle=3600,
+                pool_size=POOL_SIZE,
+                max_overflow=MAX_OVERFLOW,
+                pool_timeout=POOL_TIMEOUT
+            )
+        self.SessionFactory = async_sessionmaker(self.engine, autoflush=False)
+    
+    async def init_db(self):
+        async with self.engine.begin() as connection:
+            await connection.run_sync(create_schema)
+    
+    async def _run(self, method_name, *args, **kwargs):
+        async with self.SessionFactory() as session:
+            return await session.run_sync(self._call, method_name, args, kwargs)
+    
+    @staticmethod
+    def _call(sync_session, method_name, args, kwargs):
+        storage = DataStorage(session=sync_session)
+        return getattr(storage, method_name)(*args, **kwargs)
+    
+    async def save_dataset(self, df, name, description="", source_type="upload", storage_format=None,
+                           partition_by='auto', partition_freq=DEFAULT_PARTITION_FREQ):
+        # Hashing and partitioning are CPU-bound, keep them off the event loop
+        prepared = await asyncio.to_thread(prepare_dataset, df, partition_by, partition_freq)
+        return await self._run('save_prepared_dataset', prepared, name, description, source_type, storage_format)
+    
+    async def load_dataset(self, dataset_id, start=None, end=None, columns=None, version=None):
+        plan = await self._run('plan_dataset_load', dataset_id, start, end, columns, version)
+        return await asyncio.to_thread(assemble_frames, plan)
+    
+    async def list_datasets(self, search=None, sort_by='updated_at', descending=True, limit=None, offset=0):
+        return await self._run('list_datasets', search, sort_by, descending, limit, offset)
+    
+    async def save_forecast(self, dataset_id, metric_name, method, forecast_data, confidence_level="Medium", r2_score=None,
+                            parameters=None, dataset_version=None):
+        return await self._run('save_forecast', dataset_id, metric_name, method, forecast_data, confidence_level,
+                               r2_score, parameters, dataset_version)
+    
+    async def get_forecast_history(self, dataset_id, metric_name):
+        return await self._run('get_forecast_history', dataset_id, metric_name)
+    
+    async def dispose(self):
+        await self.engine.dispose()
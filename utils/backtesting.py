@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+BACKTEST_METHODS = ['linear', 'polynomial', 'moving_average', 'exponential', 'holt', 'holt_winters', 'arima', 'prophet']
+BACKTEST_METRICS = ('mae', 'mape', 'rmse')
+
+
+def rolling_cutoffs(n_obs, horizon, n_cutoffs=5, min_train=20, step=None):
+    step = step or horizon
+    last = n_obs - horizon
+    cutoffs = [last - i * step for i in range(n_cutoffs)]
+    return sorted(cutoff for cutoff in cutoffs if cutoff >= min_train)
+
+
+def score_forecast(actual, forecast, lower=None, upper=None):
+    actual = np.asarray(actual, dtype=float)
+    forecast = np.asarray(forecast, dtype=float)[:len(actual)]
+    errors = actual - forecast
+    nonzero = actual != 0
+
+    coverage = np.nan
+    if lower is not None and upper is not None:
+        lower = np.asarray(lower, dtype=float)[:len(actual)]
+        upper = np.asarray(upper, dtype=float)[:len(actual)]
+        coverage = float(np.mean((actual >= lower) & (actual <= upper)))
+
+    return {
+        'mae': float(np.mean(np.abs(errors))),
+        'mape': float(np.mean(np.abs(errors[nonzero] / actual[nonzero])) * 100) if nonzero.any() else np.nan,
+        'rmse': float(np.sqrt(np.mean(errors ** 2))),
+        'coverage': coverage
+    }
+
+
+def backtest_cutoffs(engine, df_clean, column, date_column, method, cutoffs, horizon, params=None):
+    params = params or {}
+    values = df_clean[column].to_numpy(dtype=float)
+    scores = []
+
+    if method == 'arima':
+        from statsmodels.tsa.arima.model import ARIMA
+        
+        # Fit once, then roll the same parameters forward through later cutoffs
+        fitted = None
+        previous = None
+        for cutoff in cutoffs:
+            try:
+                if fitted is None:
+                    fitted = ARIMA(values[:cutoff], order=params.get('order', (1, 1, 1))).fit()
+                else:
+                    fitted = fitted.append(values[previous:cutoff], refit=False)
+                previous = cutoff
+                forecast = fitted.get_forecast(steps=horizon)
+                conf_int = np.asarray(forecast.conf_int())
+                score = score_forecast(values[cutoff:cutoff + horizon], forecast.predicted_mean, conf_int[:, 0], conf_int[:, 1])
+            except Exception:
+                continue
+            score['cutoff'] = cutoff
+            scores.append(score)
+        return scores
+
+    init = None
+    for cutoff in cutoffs:
+        if method == 'prophet':
+            # Each cutoff extends the previous training window, so start from the parameters fitted there
+            result = engine.prophet_forecast(df_clean.iloc[:cutoff], column, date_column, horizon, init=init)
+            init = result['prophet_params'] if result else init
+        else:
+            result = engine._forecast_prepared(df_clean.iloc[:cutoff], column, date_column, horizon, method, fallback=False)
+        if not result:
+            continue
+        score = score_forecast(
+            values[cutoff:cutoff + horizon],
+            result['forecast'],
+            result.get('lower_bound'),
+            result.get('upper_bound')
+        )
+        score['cutoff'] = cutoff
+        scores.append(score)
+    return scores
+
+
+def summarize_scores(scores_by_method, metric='mae'):
+    if metric not in BACKTEST_METRICS:
+        raise ValueError(f"Unsupported backtest metric '{metric}'. Choose one of {BACKTEST_METRICS}.")
+
+    rows = []
+    for method, scores in scores_by_method.items():
+        if not scores:
+            continue
+        frame = pd.DataFrame(scores)
+        rows.append({
+            'method': method,
+            'mae': frame['mae'].mean(),
+            'mape': frame['mape'].mean(),
+            'rmse': frame['rmse'].mean(),
+            'coverage': frame['coverage'].mean(),
+            'cutoffs': len(frame)
+        })
+
+    summary = pd.DataFrame(rows, columns=['method', 'mae', 'mape', 'rmse', 'coverage', 'cutoffs'])
+    return summary.sort_values(metric, na_position='last').reset_index(drop=True)
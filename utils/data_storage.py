@@ -1,102 +1,1107 @@
+import functools
+import threading
 import pandas as pd
 from datetime import datetime
-from utils.database import Dataset, ForecastResult, Alert, AnalyticsResult, DataConnection, SessionLocal
+from sqlalchemy import func, or_
+from sqlalchemy.orm import defer
+from utils.database import Dataset, DatasetPartition, DatasetVersion, ForecastResult, ForecastJob, Alert, AnalyticsResult, DataConnection, SessionFactory
+import numpy as np
+from utils.partitioning import DEFAULT_PARTITION_FREQ, ROW_ORDER_COLUMN, choose_partition_column, split_partitions, filter_date_range, hash_manifest, manifest_column_hashes, with_row_order, restore_row_order
+from utils.serialization import TEXT_FORMATS, resolve_storage_format, column_hashes, combine_hashes, deserialize_dataframe
 import json
 
+DATASET_SORT_COLUMNS = {
+    'name': Dataset.name,
+    'rows': Dataset.row_count,
+    'created_at': Dataset.created_at,
+    'updated_at': Dataset.updated_at
+}
+
+_invalidation_hooks = []
+
+def register_invalidation_hook(hook):
+    if hook not in _invalidation_hooks:
+        _invalidation_hooks.append(hook)
+
+def unregister_invalidation_hook(hook):
+    if hook in _invalidation_hooks:
+        _invalidation_hooks.remove(hook)
+
+def prepare_dataset(df, partition_by='auto', partition_freq=DEFAULT_PARTITION_FREQ):
+    partition_column = choose_partition_column(df, partition_by)
+    partition_freq = partition_freq if partition_column else None
+    metadata = Dataset.build_metadata(df)
+    metadata['next_row'] = len(df)
+    
+    chunks = list(split_partitions(with_row_order(df), partition_column, partition_freq))
+    for chunk in chunks:
+        chunk['column_hashes'] = column_hashes(chunk['frame'])
+        chunk['content_hash'] = combine_hashes(chunk['column_hashes'].items())
+    
+    return {
+        'partition_column': partition_column,
+        'partition_freq': partition_freq,
+        'chunks': chunks,
+        'metadata': metadata,
+        'content_hash': hash_manifest(metadata['dtypes'], {chunk['partition_key']: {'hash': chunk['content_hash']} for chunk in chunks})
+    }
+
+def assemble_frames(plan):
+    if plan is None:
+        return None
+    
+    start, end, columns = plan['start'], plan['end'], plan['columns']
+    has_range = start is not None or end is not None
+    date_column = plan['date_column']
+    
+    frames = [deserialize_dataframe(payload, storage_format, columns=plan['read_columns']) for payload, storage_format in plan['payloads']]
+    frames = [frame for frame in frames if frame is not None]
+    
+    if has_range and date_column is None and frames:
+        date_column = choose_partition_column(frames[0])
+    
+    if not frames:
+        return pd.DataFrame(columns=list(columns) if columns is not None else plan['column_names'])
+    
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    df = restore_row_order(df)
+    df = filter_date_range(df, date_column, start, end)
+    
+    if columns is not None:
+        df = df[list(columns)]
+    
+    return df.reset_index(drop=True) if has_range else df
+
+def unit_of_work(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._bound_session is not None:
+            return method(self, *args, **kwargs)
+        # A call made inside `with storage:` or another call joins that unit of work and commits with it
+        with self:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class DataStorage:
     
-    def __init__(self):
-        self.session = SessionLocal()
+    def __init__(self, session=None, cache=None):
+        self._local = threading.local()
+        self._bound_session = session
+        self.cache = cache
+        if cache is not None:
+            register_invalidation_hook(cache.invalidate)
     
-    def save_dataset(self, df, name, description="", source_type="upload"):
+    @property
+    def session(self):
+        session = self._bound_session or getattr(self._local, 'session', None)
+        if session is None:
+            raise RuntimeError("DataStorage session is only available inside a unit of work")
+        return session
+    
+    def __enter__(self):
+        # Nested blocks share the outermost session; only the outermost block opens, commits and closes it
+        depth = getattr(self._local, 'depth', 0)
+        if depth == 0:
+            self._local.session = SessionFactory()
+            self._local.invalidated = []
+        self._local.depth = depth + 1
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        
+        session = self._local.session
+        invalidated = self._local.invalidated
+        self._local.session = None
+        self._local.invalidated = []
         try:
-            existing = self.session.query(Dataset).filter(Dataset.name == name).first()
+            if exc_type is not None:
+                session.rollback()
+                return
+            session.commit()
+        finally:
+            session.close()
+        
+        for dataset_id, start, end in invalidated:
+            self._notify_invalidation(dataset_id, start, end)
+    
+    def _nested(self):
+        return self._bound_session is None and getattr(self._local, 'depth', 0) > 1
+    
+    def _commit(self):
+        # Only the outermost unit of work commits; calls nested inside it flush into its transaction
+        if self._nested():
+            self.session.flush()
+        else:
+            self.session.commit()
+    
+    def _notify_invalidation(self, dataset_id, start=None, end=None):
+        # Caches hear about a change only once it is committed
+        if self._nested():
+            self._local.invalidated.append((dataset_id, start, end))
+            return
+        for hook in list(_invalidation_hooks):
+            hook(dataset_id, start, end)
+    
+    def save_dataset(self, df, name, description="", source_type="upload", storage_format=None,
+                     partition_by='auto', partition_freq=DEFAULT_PARTITION_FREQ):
+        prepared = prepare_dataset(df, partition_by, partition_freq)
+        return self.save_prepared_dataset(prepared, name, description, source_type, storage_format)
+    
+    @unit_of_work
+    def save_prepared_dataset(self, prepared, name, description="", source_type="upload", storage_format=None):
+        try:
+            dataset = self.session.query(Dataset).options(
+                defer(Dataset.data),
+                defer(Dataset.data_blob)
+            ).filter(Dataset.name == name).first()
             
-            if existing:
-                existing.data = df.to_json(orient='records', date_format='iso')
-                existing.description = description
-                existing.source_type = source_type
-                existing.updated_at = datetime.utcnow()
-                existing.dataset_metadata = {
-                    'rows': len(df),
-                    'columns': len(df.columns),
-                    'column_names': list(df.columns),
-                    'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()}
-                }
-                dataset = existing
-            else:
-                dataset = Dataset.from_dataframe(df, name, description, source_type)
+            if dataset is None:
+                dataset = Dataset(name=name, description=description, source_type=source_type)
                 self.session.add(dataset)
+                self.session.flush()
+            elif dataset.description != description or dataset.source_type != source_type:
+                dataset.description = description
+                dataset.source_type = source_type
+                dataset.updated_at = datetime.utcnow()
             
-            self.session.commit()
+            touched = self._write_partitions(dataset, prepared, storage_format)
+            self._commit_with_invalidation(dataset.id, touched)
             return dataset.id
         except Exception as e:
             self.session.rollback()
             raise e
     
-    def load_dataset(self, dataset_id):
+    @unit_of_work
+    def append_rows(self, dataset_id, df, storage_format=None):
         try:
-            dataset = self.session.query(Dataset).filter(Dataset.id == dataset_id).first()
-            if dataset:
-                return dataset.to_dataframe()
+            dataset = self._get_partitioned_dataset(dataset_id, storage_format)
+            df = self._align_columns(dataset, df)
+            if df.empty:
+                return dataset.current_version
+            
+            parent_manifest = self._current_manifest(dataset)
+            version = (dataset.current_version or 0) + 1
+            manifest = dict(parent_manifest)
+            metadata = dict(dataset.dataset_metadata or {})
+            if 'next_row' in metadata:
+                df = with_row_order(df, metadata['next_row'])
+                metadata['next_row'] += len(df)
+            
+            segments = []
+            for chunk in split_partitions(df, dataset.partition_column, dataset.partition_freq or DEFAULT_PARTITION_FREQ):
+                chunk['column_hashes'] = column_hashes(chunk['frame'])
+                chunk['content_hash'] = combine_hashes(chunk['column_hashes'].items())
+                segments.append((chunk, self._new_partition(dataset, chunk, version, storage_format)))
+            self.session.flush()
+            
+            for chunk, partition in segments:
+                key = chunk['partition_key']
+                parent = parent_manifest.get(key)
+                if parent is None:
+                    manifest[key] = self._manifest_entry([partition.id], chunk)
+                    continue
+                parent_columns = parent.get('columns', {})
+                manifest[key] = {
+                    'ids': parent['ids'] + [partition.id],
+                    'hash': combine_hashes([('parent', parent['hash']), ('segment', chunk['content_hash'])]),
+                    'columns': {
+                        col: combine_hashes([('parent', parent_columns.get(col)), ('segment', value)])
+                        for col, value in chunk['column_hashes'].items()
+                    }
+                }
+            
+            metadata['rows'] = (dataset.row_count or 0) + len(df)
+            self._record_version(dataset, version, manifest, metadata, dataset.partition_column, written=len(segments))
+            
+            touched = self._touched_range([partition.id for _, partition in segments])
+            self._commit_with_invalidation(dataset.id, touched)
+            return version
+        except Exception as e:
+            self.session.rollback()
+            raise e
+    
+    @unit_of_work
+    def upsert_rows(self, dataset_id, df, key, storage_format=None):
+        try:
+            key = [key] if isinstance(key, str) else list(key)
+            missing_keys = [col for col in key if col not in df.columns]
+            if missing_keys:
+                raise ValueError(f"Upsert key columns not found: {missing_keys}")
+            
+            dataset = self._get_partitioned_dataset(dataset_id, storage_format)
+            df = self._align_columns(dataset, df).drop_duplicates(subset=key, keep='last')
+            if df.empty:
+                return dataset.current_version
+            
+            parent_manifest = self._current_manifest(dataset)
+            version = (dataset.current_version or 0) + 1
+            metadata = dict(dataset.dataset_metadata or {})
+            ordered = 'next_row' in metadata
+            if ordered:
+                df = with_row_order(df, metadata['next_row'])
+                metadata['next_row'] += len(df)
+            incoming = {
+                chunk['partition_key']: chunk
+                for chunk in split_partitions(df, dataset.partition_column, dataset.partition_freq or DEFAULT_PARTITION_FREQ)
+            }
+            
+            # Rows can only move between partitions when the key does not pin the partition column
+            if dataset.partition_column in key:
+                candidate_keys = set(incoming)
+            else:
+                candidate_keys = set(incoming) | set(parent_manifest)
+            
+            incoming_index = pd.MultiIndex.from_frame(df[key])
+            manifest = dict(parent_manifest)
+            rewritten = []
+            row_delta = 0
+            
+            for partition_key in sorted(candidate_keys):
+                parent = parent_manifest.get(partition_key)
+                chunk = incoming.get(partition_key)
+                
+                existing = self._read_partition_ids(parent['ids']) if parent else None
+                if existing is not None:
+                    matches = pd.MultiIndex.from_frame(existing[key]).isin(incoming_index)
+                    if chunk is None and not matches.any():
+                        continue
+                    if ordered and chunk is not None and matches.any():
+                        chunk = dict(chunk, frame=self._keep_row_order(existing[matches], chunk['frame'], key))
+                    existing = existing[~matches]
+                    row_delta -= int(matches.sum())
+                
+                frames = [frame for frame in (existing, chunk['frame'] if chunk else None) if frame is not None and not frame.empty]
+                if chunk is not None:
+                    row_delta += len(chunk['frame'])
+                
+                if parent:
+                    rewritten.extend(parent['ids'])
+                
+                if not frames:
+                    manifest.pop(partition_key, None)
+                    continue
+                
+                frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+                new_chunk = next(split_partitions(frame, dataset.partition_column, dataset.partition_freq or DEFAULT_PARTITION_FREQ)) \
+                    if chunk is None else dict(chunk, frame=frame)
+                if chunk is not None and dataset.partition_column:
+                    dates = pd.to_datetime(frame[dataset.partition_column], errors='coerce')
+                    if dates.notna().any():
+                        new_chunk['min_date'] = dates.min().to_pydatetime()
+                        new_chunk['max_date'] = dates.max().to_pydatetime()
+                new_chunk['column_hashes'] = column_hashes(frame)
+                new_chunk['content_hash'] = combine_hashes(new_chunk['column_hashes'].items())
+                partition = self._new_partition(dataset, new_chunk, version, storage_format)
+                self.session.flush()
+                manifest[partition_key] = self._manifest_entry([partition.id], new_chunk)
+                rewritten.append(partition.id)
+            
+            if manifest == parent_manifest:
+                return dataset.current_version
+            
+            metadata['rows'] = (dataset.row_count or 0) + row_delta
+            written = len([pid for pid in rewritten if pid not in {p for entry in parent_manifest.values() for p in entry['ids']}])
+            self._record_version(dataset, version, manifest, metadata, dataset.partition_column, written=written)
+            
+            touched = self._touched_range(rewritten)
+            self._commit_with_invalidation(dataset.id, touched)
+            return version
+        except Exception as e:
+            self.session.rollback()
+            raise e
+    
+    def _get_partitioned_dataset(self, dataset_id, storage_format=None):
+        dataset = self.session.query(Dataset).options(
+            defer(Dataset.data),
+            defer(Dataset.data_blob)
+        ).filter(Dataset.id == dataset_id).first()
+        
+        if dataset is None:
+            raise ValueError(f"Dataset {dataset_id} not found")
+        
+        if not dataset.partitioned:
+            self._write_partitions(dataset, prepare_dataset(dataset.to_dataframe()), storage_format)
+            self.session.flush()
+        
+        return dataset
+    
+    def _align_columns(self, dataset, df):
+        column_names = (dataset.dataset_metadata or {}).get('column_names', [])
+        missing = [col for col in column_names if col not in df.columns]
+        extra = [col for col in df.columns if col not in column_names]
+        if missing or extra:
+            raise ValueError(f"Rows do not match the dataset schema (missing: {missing}, unexpected: {extra})")
+        return df[column_names]
+    
+    def _keep_row_order(self, replaced, frame, key):
+        # Updated rows take over the position of the rows they replace
+        previous = pd.Series(replaced[ROW_ORDER_COLUMN].to_numpy(), index=pd.MultiIndex.from_frame(replaced[key]))
+        previous = previous[~previous.index.duplicated(keep='last')]
+        kept = previous.reindex(pd.MultiIndex.from_frame(frame[key])).to_numpy()
+        order = np.where(np.isnan(kept), frame[ROW_ORDER_COLUMN].to_numpy(), kept).astype('int64')
+        return frame.assign(**{ROW_ORDER_COLUMN: order})
+    
+    def _read_partition_ids(self, partition_ids):
+        partitions = self.session.query(DatasetPartition).filter(
+            DatasetPartition.id.in_(partition_ids)
+        ).order_by(DatasetPartition.id).all()
+        frames = [partition.to_dataframe() for partition in partitions]
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    
+    def _new_partition(self, dataset, chunk, version, storage_format=None):
+        partition = DatasetPartition.from_chunk(dataset.id, chunk, storage_format)
+        partition.version = version
+        self.session.add(partition)
+        return partition
+    
+    def _manifest_entry(self, partition_ids, chunk):
+        return {
+            'ids': partition_ids,
+            'hash': chunk['content_hash'],
+            'columns': chunk['column_hashes']
+        }
+    
+    def _touched_range(self, partition_ids):
+        if not partition_ids:
+            return None
+        bounds = self.session.query(DatasetPartition.min_date, DatasetPartition.max_date).filter(
+            DatasetPartition.id.in_(partition_ids)
+        ).all()
+        if any(min_date is None for min_date, _ in bounds):
+            return (None, None)
+        return (min(b[0] for b in bounds), max(b[1] for b in bounds))
+    
+    def _commit_with_invalidation(self, dataset_id, touched):
+        if touched is None:
+            self._commit()
+            return
+        
+        start, end = touched
+        stale = []
+        for result in self.session.query(AnalyticsResult).filter(AnalyticsResult.dataset_id == dataset_id):
+            parameters = result.parameters or {}
+            result_start = parameters.get('start')
+            result_end = parameters.get('end')
+            if start is not None and result_end is not None and pd.Timestamp(result_end) < pd.Timestamp(start):
+                continue
+            if end is not None and result_start is not None and pd.Timestamp(result_start) > pd.Timestamp(end):
+                continue
+            stale.append(result.id)
+        if stale:
+            self.session.query(AnalyticsResult).filter(
+                AnalyticsResult.id.in_(stale)
+            ).delete(synchronize_session=False)
+        
+        self._commit()
+        self._notify_invalidation(dataset_id, start, end)
+    
+    def _write_partitions(self, dataset, prepared, storage_format=None):
+        partition_column = prepared['partition_column']
+        partition_freq = prepared['partition_freq']
+        chunks = prepared['chunks']
+        metadata = dict(prepared['metadata'])
+        content_hash = prepared['content_hash']
+        
+        same_layout = bool(dataset.partitioned) and \
+            dataset.partition_column == partition_column and \
+            dataset.partition_freq == partition_freq
+        
+        if same_layout and dataset.content_hash == content_hash:
+            return None
+        
+        parent_manifest = self._current_manifest(dataset) if same_layout else {}
+        version = (dataset.current_version or 0) + 1
+        
+        manifest = {}
+        new_partitions = []
+        for chunk in chunks:
+            key = chunk['partition_key']
+            parent = parent_manifest.get(key)
+            if parent is not None and parent['hash'] == chunk['content_hash']:
+                manifest[key] = parent
+                continue
+            new_partitions.append((chunk, self._new_partition(dataset, chunk, version, storage_format)))
+        self.session.flush()
+        for chunk, partition in new_partitions:
+            manifest[chunk['partition_key']] = self._manifest_entry([partition.id], chunk)
+        
+        self._record_version(dataset, version, manifest, metadata, partition_column, written=len(new_partitions))
+        
+        dataset.data = None
+        dataset.data_blob = None
+        dataset.storage_format = resolve_storage_format(storage_format)
+        dataset.partitioned = True
+        dataset.partition_column = partition_column
+        dataset.partition_freq = partition_freq
+        
+        if not same_layout:
+            return (None, None)
+        
+        # A re-upload that only adds rows after a partition's saved ones touches just the added dates,
+        # so forecasts and model states fitted on the earlier rows stay valid
+        bounds = []
+        changed_ids = []
+        for chunk, partition in new_partitions:
+            parent = parent_manifest.get(chunk['partition_key'])
+            appended = self._appended_rows(parent, chunk['frame']) if parent is not None else None
+            if appended is None:
+                changed_ids.append(partition.id)
+                if parent is not None:
+                    changed_ids.extend(parent['ids'])
+                continue
+            bounds.extend((part['min_date'], part['max_date'])
+                          for part in split_partitions(appended, partition_column, partition_freq))
+        changed_ids.extend(
+            pid for key, entry in parent_manifest.items()
+            if key not in manifest
+            for pid in entry['ids']
+        )
+        
+        touched = self._touched_range(changed_ids)
+        if touched is not None:
+            bounds.append(touched)
+        if not bounds:
+            return None
+        if any(start is None for start, _ in bounds):
+            return (None, None)
+        return (min(start for start, _ in bounds), max(end for _, end in bounds))
+    
+    def _appended_rows(self, parent, frame):
+        # The rows frame adds after the partition's saved rows, or None when any saved row changed
+        existing = self._read_partition_ids(parent['ids'])
+        columns = [col for col in existing.columns if col != ROW_ORDER_COLUMN]
+        if len(existing) > len(frame) or set(columns) != set(frame.columns) - {ROW_ORDER_COLUMN}:
             return None
+        head = frame[columns].iloc[:len(existing)].reset_index(drop=True)
+        if not head.equals(existing[columns].reset_index(drop=True)):
+            return None
+        return frame.iloc[len(existing):]
+    
+    def _record_version(self, dataset, version, manifest, metadata, partition_column, written=0):
+        partition_ids = [pid for entry in manifest.values() for pid in entry['ids']]
+        min_date, max_date = self.session.query(
+            func.min(DatasetPartition.min_date),
+            func.max(DatasetPartition.max_date)
+        ).filter(DatasetPartition.id.in_(partition_ids)).one() if partition_ids else (None, None)
+        
+        metadata.update({
+            'partition_column': partition_column,
+            'partitions': len(manifest),
+            'min_date': min_date.isoformat() if min_date else None,
+            'max_date': max_date.isoformat() if max_date else None,
+            'content_hash': hash_manifest(metadata['dtypes'], manifest),
+            'column_hashes': manifest_column_hashes(metadata['column_names'], manifest),
+            'version': version
+        })
+        
+        self.session.add(DatasetVersion(
+            dataset_id=dataset.id,
+            version=version,
+            parent_version=dataset.current_version,
+            partition_column=partition_column,
+            manifest=manifest,
+            content_hash=metadata['content_hash'],
+            row_count=metadata['rows'],
+            partitions_written=written,
+            dataset_metadata=metadata
+        ))
+        
+        dataset.current_version = version
+        dataset.row_count = metadata['rows']
+        dataset.content_hash = metadata['content_hash']
+        dataset.dataset_metadata = metadata
+        dataset.updated_at = datetime.utcnow()
+    
+    def _current_manifest(self, dataset):
+        if dataset.current_version is not None:
+            return self._get_version(dataset.id, dataset.current_version).manifest
+        
+        manifest = {}
+        partitions = self.session.query(
+            DatasetPartition.id, DatasetPartition.partition_key, DatasetPartition.content_hash
+        ).filter(DatasetPartition.dataset_id == dataset.id).order_by(DatasetPartition.id)
+        for partition_id, key, partition_hash in partitions:
+            entry = manifest.setdefault(key, {'ids': [], 'hashes': []})
+            entry['ids'].append(partition_id)
+            entry['hashes'].append(partition_hash)
+        return {
+            key: {'ids': entry['ids'], 'hash': entry['hashes'][0] if len(entry['hashes']) == 1 else combine_hashes(enumerate(entry['hashes']))}
+            for key, entry in manifest.items()
+        }
+    
+    def _get_version(self, dataset_id, version):
+        record = self.session.query(DatasetVersion).filter(
+            DatasetVersion.dataset_id == dataset_id,
+            DatasetVersion.version == version
+        ).first()
+        if record is None:
+            raise ValueError(f"Dataset {dataset_id} has no version {version}")
+        return record
+    
+    @unit_of_work
+    def get_dataset_hash(self, dataset_id):
+        try:
+            return self.session.query(Dataset.content_hash).filter(Dataset.id == dataset_id).scalar()
+        except Exception as e:
+            raise e
+    
+    @unit_of_work
+    def get_current_version(self, dataset_id):
+        try:
+            return self.session.query(Dataset.current_version).filter(Dataset.id == dataset_id).scalar()
+        except Exception as e:
+            raise e
+    
+    @unit_of_work
+    def list_versions(self, dataset_id):
+        try:
+            versions = self.session.query(
+                DatasetVersion.version,
+                DatasetVersion.parent_version,
+                DatasetVersion.content_hash,
+                DatasetVersion.row_count,
+                DatasetVersion.partitions_written,
+                DatasetVersion.created_at
+            ).filter(DatasetVersion.dataset_id == dataset_id).order_by(DatasetVersion.version.desc()).all()
+            
+            return [{
+                'version': v.version,
+                'parent_version': v.parent_version,
+                'content_hash': v.content_hash,
+                'rows': v.row_count,
+                'partitions_written': v.partitions_written,
+                'created_at': v.created_at
+            } for v in versions]
+        except Exception as e:
+            raise e
+    
+    def load_dataset(self, dataset_id, start=None, end=None, columns=None, version=None):
+        if self.cache is not None and version is None:
+            df = self._load_cached(dataset_id, start, end, columns)
+            if df is not None:
+                return df
+        
+        plan = self.plan_dataset_load(dataset_id, start, end, columns, version)
+        df = assemble_frames(plan)
+        
+        # Only full loads of the current version populate the cache
+        if self.cache is not None and plan is not None and plan['content_hash'] \
+                and start is None and end is None and columns is None:
+            self.cache.put(dataset_id, plan['content_hash'], df)
+        return df
+    
+    def _load_cached(self, dataset_id, start=None, end=None, columns=None):
+        key = self._cache_key(dataset_id)
+        if key is None or not key.content_hash:
+            return None
+        
+        has_range = start is not None or end is not None
+        date_column = key.partition_column
+        read_columns = list(columns) if columns is not None else None
+        if has_range and read_columns is not None:
+            if date_column is None:
+                read_columns = None
+            elif date_column not in read_columns:
+                read_columns.append(date_column)
+        
+        df = self.cache.get(dataset_id, key.content_hash, columns=read_columns)
+        if df is None:
+            return None
+        
+        if has_range:
+            if date_column is None:
+                date_column = choose_partition_column(df)
+            df = filter_date_range(df, date_column, start, end).reset_index(drop=True)
+        if columns is not None:
+            df = df[list(columns)]
+        return df
+    
+    @unit_of_work
+    def _cache_key(self, dataset_id):
+        try:
+            return self.session.query(
+                Dataset.content_hash, Dataset.partition_column
+            ).filter(Dataset.id == dataset_id).first()
+        except Exception as e:
+            raise e
+    
+    @unit_of_work
+    def plan_dataset_load(self, dataset_id, start=None, end=None, columns=None, version=None):
+        try:
+            dataset = self.session.query(Dataset).options(
+                defer(Dataset.data),
+                defer(Dataset.data_blob)
+            ).filter(Dataset.id == dataset_id).first()
+            
+            if not dataset:
+                return None
+            
+            has_range = start is not None or end is not None
+            date_column = dataset.partition_column
+            column_names = (dataset.dataset_metadata or {}).get('column_names', [])
+            ordered = 'next_row' in (dataset.dataset_metadata or {})
+            content_hash = dataset.content_hash
+            
+            if version is not None and version != dataset.current_version:
+                record = self._get_version(dataset.id, version)
+                content_hash = None
+                date_column = record.partition_column
+                column_names = (record.dataset_metadata or {}).get('column_names', [])
+                ordered = 'next_row' in (record.dataset_metadata or {})
+                manifest = record.manifest
+            elif dataset.current_version is not None:
+                manifest = self._get_version(dataset.id, dataset.current_version).manifest
+            else:
+                manifest = None
+            
+            if dataset.partitioned:
+                query = self.session.query(
+                    DatasetPartition.data, DatasetPartition.storage_format
+                ).filter(DatasetPartition.dataset_id == dataset.id)
+                if manifest is not None:
+                    partition_ids = [pid for entry in manifest.values() for pid in entry['ids']]
+                    query = query.filter(DatasetPartition.id.in_(partition_ids))
+                if has_range and date_column:
+                    query = query.filter(DatasetPartition.min_date.isnot(None))
+                    if start is not None:
+                        query = query.filter(DatasetPartition.max_date >= pd.Timestamp(start).to_pydatetime())
+                    if end is not None:
+                        query = query.filter(DatasetPartition.min_date <= pd.Timestamp(end).to_pydatetime())
+                payloads = [tuple(row) for row in query.order_by(DatasetPartition.partition_start, DatasetPartition.id)]
+            elif dataset.data_blob is not None:
+                payloads = [(dataset.data_blob, dataset.storage_format)]
+            elif dataset.data:
+                payloads = [(dataset.data, dataset.storage_format if dataset.storage_format in TEXT_FORMATS else 'json')]
+            else:
+                payloads = []
+            
+            read_columns = list(columns) if columns is not None else None
+            if has_range and read_columns is not None:
+                if date_column is None:
+                    read_columns = None
+                elif date_column not in read_columns:
+                    read_columns.append(date_column)
+            if read_columns is not None and ordered and dataset.partitioned:
+                read_columns.append(ROW_ORDER_COLUMN)
+            
+            return {
+                'payloads': payloads,
+                'date_column': date_column,
+                'column_names': column_names,
+                'read_columns': read_columns,
+                'start': start,
+                'end': end,
+                'columns': columns,
+                'content_hash': content_hash
+            }
         except Exception as e:
             raise e
     
+    @unit_of_work
+    def compact_dataset(self, dataset_id, keep_versions=None, storage_format=None):
+        try:
+            dataset = self.session.query(Dataset).options(
+                defer(Dataset.data),
+                defer(Dataset.data_blob)
+            ).filter(Dataset.id == dataset_id).first()
+            
+            if not dataset or not dataset.partitioned or dataset.current_version is None:
+                return None
+            
+            current = self._get_version(dataset.id, dataset.current_version)
+            manifest = dict(current.manifest)
+            
+            merged = 0
+            for key, entry in list(manifest.items()):
+                if len(entry['ids']) < 2:
+                    continue
+                segments = self.session.query(DatasetPartition).filter(
+                    DatasetPartition.id.in_(entry['ids'])
+                ).order_by(DatasetPartition.id).all()
+                frame = pd.concat([segment.to_dataframe() for segment in segments], ignore_index=True)
+                dated = [segment for segment in segments if segment.min_date is not None]
+                chunk = {
+                    'partition_key': key,
+                    'partition_start': segments[0].partition_start,
+                    'min_date': min(segment.min_date for segment in dated) if dated else None,
+                    'max_date': max(segment.max_date for segment in dated) if dated else None,
+                    'frame': frame,
+                    'column_hashes': column_hashes(frame)
+                }
+                chunk['content_hash'] = combine_hashes(chunk['column_hashes'].items())
+                partition = self._new_partition(dataset, chunk, current.version, storage_format)
+                self.session.flush()
+                manifest[key] = self._manifest_entry([partition.id], chunk)
+                merged += 1
+            
+            if merged:
+                # Merged segments hash like a fresh save of the same rows
+                metadata = dict(current.dataset_metadata or {})
+                metadata['content_hash'] = hash_manifest(metadata['dtypes'], manifest)
+                metadata['column_hashes'] = manifest_column_hashes(metadata['column_names'], manifest)
+                current.manifest = manifest
+                current.content_hash = metadata['content_hash']
+                current.dataset_metadata = metadata
+                dataset.content_hash = metadata['content_hash']
+                dataset.dataset_metadata = metadata
+            
+            pruned = 0
+            if keep_versions is not None:
+                pinned = {
+                    v for (v,) in self.session.query(ForecastResult.dataset_version).filter(
+                        ForecastResult.dataset_id == dataset.id,
+                        ForecastResult.dataset_version.isnot(None)
+                    ).distinct()
+                }
+                old_versions = self.session.query(DatasetVersion).filter(
+                    DatasetVersion.dataset_id == dataset.id,
+                    DatasetVersion.version <= current.version - max(keep_versions, 1)
+                ).all()
+                for record in old_versions:
+                    if record.version not in pinned:
+                        self.session.delete(record)
+                        pruned += 1
+            
+            self.session.flush()
+            referenced = {
+                pid
+                for (version_manifest,) in self.session.query(DatasetVersion.manifest).filter(
+                    DatasetVersion.dataset_id == dataset.id
+                )
+                for entry in version_manifest.values()
+                for pid in entry['ids']
+            }
+            orphaned = [
+                pid for (pid,) in self.session.query(DatasetPartition.id).filter(
+                    DatasetPartition.dataset_id == dataset.id
+                ) if pid not in referenced
+            ]
+            if orphaned:
+                self.session.query(DatasetPartition).filter(
+                    DatasetPartition.id.in_(orphaned)
+                ).delete(synchronize_session=False)
+            
+            self._commit()
+            return {
+                'merged_partitions': merged,
+                'pruned_versions': pruned,
+                'deleted_partitions': len(orphaned)
+            }
+        except Exception as e:
+            self.session.rollback()
+            raise e
+    
+    @unit_of_work
+    def compact_datasets(self, keep_versions=None, storage_format=None):
+        try:
+            dataset_ids = [dataset_id for (dataset_id,) in self.session.query(Dataset.id).filter(Dataset.partitioned == True)]
+            results = {}
+            for dataset_id in dataset_ids:
+                results[dataset_id] = self.compact_dataset(dataset_id, keep_versions, storage_format)
+                self.session.expunge_all()
+            return results
+        except Exception as e:
+            raise e
+    
+    @unit_of_work
+    def migrate_legacy_datasets(self, storage_format=None):
+        try:
+            legacy = self.session.query(Dataset.id).filter(
+                (Dataset.partitioned.is_(None)) | (Dataset.partitioned == False)
+            ).all()
+            
+            migrated = 0
+            for (dataset_id,) in legacy:
+                dataset = self.session.query(Dataset).filter(Dataset.id == dataset_id).first()
+                df = dataset.to_dataframe()
+                if df is not None:
+                    self._write_partitions(dataset, prepare_dataset(df), storage_format)
+                    migrated += 1
+                self._commit()
+                self.session.expunge_all()
+            
+            return migrated
+        except Exception as e:
+            self.session.rollback()
+            raise e
+    
+    @unit_of_work
     def get_dataset_by_name(self, name):
         try:
-            dataset = self.session.query(Dataset).filter(Dataset.name == name).first()
-            if dataset:
-                return dataset.to_dataframe(), dataset.id
+            dataset_id = self.session.query(Dataset.id).filter(Dataset.name == name).scalar()
+            if dataset_id is not None:
+                return self.load_dataset(dataset_id), dataset_id
             return None, None
         except Exception as e:
             raise e
     
-    def list_datasets(self):
+    @unit_of_work
+    def changed_datasets(self, since=None, include=(), after_id=0, limit=None):
+        try:
+            # Keyset-paged by id; with `since`, only datasets written since then or listed in `include`
+            query = self.session.query(Dataset.id, Dataset.content_hash, Dataset.updated_at).filter(Dataset.id > after_id)
+            if since is not None:
+                query = query.filter(or_(Dataset.updated_at >= since, Dataset.id.in_(list(include))))
+            query = query.order_by(Dataset.id)
+            if limit is not None:
+                query = query.limit(limit)
+            return [{'id': d.id, 'content_hash': d.content_hash, 'updated_at': d.updated_at} for d in query.all()]
+        except Exception as e:
+            raise e
+    
+    @unit_of_work
+    def list_datasets(self, search=None, sort_by='updated_at', descending=True, limit=None, offset=0):
         try:
-            datasets = self.session.query(Dataset).order_by(Dataset.updated_at.desc()).all()
+            sort_column = DATASET_SORT_COLUMNS.get(sort_by)
+            if sort_column is None:
+                raise ValueError(f"Unsupported sort column '{sort_by}'. Choose one of {list(DATASET_SORT_COLUMNS)}.")
+            
+            query = self._dataset_catalog_query(search).with_entities(
+                Dataset.id,
+                Dataset.name,
+                Dataset.description,
+                Dataset.source_type,
+                Dataset.row_count,
+                Dataset.content_hash,
+                Dataset.created_at,
+                Dataset.updated_at
+            ).order_by(sort_column.desc() if descending else sort_column.asc(), Dataset.id.desc())
+            
+            if offset:
+                query = query.offset(offset)
+            if limit is not None:
+                query = query.limit(limit)
+            
+            datasets = query.all()
+            
+            legacy_ids = [d.id for d in datasets if d.row_count is None]
+            legacy_rows = {}
+            if legacy_ids:
+                legacy_rows = {
+                    dataset_id: (metadata or {}).get('rows', 0)
+                    for dataset_id, metadata in self.session.query(
+                        Dataset.id, Dataset.dataset_metadata
+                    ).filter(Dataset.id.in_(legacy_ids))
+                }
+            
             return [{
                 'id': d.id,
                 'name': d.name,
                 'description': d.description,
                 'source_type': d.source_type,
-                'rows': d.dataset_metadata.get('rows', 0) if d.dataset_metadata else 0,
+                'rows': d.row_count if d.row_count is not None else legacy_rows.get(d.id, 0),
+                'content_hash': d.content_hash,
                 'created_at': d.created_at,
                 'updated_at': d.updated_at
             } for d in datasets]
         except Exception as e:
             raise e
     
+    @unit_of_work
+    def count_datasets(self, search=None):
+        try:
+            return self._dataset_catalog_query(search).with_entities(func.count(Dataset.id)).scalar()
+        except Exception as e:
+            raise e
+    
+    def _dataset_catalog_query(self, search=None):
+        query = self.session.query(Dataset)
+        if search:
+            query = query.filter(Dataset.name.ilike(f'%{search.strip()}%'))
+        return query
+    
+    @unit_of_work
     def delete_dataset(self, dataset_id):
         try:
             dataset = self.session.query(Dataset).filter(Dataset.id == dataset_id).first()
             if dataset:
+                self.session.query(DatasetPartition).filter(
+                    DatasetPartition.dataset_id == dataset_id
+                ).delete(synchronize_session=False)
+                self.session.query(DatasetVersion).filter(
+                    DatasetVersion.dataset_id == dataset_id
+                ).delete(synchronize_session=False)
                 self.session.delete(dataset)
-                self.session.commit()
+                self._commit_with_invalidation(dataset_id, (None, None))
                 return True
             return False
         except Exception as e:
             self.session.rollback()
             raise e
     
-    def save_forecast(self, dataset_id, metric_name, method, forecast_data, confidence_level="Medium", r2_score=None, parameters=None):
+    @unit_of_work
+    def save_forecast(self, dataset_id, metric_name, method, forecast_data, confidence_level="Medium", r2_score=None, parameters=None,
+                      dataset_version=None, fingerprint=None, model_state=None):
         try:
+            if dataset_version is None and dataset_id is not None:
+                dataset_version = self.session.query(Dataset.current_version).filter(Dataset.id == dataset_id).scalar()
+            
             forecast = ForecastResult(
                 dataset_id=dataset_id,
+                dataset_version=dataset_version,
                 metric_name=metric_name,
                 method=method,
-                forecast_data=json.dumps(forecast_data),
+                forecast_data=json.dumps(forecast_data, default=str),
                 confidence_level=confidence_level,
                 r2_score=r2_score,
-                parameters=parameters or {}
+                parameters=parameters or {},
+                fingerprint=fingerprint,
+                model_state=model_state
             )
+            if model_state is not None:
+                # Only the latest fitted state per metric and method is kept
+                self.session.query(ForecastResult).filter(
+                    ForecastResult.dataset_id == dataset_id,
+                    ForecastResult.metric_name == metric_name,
+                    ForecastResult.method == method,
+                    ForecastResult.model_state.isnot(None)
+                ).update({ForecastResult.model_state: None}, synchronize_session=False)
             self.session.add(forecast)
-            self.session.commit()
+            self._commit()
+            return forecast.id
+        except Exception as e:
+            self.session.rollback()
+            raise e
+    
+    @unit_of_work
+    def save_model_state(self, dataset_id, metric_name, method, forecast_data, model_state, confidence_level="Medium",
+                         r2_score=None, parameters=None):
+        try:
+            # The latest fitted state per metric and method lives on one row that is updated in place
+            forecast = self.session.query(ForecastResult).filter(
+                ForecastResult.dataset_id == dataset_id,
+                ForecastResult.metric_name == metric_name,
+                ForecastResult.method == method,
+                ForecastResult.model_state.isnot(None)
+            ).order_by(ForecastResult.created_at.desc()).first()
+            
+            if forecast is None:
+                return self.save_forecast(dataset_id, metric_name, method, forecast_data, confidence_level, r2_score,
+                                          parameters, model_state=model_state)
+            
+            forecast.dataset_version = self.session.query(Dataset.current_version).filter(Dataset.id == dataset_id).scalar()
+            forecast.forecast_data = json.dumps(forecast_data, default=str)
+            forecast.confidence_level = confidence_level
+            forecast.r2_score = r2_score
+            forecast.parameters = parameters or {}
+            forecast.model_state = model_state
+            forecast.created_at = datetime.utcnow()
+            self._commit()
             return forecast.id
         except Exception as e:
             self.session.rollback()
             raise e
     
+    @unit_of_work
+    def get_cached_forecast(self, fingerprint):
+        try:
+            forecast = self.session.query(ForecastResult).filter(
+                ForecastResult.fingerprint == fingerprint
+            ).order_by(ForecastResult.created_at.desc()).first()
+            
+            if forecast is None:
+                return None
+            return {
+                'dataset_id': forecast.dataset_id,
+                'data': forecast.to_dict(),
+                'created_at': forecast.created_at
+            }
+        except Exception as e:
+            raise e
+    
+    @unit_of_work
+    def save_cached_forecast(self, fingerprint, dataset_id, metric_name, method, forecast_data, confidence_level="Medium",
+                             r2_score=None, parameters=None):
+        try:
+            # One row per fingerprint: recomputing the same forecast rewrites it instead of adding another
+            forecast = self.session.query(ForecastResult).filter(
+                ForecastResult.fingerprint == fingerprint,
+                ForecastResult.model_state.is_(None)
+            ).order_by(ForecastResult.created_at.desc()).first()
+            
+            if forecast is None:
+                return self.save_forecast(dataset_id, metric_name, method, forecast_data, confidence_level, r2_score,
+                                          parameters, fingerprint=fingerprint)
+            
+            forecast.dataset_id = dataset_id
+            forecast.dataset_version = None
+            if dataset_id is not None:
+                forecast.dataset_version = self.session.query(Dataset.current_version).filter(Dataset.id == dataset_id).scalar()
+            forecast.metric_name = metric_name
+            forecast.method = method
+            forecast.forecast_data = json.dumps(forecast_data, default=str)
+            forecast.confidence_level = confidence_level
+            forecast.r2_score = r2_score
+            forecast.parameters = parameters or {}
+            forecast.created_at = datetime.utcnow()
+            self._commit()
+            return forecast.id
+        except Exception as e:
+            self.session.rollback()
+            raise e
+    
+    @unit_of_work
+    def delete_cached_forecasts(self, dataset_id=None, before=None):
+        try:
+            # Cached rows are recomputable, so stale ones are deleted; saved forecasts and model states are kept
+            query = self.session.query(ForecastResult).filter(
+                ForecastResult.fingerprint.isnot(None),
+                ForecastResult.model_state.is_(None)
+            )
+            if dataset_id is not None:
+                query = query.filter(ForecastResult.dataset_id == dataset_id)
+            if before is not None:
+                query = query.filter(ForecastResult.created_at < before)
+            deleted = query.delete(synchronize_session=False)
+            self._commit()
+            return deleted
+        except Exception as e:
+            self.session.rollback()
+            raise e
+    
+    @unit_of_work
+    def get_model_state(self, dataset_id, metric_name, method):
+        try:
+            forecast = self.session.query(ForecastResult).filter(
+                ForecastResult.dataset_id == dataset_id,
+                ForecastResult.metric_name == metric_name,
+                ForecastResult.method == method,
+                ForecastResult.model_state.isnot(None)
+            ).order_by(ForecastResult.created_at.desc()).first()
+            
+            if forecast is None:
+                return None
+            return forecast.model_state
+        except Exception as e:
+            raise e
+    
+    @unit_of_work
+    def clear_model_states(self, dataset_id, start=None):
+        try:
+            stale = []
+            for forecast in self.session.query(ForecastResult).filter(
+                ForecastResult.dataset_id == dataset_id,
+                ForecastResult.model_state.isnot(None)
+            ):
+                last_date = (forecast.model_state or {}).get('last_date')
+                # States that end before the changed range can still absorb the new rows
+                if start is not None and last_date is not None and pd.Timestamp(last_date) < pd.Timestamp(start):
+                    continue
+                stale.append(forecast.id)
+            if stale:
+                self.session.query(ForecastResult).filter(
+                    ForecastResult.id.in_(stale)
+                ).update({ForecastResult.model_state: None}, synchronize_session=False)
+            self._commit()
+            return len(stale)
+        except Exception as e:
+            self.session.rollback()
+            raise e
+    
+    @unit_of_work
     def get_forecast_history(self, dataset_id, metric_name):
         try:
             forecasts = self.session.query(ForecastResult).filter(
@@ -107,6 +1112,7 @@ class DataStorage:
             return [{
                 'id': f.id,
                 'method': f.method,
+                'dataset_version': f.dataset_version,
                 'confidence_level': f.confidence_level,
                 'r2_score': f.r2_score,
                 'created_at': f.created_at,
@@ -115,6 +1121,164 @@ class DataStorage:
         except Exception as e:
             raise e
     
+    @unit_of_work
+    def create_job(self, job_key, kind, dataset_id=None, metric_name=None, method=None, parameters=None):
+        try:
+            job = ForecastJob(
+                job_key=job_key,
+                kind=kind,
+                status='queued',
+                dataset_id=dataset_id,
+                metric_name=metric_name,
+                method=method,
+                parameters=parameters or {},
+                progress=0.0,
+                message='Queued',
+                subscribers=1
+            )
+            self.session.add(job)
+            self._commit()
+            return job.id
+        except Exception as e:
+            self.session.rollback()
+            raise e
+    
+    @unit_of_work
+    def find_active_job(self, job_key, stale_after=None):
+        try:
+            query = self.session.query(ForecastJob.id).filter(
+                ForecastJob.job_key == job_key,
+                ForecastJob.status.in_(('queued', 'running')),
+                ForecastJob.cancel_requested.isnot(True)
+            )
+            if stale_after is not None:
+                # A job whose owner stopped reporting progress is treated as abandoned
+                query = query.filter(ForecastJob.updated_at >= datetime.utcnow() - pd.Timedelta(seconds=stale_after))
+            return query.order_by(ForecastJob.created_at.desc()).limit(1).scalar()
+        except Exception as e:
+            raise e
+    
+    @unit_of_work
+    def attach_job(self, job_key, stale_after=None):
+        try:
+            job_id = self.find_active_job(job_key, stale_after)
+            if job_id is None:
+                return None
+            # Counted in the table so requesters in every process see the same number
+            attached = self.session.query(ForecastJob).filter(
+                ForecastJob.id == job_id,
+                ForecastJob.status.in_(('queued', 'running')),
+                ForecastJob.cancel_requested.isnot(True)
+            ).update({ForecastJob.subscribers: func.coalesce(ForecastJob.subscribers, 1) + 1}, synchronize_session=False)
+            self._commit()
+            return job_id if attached else None
+        except Exception as e:
+            self.session.rollback()
+            raise e
+    
+    @unit_of_work
+    def release_job(self, job_id):
+        try:
+            # Returns True once the last requester has let go and cancellation was requested
+            released = self.session.query(ForecastJob).filter(
+                ForecastJob.id == job_id,
+                ForecastJob.subscribers > 1
+            ).update({ForecastJob.subscribers: ForecastJob.subscribers - 1}, synchronize_session=False)
+            if not released:
+                self.session.query(ForecastJob).filter(ForecastJob.id == job_id).update({
+                    ForecastJob.subscribers: 0,
+                    ForecastJob.cancel_requested: True,
+                    ForecastJob.message: 'Cancelling',
+                    ForecastJob.updated_at: datetime.utcnow()
+                }, synchronize_session=False)
+            self._commit()
+            return not released
+        except Exception as e:
+            self.session.rollback()
+            raise e
+    
+    @unit_of_work
+    def expire_job(self, job_id, stale_before):
+        try:
+            # Only a job still unfinished and silent since stale_before is failed, so a late report wins the race
+            expired = self.session.query(ForecastJob).filter(
+                ForecastJob.id == job_id,
+                ForecastJob.status.in_(('queued', 'running')),
+                ForecastJob.updated_at < stale_before
+            ).update({
+                ForecastJob.status: 'failed',
+                ForecastJob.message: 'Abandoned',
+                ForecastJob.error: 'The process running this job stopped reporting progress.',
+                ForecastJob.finished_at: datetime.utcnow(),
+                ForecastJob.updated_at: datetime.utcnow()
+            }, synchronize_session=False)
+            self._commit()
+            return bool(expired)
+        except Exception as e:
+            self.session.rollback()
+            raise e
+    
+    @unit_of_work
+    def prune_jobs(self, before):
+        try:
+            # Results live in the job row, so old jobs are dropped rather than kept forever
+            deleted = self.session.query(ForecastJob).filter(
+                ForecastJob.updated_at < before
+            ).delete(synchronize_session=False)
+            self._commit()
+            return deleted
+        except Exception as e:
+            self.session.rollback()
+            raise e
+    
+    @unit_of_work
+    def get_job(self, job_id):
+        try:
+            job = self.session.query(ForecastJob).filter(ForecastJob.id == job_id).first()
+            if job is None:
+                return None
+            return {
+                'id': job.id,
+                'job_key': job.job_key,
+                'kind': job.kind,
+                'status': job.status,
+                'dataset_id': job.dataset_id,
+                'metric_name': job.metric_name,
+                'method': job.method,
+                'parameters': job.parameters or {},
+                'progress': job.progress or 0.0,
+                'message': job.message,
+                'error': job.error,
+                'cancel_requested': bool(job.cancel_requested),
+                'subscribers': job.subscribers if job.subscribers is not None else 1,
+                'created_at': job.created_at,
+                'started_at': job.started_at,
+                'finished_at': job.finished_at,
+                'updated_at': job.updated_at,
+                'result': job.to_dict()
+            }
+        except Exception as e:
+            raise e
+    
+    @unit_of_work
+    def update_job(self, job_id, **kwargs):
+        try:
+            job = self.session.query(ForecastJob).filter(ForecastJob.id == job_id).first()
+            if job:
+                if 'result' in kwargs:
+                    job.result_data = json.dumps(kwargs.pop('result'), default=str)
+                for key, value in kwargs.items():
+                    if hasattr(job, key):
+                        setattr(job, key, value)
+                job.updated_at = datetime.utcnow()
+                self._commit()
+                return True
+            return False
+        except Exception as e:
+            self.session.rollback()
+            raise e
+    
+    @unit_of_work
     def save_alert(self, name, metric_name, condition_type, threshold_value, email_recipients):
         try:
             alert = Alert(
@@ -125,12 +1289,13 @@ class DataStorage:
                 email_recipients=email_recipients
             )
             self.session.add(alert)
-            self.session.commit()
+            self._commit()
             return alert.id
         except Exception as e:
             self.session.rollback()
             raise e
     
+    @unit_of_work
     def list_alerts(self, active_only=True):
         try:
             query = self.session.query(Alert)
@@ -152,6 +1317,7 @@ class DataStorage:
         except Exception as e:
             raise e
     
+    @unit_of_work
     def update_alert(self, alert_id, **kwargs):
         try:
             alert = self.session.query(Alert).filter(Alert.id == alert_id).first()
@@ -160,25 +1326,27 @@ class DataStorage:
                     if hasattr(alert, key):
                         setattr(alert, key, value)
                 alert.updated_at = datetime.utcnow()
-                self.session.commit()
+                self._commit()
                 return True
             return False
         except Exception as e:
             self.session.rollback()
             raise e
     
+    @unit_of_work
     def delete_alert(self, alert_id):
         try:
             alert = self.session.query(Alert).filter(Alert.id == alert_id).first()
             if alert:
                 self.session.delete(alert)
-                self.session.commit()
+                self._commit()
                 return True
             return False
         except Exception as e:
             self.session.rollback()
             raise e
     
+    @unit_of_work
     def save_analytics_result(self, dataset_id, analysis_type, result_data, parameters=None):
         try:
             result = AnalyticsResult(
@@ -188,12 +1356,50 @@ class DataStorage:
                 parameters=parameters or {}
             )
             self.session.add(result)
-            self.session.commit()
+            self._commit()
             return result.id
         except Exception as e:
             self.session.rollback()
             raise e
     
+    @unit_of_work
+    def analytics_result_hashes(self, dataset_ids, analysis_type):
+        try:
+            # Content hashes each dataset has stored results for, fetched for a whole page of datasets at once
+            hashes = {}
+            for dataset_id, parameters in self.session.query(AnalyticsResult.dataset_id, AnalyticsResult.parameters).filter(
+                AnalyticsResult.dataset_id.in_(list(dataset_ids)),
+                AnalyticsResult.analysis_type == analysis_type
+            ):
+                hashes.setdefault(dataset_id, set()).add((parameters or {}).get('content_hash'))
+            return hashes
+        except Exception as e:
+            raise e
+    
+    @unit_of_work
+    def get_analytics_result(self, dataset_id, analysis_type, content_hash=None):
+        try:
+            results = self.session.query(AnalyticsResult).filter(
+                AnalyticsResult.dataset_id == dataset_id,
+                AnalyticsResult.analysis_type == analysis_type
+            ).order_by(AnalyticsResult.created_at.desc(), AnalyticsResult.id.desc())
+            
+            for result in results:
+                parameters = result.parameters or {}
+                # A result computed from other data is stale even if its range was not invalidated
+                if content_hash is not None and parameters.get('content_hash') != content_hash:
+                    continue
+                return {
+                    'id': result.id,
+                    'data': result.to_dict(),
+                    'parameters': parameters,
+                    'created_at': result.created_at
+                }
+            return None
+        except Exception as e:
+            raise e
+    
+    @unit_of_work
     def save_data_connection(self, name, connection_type, connection_config):
         try:
             connection = DataConnection(
@@ -202,12 +1408,13 @@ class DataStorage:
                 connection_config=connection_config
             )
             self.session.add(connection)
-            self.session.commit()
+            self._commit()
             return connection.id
         except Exception as e:
             self.session.rollback()
             raise e
     
+    @unit_of_work
     def list_data_connections(self):
         try:
             connections = self.session.query(DataConnection).filter(
@@ -223,6 +1430,3 @@ class DataStorage:
             } for c in connections]
         except Exception as e:
             raise e
-    
-    def __del__(self):
-        self.session.close()
@@ -1,10 +1,12 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float, Boolean, JSON
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, Text, DateTime, Float, Boolean, JSON, LargeBinary, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
 from datetime import datetime
 import pandas as pd
 import json
+from utils.serialization import TEXT_FORMATS, encode_dataframe, deserialize_dataframe
 
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
@@ -13,12 +15,54 @@ if not DATABASE_URL:
     db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'dashboard_data.db')
     DATABASE_URL = f'sqlite:///{db_path}'
 
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '10'))
+POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', '30'))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': SQLITE_BUSY_TIMEOUT_MS,
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+    'mmap_size': 268435456
+}
+
+def _is_memory_sqlite(url):
+    return url.partition('://')[2] in ('', '/:memory:') or 'mode=memory' in url
+
+def sqlite_pragma_hook(url):
+    # The hook checks the URL of the engine it is attached to, not the module default
+    memory = _is_memory_sqlite(str(url))
+    
+    def apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_PRAGMAS.items():
+            if pragma == 'journal_mode' and memory:
+                continue
+            cursor.execute(f'PRAGMA {pragma}={value}')
+        cursor.close()
+    return apply_sqlite_pragmas
+
 # Different connection args for SQLite vs other databases
 if DATABASE_URL.startswith('sqlite'):
-    engine = create_engine(DATABASE_URL, connect_args={'check_same_thread': False})
+    sqlite_args = {'connect_args': {'check_same_thread': False, 'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    if not _is_memory_sqlite(DATABASE_URL):
+        sqlite_args.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT)
+    engine = create_engine(DATABASE_URL, **sqlite_args)
+    event.listen(engine, 'connect', sqlite_pragma_hook(DATABASE_URL))
 else:
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_recycle=3600)
-SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    engine = create_engine(
+        DATABASE_URL,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT
+    )
+SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = scoped_session(SessionFactory)
 Base = declarative_base()
 
 class Dataset(Base):
@@ -29,43 +73,132 @@ class Dataset(Base):
     description = Column(Text)
     source_type = Column(String(50))
     data = Column(Text)
+    data_blob = Column(LargeBinary)
+    storage_format = Column(String(20), default='json')
+    partitioned = Column(Boolean, default=False)
+    partition_column = Column(String(255))
+    partition_freq = Column(String(10))
+    row_count = Column(Integer)
+    content_hash = Column(String(64))
+    current_version = Column(Integer)
     dataset_metadata = Column(JSON)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
-    def to_dataframe(self):
+    def to_dataframe(self, columns=None):
+        if self.data_blob is not None:
+            return deserialize_dataframe(self.data_blob, self.storage_format, columns=columns)
         if self.data:
-            return pd.read_json(self.data)
+            return deserialize_dataframe(self.data, self.storage_format if self.storage_format in TEXT_FORMATS else 'json',
+                                         columns=columns)
         return None
     
+    def set_dataframe(self, df, storage_format=None):
+        payload, storage_format = encode_dataframe(df, storage_format)
+        if storage_format in TEXT_FORMATS:
+            self.data = payload
+            self.data_blob = None
+        else:
+            self.data = None
+            self.data_blob = payload
+        self.storage_format = storage_format
+        self.partitioned = False
+        self.partition_column = None
+        self.partition_freq = None
+        self.row_count = len(df)
+        self.content_hash = None
+        self.dataset_metadata = Dataset.build_metadata(df)
+    
     @staticmethod
-    def from_dataframe(df, name, description="", source_type="upload"):
-        data_json = df.to_json(orient='records', date_format='iso')
-        dataset_metadata = {
+    def build_metadata(df):
+        return {
             'rows': len(df),
             'columns': len(df.columns),
             'column_names': list(df.columns),
             'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()}
         }
-        return Dataset(
+    
+    @staticmethod
+    def from_dataframe(df, name, description="", source_type="upload", storage_format=None):
+        dataset = Dataset(
             name=name,
             description=description,
-            source_type=source_type,
-            data=data_json,
-            dataset_metadata=dataset_metadata
+            source_type=source_type
         )
+        dataset.set_dataframe(df, storage_format)
+        return dataset
+
+class DatasetPartition(Base):
+    __tablename__ = 'dataset_partitions'
+    __table_args__ = (
+        Index('ix_dataset_partitions_dataset_start', 'dataset_id', 'partition_start'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, nullable=False, index=True)
+    partition_key = Column(String(32), nullable=False)
+    partition_start = Column(DateTime)
+    min_date = Column(DateTime)
+    max_date = Column(DateTime)
+    row_count = Column(Integer)
+    content_hash = Column(String(64))
+    version = Column(Integer)
+    storage_format = Column(String(20))
+    data = Column(LargeBinary)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def to_dataframe(self, columns=None):
+        return deserialize_dataframe(self.data, self.storage_format, columns=columns)
+    
+    @staticmethod
+    def from_chunk(dataset_id, chunk, storage_format=None):
+        payload, storage_format = encode_dataframe(chunk['frame'], storage_format)
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        return DatasetPartition(
+            dataset_id=dataset_id,
+            partition_key=chunk['partition_key'],
+            partition_start=chunk['partition_start'],
+            min_date=chunk['min_date'],
+            max_date=chunk['max_date'],
+            row_count=len(chunk['frame']),
+            content_hash=chunk.get('content_hash'),
+            storage_format=storage_format,
+            data=payload
+        )
+
+class DatasetVersion(Base):
+    __tablename__ = 'dataset_versions'
+    __table_args__ = (
+        Index('ix_dataset_versions_dataset_version', 'dataset_id', 'version', unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False)
+    parent_version = Column(Integer)
+    partition_column = Column(String(255))
+    manifest = Column(JSON)
+    content_hash = Column(String(64))
+    row_count = Column(Integer)
+    partitions_written = Column(Integer)
+    dataset_metadata = Column(JSON)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 class ForecastResult(Base):
     __tablename__ = 'forecast_results'
     
     id = Column(Integer, primary_key=True, index=True)
     dataset_id = Column(Integer, index=True)
+    dataset_version = Column(Integer)
     metric_name = Column(String(255), nullable=False)
     method = Column(String(100), nullable=False)
     forecast_data = Column(Text)
     confidence_level = Column(String(50))
     r2_score = Column(Float)
     parameters = Column(JSON)
+    fingerprint = Column(String(64), index=True)
+    model_state = Column(JSON(none_as_null=True))
     created_at = Column(DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -73,6 +206,33 @@ class ForecastResult(Base):
             return json.loads(self.forecast_data)
         return None
 
+class ForecastJob(Base):
+    __tablename__ = 'forecast_jobs'
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_key = Column(String(64), index=True)
+    kind = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default='queued', index=True)
+    dataset_id = Column(Integer, index=True)
+    metric_name = Column(String(255))
+    method = Column(String(100))
+    parameters = Column(JSON)
+    progress = Column(Float, default=0.0)
+    message = Column(String(255))
+    result_data = Column(Text)
+    error = Column(Text)
+    cancel_requested = Column(Boolean, default=False)
+    subscribers = Column(Integer, default=1)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        if self.result_data:
+            return json.loads(self.result_data)
+        return None
+
 class Alert(Base):
     __tablename__ = 'alerts'
     
@@ -116,7 +276,28 @@ class DataConnection(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        create_schema(connection)
+
+def create_schema(connection):
+    Base.metadata.create_all(bind=connection)
+    migrate_schema(connection)
+
+def migrate_schema(connection):
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {col['name'] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection)
 
 def get_db():
     db = SessionLocal()
@@ -125,5 +306,17 @@ def get_db():
     finally:
         db.close()
 
+@contextmanager
+def session_scope():
+    session = SessionFactory()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
 def close_db():
     SessionLocal.remove()
@@ -0,0 +1,150 @@
+import os
+import tempfile
+import threading
+
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+DATASET_CACHE_DIR = os.environ.get(
+    'DATASET_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), '.dataset_cache')
+)
+DATASET_CACHE_BYTES = int(os.environ.get('DATASET_CACHE_BYTES', str(2 * 1024 ** 3)))
+
+CACHE_SUFFIX = '.arrow'
+
+class DatasetCache:
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or DATASET_CACHE_DIR
+        self.max_bytes = DATASET_CACHE_BYTES if max_bytes is None else max_bytes
+        self.enabled = PYARROW_AVAILABLE and self.max_bytes > 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, dataset_id, content_hash):
+        return os.path.join(self.cache_dir, f'{dataset_id}-{content_hash}{CACHE_SUFFIX}')
+
+    def _entries(self, dataset_id=None):
+        prefix = f'{dataset_id}-' if dataset_id is not None else ''
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CACHE_SUFFIX) or not name.startswith(prefix):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def get(self, dataset_id, content_hash, columns=None):
+        if not self.enabled or not content_hash:
+            return None
+
+        path = self._path(dataset_id, content_hash)
+        try:
+            # The mapping stays alive as long as the DataFrame's buffers reference it
+            source = pa.memory_map(path, 'r')
+            table = pa.ipc.open_file(source).read_all()
+        except (FileNotFoundError, pa.ArrowInvalid):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if columns is not None:
+            table = table.select(list(columns))
+
+        try:
+            # Touch the file so eviction is least-recently-used across processes
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return table.to_pandas(split_blocks=True)
+
+    def put(self, dataset_id, content_hash, df):
+        if not self.enabled or not content_hash or df is None:
+            return False
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowException, TypeError, ValueError):
+            return False
+
+        if table.nbytes > self.max_bytes:
+            return False
+
+        # Write to a temporary file and rename so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, self._path(dataset_id, content_hash))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        current = self._path(dataset_id, content_hash)
+        for _, _, path in self._entries(dataset_id):
+            if path != current:
+                self._remove(path)
+
+        self.evict()
+        return True
+
+    def evict(self):
+        if not self.enabled:
+            return 0
+
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                removed += 1
+            total -= size
+        return removed
+
+    def invalidate(self, dataset_id, start=None, end=None):
+        if not self.enabled:
+            return
+        for _, _, path in self._entries(dataset_id):
+            self._remove(path)
+
+    def clear(self):
+        if not self.enabled:
+            return
+        for _, _, path in self._entries():
+            self._remove(path)
+
+    def stats(self):
+        entries = self._entries() if self.enabled else []
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes
+        }
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
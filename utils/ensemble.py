@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+
+def ensemble_weights(scores, methods, metric='mae'):
+    # Inverse backtest error; RMSE is squared so the weights follow inverse mean squared error
+    frame = pd.DataFrame(scores)
+    errors = {}
+    if not frame.empty and metric in frame.columns:
+        errors = {row['method']: row[metric] for row in frame.to_dict('records')
+                  if row['method'] in methods and np.isfinite(row[metric])}
+    if not errors:
+        # Nothing was scored: every member counts the same
+        return {method: 1.0 / len(methods) for method in methods} if methods else {}
+
+    error = np.array([errors[method] for method in errors], dtype=float)
+    if metric == 'rmse':
+        error = error ** 2
+    if (error <= 0).any():
+        # A member that never missed takes the whole weight
+        raw = (error <= 0).astype(float)
+    else:
+        raw = 1.0 / error
+    weights = dict(zip(errors, raw / raw.sum()))
+    return {method: float(weights.get(method, 0.0)) for method in methods}
+
+
+def combine_forecasts(results, weights):
+    members = [method for method in results if weights.get(method, 0.0) > 0 and results[method].get('forecast')]
+    if not members:
+        return None
+
+    horizon = min(len(results[method]['forecast']) for method in members)
+    w = np.array([weights[method] for method in members])
+    w = w / w.sum()
+    forecasts = np.array([results[method]['forecast'][:horizon] for method in members], dtype=float)
+    combined = {'forecast': w @ forecasts, 'members': members, 'weights': dict(zip(members, w.tolist()))}
+
+    # Bounds are averaged with the same weights (quantile averaging) over the members that have them
+    banded = [i for i, method in enumerate(members)
+              if results[method].get('lower_bound') and results[method].get('upper_bound')]
+    if banded:
+        wb = w[banded] / w[banded].sum()
+        combined['lower_bound'] = wb @ np.array([results[members[i]]['lower_bound'][:horizon] for i in banded], dtype=float)
+        combined['upper_bound'] = wb @ np.array([results[members[i]]['upper_bound'][:horizon] for i in banded], dtype=float)
+    return combined
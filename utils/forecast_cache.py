@@ -0,0 +1,136 @@
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import pandas as pd
+from utils.data_storage import register_invalidation_hook
+from utils.serialization import combine_hashes, hash_dataframe
+
+FORECAST_CACHE_SIZE = int(os.environ.get('FORECAST_CACHE_SIZE', '128'))
+FORECAST_CACHE_RETENTION_HOURS = float(os.environ.get('FORECAST_CACHE_RETENTION_HOURS', '168'))
+FORECAST_CACHE_PRUNE_EVERY = 300
+
+
+def series_fingerprint(df, column, date_column=None):
+    columns = [col for col in (date_column, column) if col is not None and col in df.columns]
+    return hash_dataframe(df[columns])
+
+
+def forecast_fingerprint(series_hash, column, date_column, periods, method, params=None):
+    return combine_hashes([
+        ('series', series_hash),
+        ('column', column),
+        ('date_column', date_column),
+        ('periods', periods),
+        ('method', method),
+        ('params', json.dumps(params or {}, sort_keys=True, default=str))
+    ])
+
+
+class ForecastCache:
+
+    def __init__(self, storage=None, max_entries=None):
+        self.storage = storage
+        self.max_entries = FORECAST_CACHE_SIZE if max_entries is None else max_entries
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self._last_prune = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        register_invalidation_hook(self.invalidate)
+
+    def fingerprint(self, df, column, date_column, periods, method, params=None):
+        return forecast_fingerprint(series_fingerprint(df, column, date_column), column, date_column, periods, method, params)
+
+    def get(self, fingerprint):
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None:
+                self._entries.move_to_end(fingerprint)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+
+        stored = self.storage.get_cached_forecast(fingerprint) if self.storage is not None else None
+        if stored is None or stored['data'] is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        result = stored['data']
+        for key in ('forecast_dates', 'historical_dates'):
+            if result.get(key) is not None:
+                # Dates come back from JSON as strings
+                result[key] = pd.to_datetime(result[key]).tolist()
+        if stored.get('created_at') is not None:
+            result.setdefault('computed_at', stored['created_at'].isoformat())
+
+        with self._lock:
+            self.store_hits += 1
+            self._remember(fingerprint, stored['dataset_id'], result)
+        return copy.deepcopy(result)
+
+    def put(self, fingerprint, result, dataset_id=None, metric_name=None, method=None, params=None):
+        if result is None:
+            return
+
+        with self._lock:
+            self._remember(fingerprint, dataset_id, copy.deepcopy(result))
+
+        if self.storage is not None:
+            self.prune()
+            self.storage.save_cached_forecast(
+                fingerprint,
+                dataset_id,
+                metric_name,
+                method or result.get('method'),
+                result,
+                confidence_level=result.get('confidence', 'Medium'),
+                r2_score=result.get('r2_score'),
+                parameters=params
+            )
+
+    def prune(self, force=False):
+        # Results for unsaved uploads and demo data are never invalidated, so stored entries expire instead
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._last_prune is not None and now - self._last_prune < FORECAST_CACHE_PRUNE_EVERY:
+                return 0
+            self._last_prune = now
+        if self.storage is None:
+            return 0
+        return self.storage.delete_cached_forecasts(before=datetime.utcnow() - timedelta(hours=FORECAST_CACHE_RETENTION_HOURS))
+
+    def invalidate(self, dataset_id, start=None, end=None):
+        with self._lock:
+            stale = [key for key, (entry_dataset_id, _) in self._entries.items() if entry_dataset_id == dataset_id]
+            for key in stale:
+                del self._entries[key]
+
+        if self.storage is not None:
+            self.storage.delete_cached_forecasts(dataset_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.store_hits + self.misses
+            return {
+                'hits': self.hits,
+                'store_hits': self.store_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.store_hits) / lookups, 3) if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries
+            }
+
+    def _remember(self, fingerprint, dataset_id, result):
+        self._entries[fingerprint] = (dataset_id, result)
+        self._entries.move_to_end(fingerprint)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
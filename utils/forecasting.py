@@ -1,16 +1,80 @@
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-from prophet import Prophet
-from statsmodels.tsa.arima.model import ARIMA
+from utils.parallel import FORECAST_WORKERS, FORECAST_TIMEOUT, run_tasks
+from utils.hierarchy import build_hierarchy, reconcile
+from utils.smoothing import simple_exponential_smoothing, holt_winters
+from utils.regression import trend_regression
+from utils.resampling import RESAMPLE_FREQ, RESAMPLE_AGGREGATION, resample_frame, frame_frequency, future_dates, period_days
+from utils.intervals import INTERVAL_PATHS, INTERVAL_QUANTILES, INTERVAL_HISTORY, bootstrap_intervals, moving_average_residuals, error_profile
+from utils.ensemble import ensemble_weights, combine_forecasts
+from utils.backtesting import BACKTEST_METHODS, rolling_cutoffs, backtest_cutoffs, summarize_scores
+from utils.incremental import (INCREMENTAL_METHODS, ARIMA_STATE_METHODS, MODEL_DRIFT_RATIO, fit_model_state,
+                               update_model_state, refit_reason)
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
+MODEL_PARAMS = {
+    'auto': {'candidates': ['linear', 'moving_average', 'exponential', 'polynomial', 'holt', 'holt_winters'], 'cutoffs': 3, 'metric': 'mae', 'r2_threshold': 0.6},
+    'moving_average': {'window': 7},
+    'exponential': {'alpha': None},
+    'holt': {},
+    'holt_winters': {'season_length': 7},
+    'polynomial': {'degree': 2},
+    'arima': {'order': (1, 1, 1)},
+    'auto_arima': {'max_p': 3, 'max_d': 2, 'max_q': 3, 'criterion': 'aic', 'seasonal_period': None},
+    'prophet': {'changepoint_prior_scale': 0.05, 'weekly_seasonality': True, 'yearly_seasonality': True,
+                'uncertainty_samples': 300, 'warm_start': True, 'fit_freq': None},
+    'resample': {'freq': RESAMPLE_FREQ, 'how': RESAMPLE_AGGREGATION},
+    'intervals': {'paths': INTERVAL_PATHS, 'quantiles': list(INTERVAL_QUANTILES), 'history': INTERVAL_HISTORY}
+}
+
+COMPARISON_METHODS = ['linear', 'prophet', 'arima', 'exponential']
+SMOOTHING_METHODS = ('exponential', 'holt', 'holt_winters')
+REGRESSION_METHODS = ('linear', 'polynomial')
+VECTORIZED_METHODS = SMOOTHING_METHODS + REGRESSION_METHODS
+
+FORECAST_MANY_COLUMNS = ['metric', 'date', 'step', 'forecast', 'lower_bound', 'upper_bound', 'method', 'confidence']
+
+def _prophet_params(model):
+    # MAP estimates in the shape Prophet.fit(init=...) takes, so a later fit can start from them
+    params = model.params
+    return {
+        'k': float(params['k'][0][0]),
+        'm': float(params['m'][0][0]),
+        'sigma_obs': float(params['sigma_obs'][0][0]),
+        'delta': [float(value) for value in params['delta'][0]],
+        'beta': [float(value) for value in params['beta'][0]]
+    }
+
+def _report_timed_out(timed_out, keys):
+    if timed_out is not None:
+        timed_out.extend(key for key in dict.fromkeys(keys) if key not in timed_out)
+
+def _forecast_worker(df_sorted, column, date_column, periods, method):
+    return ForecastingEngine()._forecast_prepared(df_sorted, column, date_column, periods, method)
+
+def _backtest_worker(df_clean, column, date_column, method, cutoffs, horizon, params=None):
+    return backtest_cutoffs(ForecastingEngine(), df_clean, column, date_column, method, cutoffs, horizon, params)
+
+def _ensemble_worker(kind, args):
+    # Member fits and backtest chunks go to the pool together, so they all run side by side
+    return _forecast_worker(*args) if kind == 'forecast' else _backtest_worker(*args)
+
+def _forecast_batch_worker(df_sorted, columns, date_column, periods, method):
+    engine = ForecastingEngine()
+    base_columns = [date_column] if date_column in df_sorted.columns else []
+    return [
+        (column, engine._forecast_prepared(df_sorted[base_columns + [column]], column, date_column, periods, method))
+        for column in columns
+    ]
+
 class ForecastingEngine:
     
-    def __init__(self):
+    def __init__(self, cache=None, states=None):
         self.model = None
+        self.cache = cache
+        self.states = states
         
     def moving_average_forecast(self, data, window=7, periods=30):
         if len(data) < window:
@@ -21,82 +85,138 @@ class ForecastingEngine:
         
         forecast = [last_ma] * periods
         
-        return {
+        result = {
             'forecast': forecast,
             'method': f'{window}-day Moving Average',
             'confidence': 'Medium'
         }
+        return self._bootstrap_bands(result, data, window)
+    
+    def _bootstrap_bands(self, result, data, window=7):
+        # The moving average has no analytic interval, so one is simulated from its own resampled
+        # one-step errors, shaped by its in-sample errors further ahead: trending series get the
+        # widening, drifting bands of a random walk, noise around a level keeps a steady width
+        params = MODEL_PARAMS['intervals']
+        # Recent errors only: a growing series' early errors are far smaller than today's
+        values = data.to_numpy(dtype=float)[-(params['history'] + window):]
+        residuals = moving_average_residuals(values, window)
+        if residuals.shape[1] == 0:
+            return result
+        forecast = np.asarray(result['forecast'], dtype=float)
+        horizon = max(1, min(len(forecast), residuals.shape[1] // 3))
+        shocks, persistence, bias = error_profile(residuals, moving_average_residuals(values, window, horizon), horizon, len(forecast))
+        bands = bootstrap_intervals(shocks, forecast + bias, params['quantiles'], params['paths'], persistence=persistence)
+        if np.isnan(bands['lower_bound']).all():
+            return result
+        
+        # The bias can shift the whole band off a flat forecast; keep the forecast itself inside it
+        result['lower_bound'] = np.minimum(bands['lower_bound'][0], forecast).tolist()
+        result['upper_bound'] = np.maximum(bands['upper_bound'][0], forecast).tolist()
+        result['has_confidence_interval'] = True
+        result['interval_method'] = 'bootstrap'
+        result['interval_quantiles'] = bands['quantiles']
+        if len(bands['quantiles']) > 2:
+            result['quantile_bounds'] = {str(q): bands['bounds'][j, 0].tolist() for j, q in enumerate(bands['quantiles'])}
+        return result
     
     def linear_regression_forecast(self, data, periods=30):
         if len(data) < 10:
             return None
         
-        X = np.arange(len(data)).reshape(-1, 1)
-        y = data.values
-        
-        model = LinearRegression()
-        model.fit(X, y)
-        
-        future_X = np.arange(len(data), len(data) + periods).reshape(-1, 1)
-        forecast = model.predict(future_X)
-        
-        y_pred = model.predict(X)
-        r2_score = 1 - (np.sum((y - y_pred) ** 2) / np.sum((y - y.mean()) ** 2))
-        
-        return {
-            'forecast': forecast.tolist(),
-            'method': 'Linear Regression',
-            'confidence': 'High' if r2_score > 0.7 else 'Medium',
-            'r2_score': r2_score,
-            'trend': 'Increasing' if model.coef_[0] > 0 else 'Decreasing'
-        }
+        fit = trend_regression(data.to_numpy(dtype=float), periods, degree=1)
+        return self._regression_result('linear', fit)
     
     def polynomial_regression_forecast(self, data, periods=30, degree=2):
         if len(data) < 15:
             return None
         
-        X = np.arange(len(data)).reshape(-1, 1)
-        y = data.values
-        
-        poly_features = PolynomialFeatures(degree=degree)
-        X_poly = poly_features.fit_transform(X)
-        
-        model = LinearRegression()
-        model.fit(X_poly, y)
-        
-        future_X = np.arange(len(data), len(data) + periods).reshape(-1, 1)
-        future_X_poly = poly_features.transform(future_X)
-        forecast = model.predict(future_X_poly)
-        
-        y_pred = model.predict(X_poly)
-        r2_score = 1 - (np.sum((y - y_pred) ** 2) / np.sum((y - y.mean()) ** 2))
+        fit = trend_regression(data.to_numpy(dtype=float), periods, degree=degree)
+        return self._regression_result('polynomial', fit)
+    
+    def _regression_result(self, method, fit, i=0):
+        r2_score = float(fit['r2'][i])
+        if np.isnan(r2_score):
+            return None
         
-        return {
-            'forecast': forecast.tolist(),
-            'method': f'Polynomial Regression (degree {degree})',
-            'confidence': 'High' if r2_score > 0.75 else 'Medium',
+        result = {
+            'forecast': fit['forecast'][i].tolist(),
+            'lower_bound': fit['lower_bound'][i].tolist(),
+            'upper_bound': fit['upper_bound'][i].tolist(),
+            'has_confidence_interval': True,
             'r2_score': r2_score
         }
+        if method == 'linear':
+            result['method'] = 'Linear Regression'
+            result['confidence'] = 'High' if r2_score > 0.7 else 'Medium'
+            result['trend'] = 'Increasing' if fit['coefficients'][i, 1] > 0 else 'Decreasing'
+        else:
+            result['method'] = f"Polynomial Regression (degree {fit['degree']})"
+            result['confidence'] = 'High' if r2_score > 0.75 else 'Medium'
+        return result
     
     def exponential_smoothing_forecast(self, data, alpha=0.3, periods=30):
         if len(data) < 5:
             return None
         
-        smoothed = [data.iloc[0]]
-        
-        for i in range(1, len(data)):
-            smoothed_value = alpha * data.iloc[i] + (1 - alpha) * smoothed[-1]
-            smoothed.append(smoothed_value)
+        fit = simple_exponential_smoothing(data.to_numpy(dtype=float), periods, alphas=alpha)
+        return self._smoothing_result('exponential', fit)
+    
+    def holt_forecast(self, data, periods=30):
+        if len(data) < 10:
+            return None
         
-        forecast = [smoothed[-1]] * periods
+        fit = holt_winters(data.to_numpy(dtype=float), periods)
+        return self._smoothing_result('holt', fit)
+    
+    def holt_winters_forecast(self, data, periods=30, season_length=7):
+        if len(data) < 10:
+            return None
         
-        return {
-            'forecast': forecast,
-            'method': f'Exponential Smoothing (α={alpha})',
-            'confidence': 'Medium'
+        fit = holt_winters(data.to_numpy(dtype=float), periods, season_length=season_length)
+        return self._smoothing_result('holt_winters', fit)
+    
+    def _fit_vectorized(self, method, values, periods):
+        if method == 'linear':
+            return trend_regression(values, periods, degree=1)
+        if method == 'polynomial':
+            return trend_regression(values, periods, degree=MODEL_PARAMS['polynomial']['degree'])
+        if method == 'exponential':
+            return simple_exponential_smoothing(values, periods, alphas=MODEL_PARAMS['exponential']['alpha'])
+        if method == 'holt':
+            return holt_winters(values, periods)
+        return holt_winters(values, periods, season_length=MODEL_PARAMS['holt_winters']['season_length'])
+    
+    def _vectorized_result(self, method, fit, i=0):
+        if method in REGRESSION_METHODS:
+            return self._regression_result(method, fit, i)
+        return self._smoothing_result(method, fit, i)
+    
+    def _smoothing_result(self, method, fit, i=0):
+        alpha = fit['alpha'][i]
+        if method == 'exponential':
+            label = f'Exponential Smoothing (α={alpha:.2f})'
+        elif fit.get('season_length'):
+            label = f"Holt-Winters (m={fit['season_length']}, α={alpha:.2f}, β={fit['beta'][i]:.2f}, γ={fit['gamma'][i]:.2f})"
+        else:
+            label = f"Holt Linear Trend (α={alpha:.2f}, β={fit['beta'][i]:.2f})"
+        
+        result = {
+            'forecast': fit['forecast'][i].tolist(),
+            'method': label,
+            'confidence': 'Medium' if method == 'exponential' else 'High',
+            'lower_bound': fit['lower_bound'][i].tolist(),
+            'upper_bound': fit['upper_bound'][i].tolist(),
+            'has_confidence_interval': True,
+            'alpha': float(alpha)
         }
+        if method != 'exponential':
+            result['beta'] = float(fit['beta'][i])
+        if fit.get('season_length'):
+            result['gamma'] = float(fit['gamma'][i])
+            result['season_length'] = fit['season_length']
+        return result
     
-    def prophet_forecast(self, df, column, date_column='Date', periods=30):
+    def prophet_forecast(self, df, column, date_column='Date', periods=30, init=None):
         try:
             if df is None or df.empty or column not in df.columns:
                 return None
@@ -104,9 +224,17 @@ class ForecastingEngine:
             if len(df) < 10:
                 return None
             
+            params = MODEL_PARAMS['prophet']
+            freq = frame_frequency(df, date_column)
+            df_fit = df
+            fit_freq = params.get('fit_freq')
+            if fit_freq and period_days(fit_freq) > period_days(freq):
+                # Fit on period means so the curve keeps the scale of the original steps
+                df_fit = resample_frame(df, [column], date_column, fit_freq, how='mean')[0]
+            
             df_prophet = pd.DataFrame({
-                'ds': pd.to_datetime(df[date_column]),
-                'y': df[column]
+                'ds': pd.to_datetime(df_fit[date_column]),
+                'y': df_fit[column]
             })
             
             df_prophet = df_prophet.dropna()
@@ -114,38 +242,57 @@ class ForecastingEngine:
             if len(df_prophet) < 10:
                 return None
             
-            model = Prophet(
-                daily_seasonality=False,
-                weekly_seasonality=True,
-                yearly_seasonality=True,
-                changepoint_prior_scale=0.05
-            )
-            
-            model.fit(df_prophet)
+            # Prophet pulls in cmdstanpy and takes seconds to import, so load it on first use
+            from prophet import Prophet
             
-            future = model.make_future_dataframe(periods=periods)
-            forecast_result = model.predict(future)
+            def build_model():
+                return Prophet(
+                    daily_seasonality=False,
+                    # A weekly cycle only exists in series sampled more often than weekly
+                    weekly_seasonality=params['weekly_seasonality'] and period_days(fit_freq or freq) < 7,
+                    yearly_seasonality=params['yearly_seasonality'],
+                    changepoint_prior_scale=params['changepoint_prior_scale'],
+                    # Enough simulated trends for stable 95% bands, well below Prophet's default of 1000
+                    uncertainty_samples=params['uncertainty_samples']
+                )
             
-            forecast_values = forecast_result['yhat'].tail(periods).tolist()
-            lower_bound = forecast_result['yhat_lower'].tail(periods).tolist()
-            upper_bound = forecast_result['yhat_upper'].tail(periods).tolist()
+            started = time.perf_counter()
+            warm_start = bool(init) and params['warm_start']
+            model = build_model()
+            try:
+                # Starting the optimiser at an earlier fit's optimum cuts the iterations for slightly extended data
+                model.fit(df_prophet, **({'init': init} if warm_start else {}))
+            except Exception:
+                # Stored parameters no longer fit the model's shape (e.g. fewer changepoints); fit cold
+                if not warm_start:
+                    raise
+                warm_start = False
+                model = build_model()
+                model.fit(df_prophet)
+            fit_time = time.perf_counter() - started
             
-            last_date = pd.to_datetime(df[date_column].iloc[-1])
-            forecast_dates = pd.date_range(start=last_date, periods=periods+1, freq='D')[1:]
+            # Only the horizon is predicted; sampling uncertainty over the whole history is wasted work
+            last_date = pd.to_datetime(df[date_column]).max()
+            future = pd.DataFrame({'ds': future_dates(last_date, periods, freq)})
+            forecast_result = model.predict(future)
             
             return {
-                'forecast': forecast_values,
+                'forecast': forecast_result['yhat'].tolist(),
                 'method': 'Prophet (Facebook)',
                 'confidence': 'High',
-                'lower_bound': lower_bound,
-                'upper_bound': upper_bound,
-                'forecast_dates': forecast_dates.tolist(),
-                'has_confidence_interval': True
+                'lower_bound': forecast_result['yhat_lower'].tolist(),
+                'upper_bound': forecast_result['yhat_upper'].tolist(),
+                'forecast_dates': future['ds'].tolist(),
+                'has_confidence_interval': True,
+                'fit_time': round(fit_time, 3),
+                'warm_start': warm_start,
+                'fit_frequency': fit_freq if df_fit is not df else freq,
+                'prophet_params': _prophet_params(model)
             }
         except Exception as e:
             return None
     
-    def arima_forecast(self, df, column, date_column='Date', periods=30, order=(1, 1, 1)):
+    def arima_forecast(self, df, column, date_column='Date', periods=30, order=(1, 1, 1), search=None):
         try:
             if df is None or df.empty or column not in df.columns:
                 return None
@@ -162,99 +309,601 @@ class ForecastingEngine:
             if len(data) < 20:
                 return None
             
-            model = ARIMA(data, order=order)
-            fitted_model = model.fit()
-            
-            forecast_result = fitted_model.forecast(steps=periods)
+            from statsmodels.tsa.arima.model import ARIMA
+            from utils.arima_search import auto_arima
             
-            if hasattr(fitted_model, 'get_forecast'):
-                forecast_obj = fitted_model.get_forecast(steps=periods)
-                conf_int = forecast_obj.conf_int()
-                lower_bound = conf_int.iloc[:, 0].tolist()
-                upper_bound = conf_int.iloc[:, 1].tolist()
-                has_conf_int = True
+            search_result = None
+            if order == 'auto':
+                search_result = auto_arima(data.to_numpy(), **(search or {}))
+                if search_result is None:
+                    return None
+                fitted_model = search_result['fitted']
+                order = search_result['order']
             else:
-                lower_bound = None
-                upper_bound = None
-                has_conf_int = False
+                model = ARIMA(data, order=order)
+                fitted_model = model.fit()
+            
+            # One get_forecast call yields both the point forecast and its interval
+            forecast_obj = fitted_model.get_forecast(steps=periods)
+            forecast_values = np.asarray(forecast_obj.predicted_mean)
+            conf_int = np.asarray(forecast_obj.conf_int())
             
             last_date = pd.to_datetime(df_sorted[date_column].iloc[-1])
-            forecast_dates = pd.date_range(start=last_date, periods=periods+1, freq='D')[1:]
+            forecast_dates = future_dates(last_date, periods, frame_frequency(df_sorted, date_column))
             
-            return {
-                'forecast': forecast_result.tolist(),
+            result = {
+                'forecast': forecast_values.tolist(),
                 'method': f'ARIMA{order}',
                 'confidence': 'High',
-                'lower_bound': lower_bound,
-                'upper_bound': upper_bound,
-                'has_confidence_interval': has_conf_int,
+                'lower_bound': conf_int[:, 0].tolist(),
+                'upper_bound': conf_int[:, 1].tolist(),
+                'has_confidence_interval': True,
                 'forecast_dates': forecast_dates.tolist(),
                 'aic': fitted_model.aic,
                 'bic': fitted_model.bic
             }
+            
+            if search_result is not None:
+                seasonal_order = search_result['seasonal_order']
+                result['method'] = f'Auto ARIMA{order}' + (f'x{seasonal_order}' if seasonal_order else '')
+                result['order'] = order
+                result['seasonal_order'] = seasonal_order
+                result['criterion'] = search_result['criterion']
+                result['candidates_evaluated'] = search_result['candidates_evaluated']
+                result['candidates_timed_out'] = search_result['candidates_timed_out']
+                result['search_time'] = round(search_result['search_time'], 3)
+            
+            return result
         except Exception as e:
             return None
     
-    def forecast_metric(self, df, column, date_column='Date', periods=30, method='auto'):
+    def forecast_metric(self, df, column, date_column='Date', periods=30, method='auto', dataset_id=None, freq=None, how=None):
+        df_sorted = self._prepare_series(df, column, date_column, freq, how)
+        if df_sorted is None:
+            return None
+        
+        fingerprint, cached = self._cached_forecast(df_sorted, column, date_column, periods, method)
+        if cached is not None:
+            return cached
+        return self._fit_and_cache(df_sorted, column, date_column, periods, method, fingerprint, dataset_id)
+    
+    def _cached_forecast(self, df_sorted, column, date_column, periods, method):
+        if self.cache is None:
+            return None, None
+        fingerprint = self.cache.fingerprint(df_sorted, column, date_column, periods, method, MODEL_PARAMS)
+        return fingerprint, self.cache.get(fingerprint)
+    
+    def _fit_and_cache(self, df_sorted, column, date_column, periods, method, fingerprint=None, dataset_id=None):
+        result = self._forecast_prepared(df_sorted, column, date_column, periods, method)
+        self._cache_result(fingerprint, result, column, date_column, periods, method, dataset_id)
+        return result
+    
+    def _prepare_series(self, df, column, date_column='Date', freq=None, how=None):
         if df is None or df.empty or column not in df.columns:
             return None
         
-        df_sorted = df.copy()
-        if date_column in df.columns:
-            df_sorted = df_sorted.sort_values(date_column)
+        # Rows sharing a date are aggregated and the series put on its calendar frequency before any fit
+        df_sorted, _ = resample_frame(df, [column], date_column, MODEL_PARAMS['resample']['freq'] if freq is None else freq,
+                                      how or MODEL_PARAMS['resample']['how'])
         
-        data = df_sorted[column].dropna()
-        
-        if len(data) < 10:
+        if df_sorted[column].count() < 10:
             return None
         
+        return df_sorted
+    
+    def _cache_result(self, fingerprint, result, column, date_column, periods, method, dataset_id=None):
+        # A fallback answered for a model that failed; caching it would pin the failure under that model's key
+        if self.cache is None or result is None or result.get('fallback_for'):
+            return
+        self.cache.put(fingerprint, result, dataset_id=dataset_id, metric_name=column, params={
+            'method': method,
+            'periods': periods,
+            'date_column': date_column
+        })
+    
+    def _forecast_prepared(self, df_sorted, column, date_column='Date', periods=30, method='auto', fallback=True):
+        data = df_sorted[column].dropna()
+        
+        selection = None
+        lr_result = None
         if method == 'auto':
-            lr_result = self.linear_regression_forecast(data, periods)
-            if lr_result and lr_result.get('r2_score', 0) > 0.6:
-                method = 'linear'
+            selection = self._select_by_backtest(df_sorted, column, date_column, periods)
+            if selection is not None:
+                method = selection['method']
             else:
-                method = 'moving_average'
+                lr_result = self.linear_regression_forecast(data, periods)
+                if lr_result and lr_result.get('r2_score', 0) > MODEL_PARAMS['auto']['r2_threshold']:
+                    method = 'linear'
+                else:
+                    method = 'moving_average'
         
         if method == 'linear':
-            result = self.linear_regression_forecast(data, periods)
+            # The auto fallback has already fitted the linear trend
+            result = lr_result or self.linear_regression_forecast(data, periods)
         elif method == 'polynomial':
-            result = self.polynomial_regression_forecast(data, periods)
+            result = self.polynomial_regression_forecast(data, periods, degree=MODEL_PARAMS['polynomial']['degree'])
         elif method == 'moving_average':
-            result = self.moving_average_forecast(data, periods=periods)
+            result = self.moving_average_forecast(data, window=MODEL_PARAMS['moving_average']['window'], periods=periods)
         elif method == 'exponential':
-            result = self.exponential_smoothing_forecast(data, periods=periods)
+            result = self.exponential_smoothing_forecast(data, alpha=MODEL_PARAMS['exponential']['alpha'], periods=periods)
+        elif method == 'holt':
+            result = self.holt_forecast(data, periods)
+        elif method == 'holt_winters':
+            result = self.holt_winters_forecast(data, periods, season_length=MODEL_PARAMS['holt_winters']['season_length'])
         elif method == 'prophet':
             result = self.prophet_forecast(df_sorted, column, date_column, periods)
         elif method == 'arima':
-            result = self.arima_forecast(df_sorted, column, date_column, periods)
+            result = self.arima_forecast(df_sorted, column, date_column, periods, order=MODEL_PARAMS['arima']['order'])
+        elif method == 'auto_arima':
+            result = self.arima_forecast(df_sorted, column, date_column, periods, order='auto', search=MODEL_PARAMS['auto_arima'])
         else:
             result = self.linear_regression_forecast(data, periods)
         
-        if result is None:
+        if result is None and fallback:
             result = self.moving_average_forecast(data, periods=periods)
+            if result is not None:
+                result['fallback_for'] = method
         
         if result is None:
             return None
         
-        if date_column in df.columns and 'forecast_dates' not in result:
-            last_date = pd.to_datetime(df_sorted[date_column].iloc[-1])
-            date_range = pd.date_range(start=last_date, periods=periods+1, freq='D')[1:]
-            result['forecast_dates'] = date_range.tolist()
+        # Warm-start parameters are kept by the model state store, not in every cached result
+        result.pop('prophet_params', None)
+        self._attach_history(result, df_sorted, data, date_column, periods)
+        
+        if selection is not None:
+            result['selected_by'] = 'backtest'
+            result['backtest_' + MODEL_PARAMS['auto']['metric']] = selection['score']
+        
+        return result
+    
+    def _attach_history(self, result, df_sorted, data, date_column, periods):
+        if date_column in df_sorted.columns:
+            freq = frame_frequency(df_sorted, date_column)
+            if 'forecast_dates' not in result:
+                last_date = pd.to_datetime(df_sorted[date_column].iloc[-1])
+                result['forecast_dates'] = future_dates(last_date, periods, freq).tolist()
+            result['historical_dates'] = pd.to_datetime(df_sorted.loc[data.index, date_column]).tail(90).tolist()
+            result['frequency'] = freq
         
         result['historical_data'] = data.tail(90).tolist()
+        return result
+    
+    def forecast_incremental(self, df, column, date_column='Date', periods=30, method='holt_winters', dataset_id=None):
+        if method == 'prophet' and self.states is not None and dataset_id is not None:
+            return self._forecast_prophet_warm(df, column, date_column, periods, dataset_id)
+        if self.states is None or dataset_id is None or method not in INCREMENTAL_METHODS:
+            return self.forecast_metric(df, column, date_column, periods, method, dataset_id)
+        
+        df_sorted = self._prepare_series(df, column, date_column)
+        if df_sorted is None:
+            return None
         
+        # A forecast of this exact series, cached or precomputed by the scheduler, needs no model at all
+        fingerprint, cached = self._cached_forecast(df_sorted, column, date_column, periods, method)
+        if cached is not None:
+            return cached
+        
+        data = df_sorted[column].dropna()
+        min_obs = 20 if method in ARIMA_STATE_METHODS else 15 if method == 'polynomial' else 10
+        if len(data) < min_obs:
+            return self._fit_and_cache(df_sorted, column, date_column, periods, method, fingerprint, dataset_id)
+        
+        values = data.to_numpy(dtype=float)
+        dates = None
+        if date_column in df_sorted.columns:
+            dates = pd.to_datetime(df_sorted.loc[data.index, date_column]).to_numpy()
+        
+        state = self.states.get(dataset_id, column, method)
+        reason = refit_reason(state, values, dates)
+        # Same history as the stored fit: the state only has to project the horizon and is not saved again
+        unchanged = reason is None and len(values) == state['n_obs']
+        drift = None
+        if reason is None:
+            # Only the rows appended since the stored fit are run through the model
+            try:
+                updated, fit, drift = update_model_state(state, values[state['n_obs']:], periods)
+                if drift > MODEL_DRIFT_RATIO:
+                    reason = 'drift'
+            except Exception:
+                reason = 'update_failed'
+        
+        if reason is not None:
+            try:
+                updated, fit = fit_model_state(method, values, periods, MODEL_PARAMS.get(method))
+            except Exception:
+                updated = None
+            if updated is None:
+                return self._fit_and_cache(df_sorted, column, date_column, periods, method, fingerprint, dataset_id)
+        
+        if method in ARIMA_STATE_METHODS:
+            order = tuple(updated['order'])
+            seasonal_order = tuple(updated['seasonal_order'])
+            label = f'ARIMA{order}' if method == 'arima' else f'Auto ARIMA{order}' + (f'x{seasonal_order}' if any(seasonal_order[:3]) else '')
+            result = {
+                'forecast': fit['forecast'][0].tolist(),
+                'method': label,
+                'confidence': 'High',
+                'lower_bound': fit['lower_bound'][0].tolist(),
+                'upper_bound': fit['upper_bound'][0].tolist(),
+                'has_confidence_interval': True,
+                'order': order
+            }
+        else:
+            result = self._vectorized_result(method, fit)
+        if result is None:
+            return self._fit_and_cache(df_sorted, column, date_column, periods, method, fingerprint, dataset_id)
+        
+        updated['last_value'] = values[-1]
+        updated['last_date'] = str(pd.Timestamp(dates[-1])) if dates is not None else None
+        
+        self._attach_history(result, df_sorted, data, date_column, periods)
+        result['model_update'] = 'unchanged' if unchanged else 'incremental' if reason is None else 'refit'
+        result['refit_reason'] = reason
+        result['new_observations'] = len(values) - state['n_obs'] if reason is None else len(values)
+        if drift is not None:
+            result['drift_ratio'] = round(drift, 3)
+        if not unchanged:
+            self.states.put(dataset_id, column, method, updated, result, refit=reason is not None)
+        self._cache_result(fingerprint, result, column, date_column, periods, method, dataset_id)
         return result
     
-    def compare_forecasts(self, df, column, date_column='Date', periods=30):
-        methods = ['linear', 'prophet', 'arima', 'exponential']
-        results = {}
+    def _forecast_prophet_warm(self, df, column, date_column='Date', periods=30, dataset_id=None):
+        # Prophet cannot absorb new rows, but a refit started from the stored parameters converges far sooner
+        df_sorted = self._prepare_series(df, column, date_column)
+        if df_sorted is None or date_column not in df_sorted.columns:
+            return self.forecast_metric(df, column, date_column, periods, 'prophet', dataset_id)
+        
+        # A forecast of this exact series, cached or precomputed by the scheduler, needs no model at all
+        fingerprint, cached = self._cached_forecast(df_sorted, column, date_column, periods, 'prophet')
+        if cached is not None:
+            return cached
+        
+        data = df_sorted[column].dropna()
+        last_value = float(data.iloc[-1])
+        last_date = str(pd.Timestamp(df_sorted.loc[data.index, date_column].iloc[-1]))
+        state = self.states.get(dataset_id, column, 'prophet')
+        # Same history as the stored fit: its parameters are already the optimum, so the state is not saved again
+        unchanged = (state is not None and state['n_obs'] == len(data) and state.get('last_date') == last_date
+                     and state.get('last_value') is not None and np.isclose(state['last_value'], last_value))
+        
+        result = self.prophet_forecast(df_sorted, column, date_column, periods, init=state['params'] if state else None)
+        if result is None:
+            return self._fit_and_cache(df_sorted, column, date_column, periods, 'prophet', fingerprint, dataset_id)
+        
+        self._attach_history(result, df_sorted, data, date_column, periods)
+        params = result.pop('prophet_params')
+        if unchanged and result['warm_start']:
+            result['model_update'] = 'unchanged'
+            result['refit_reason'] = None
+        else:
+            result['model_update'] = 'warm_start' if result['warm_start'] else 'refit'
+            result['refit_reason'] = None if result['warm_start'] else 'initial' if state is None else 'shape_changed'
+            updated = {
+                'method': 'prophet',
+                'params': params,
+                'n_obs': len(data),
+                'last_value': last_value,
+                'last_date': last_date
+            }
+            self.states.put(dataset_id, column, 'prophet', updated, result, refit=not result['warm_start'])
+        self._cache_result(fingerprint, result, column, date_column, periods, 'prophet', dataset_id)
+        return result
+    
+    def _select_by_backtest(self, df_sorted, column, date_column='Date', periods=30):
+        params = MODEL_PARAMS['auto']
+        df_clean = df_sorted.dropna(subset=[column]).reset_index(drop=True)
+        horizon = max(1, min(periods, len(df_clean) // 5))
+        cutoffs = rolling_cutoffs(len(df_clean), horizon, params['cutoffs'], min_train=15)
+        if not cutoffs:
+            return None
+        
+        scores = {
+            method: backtest_cutoffs(self, df_clean, column, date_column, method, cutoffs, horizon, MODEL_PARAMS.get(method))
+            for method in params['candidates']
+        }
+        summary = summarize_scores(scores, params['metric'])
+        if summary.empty:
+            return None
+        return {'method': summary['method'].iloc[0], 'score': float(summary[params['metric']].iloc[0])}
+    
+    def backtest(self, df, column, date_column='Date', horizon=30, methods=None, n_cutoffs=5, metric='mae',
+                 min_train=20, timeout=None, timed_out=None):
+        methods = methods or BACKTEST_METHODS
+        timeout = FORECAST_TIMEOUT if timeout is None else timeout
+        
+        df_sorted = self._prepare_series(df, column, date_column)
+        if df_sorted is None:
+            return summarize_scores({}, metric)
+        
+        df_clean = df_sorted.dropna(subset=[column]).reset_index(drop=True)
+        cutoffs = rolling_cutoffs(len(df_clean), horizon, n_cutoffs, min_train)
+        if not cutoffs:
+            return summarize_scores({}, metric)
+        
+        tasks, chunk_size = self._backtest_tasks(df_clean, column, date_column, methods, cutoffs, horizon)
+        scores = {method: [] for method in methods}
+        expired = []
+        for (method, _), chunk_scores in run_tasks(_backtest_worker, tasks, timeout * chunk_size, expired):
+            scores[method].extend(chunk_scores)
+        _report_timed_out(timed_out, [method for method, _ in expired])
+        
+        return summarize_scores(scores, metric)
+    
+    def _backtest_tasks(self, df_clean, column, date_column, methods, cutoffs, horizon):
+        # Split each method's cutoffs into contiguous chunks so the pool stays busy;
+        # ARIMA rolls its fitted state forward within a chunk
+        chunk_count = max(1, min(len(cutoffs), FORECAST_WORKERS // len(methods)))
+        tasks = {}
+        for method in methods:
+            for i in range(chunk_count):
+                chunk = cutoffs[i * len(cutoffs) // chunk_count:(i + 1) * len(cutoffs) // chunk_count]
+                if chunk:
+                    tasks[(method, i)] = (df_clean, column, date_column, method, chunk, horizon, MODEL_PARAMS.get(method))
+        return tasks, -(-len(cutoffs) // chunk_count)
+    
+    def ensemble_forecast(self, df, column, date_column='Date', periods=30, methods=None, results=None, scores=None,
+                          metric='mae', n_cutoffs=3, timeout=None, dataset_id=None, timed_out=None):
+        # Members and their backtest scores can be handed in from a comparison that already ran;
+        # whatever is missing is fitted in a single concurrent round
+        methods = list(methods or (results.keys() if results else COMPARISON_METHODS))
+        timeout = FORECAST_TIMEOUT if timeout is None else timeout
+        
+        df_sorted = self._prepare_series(df, column, date_column)
+        if df_sorted is None:
+            return None
+        
+        results = {method: result for method, result in (results or {}).items() if result and method in methods}
+        tasks = {}
+        fingerprints = {}
+        for method in methods:
+            if method in results:
+                continue
+            if self.cache is not None:
+                fingerprints[method] = self.cache.fingerprint(df_sorted, column, date_column, periods, method, MODEL_PARAMS)
+                cached = self.cache.get(fingerprints[method])
+                if cached is not None:
+                    results[method] = cached
+                    continue
+            tasks[('forecast', method)] = ('forecast', (df_sorted, column, date_column, periods, method))
+        
+        chunk_size = 1
+        backtest_scores = {method: [] for method in methods}
+        if scores is None:
+            df_clean = df_sorted.dropna(subset=[column]).reset_index(drop=True)
+            horizon = max(1, min(periods, len(df_clean) // 5))
+            cutoffs = rolling_cutoffs(len(df_clean), horizon, n_cutoffs, min_train=20)
+            if cutoffs:
+                backtest_tasks, chunk_size = self._backtest_tasks(df_clean, column, date_column, methods, cutoffs, horizon)
+                tasks.update({('backtest',) + key: ('backtest', args) for key, args in backtest_tasks.items()})
+        
+        expired = []
+        for key, output in (run_tasks(_ensemble_worker, tasks, timeout * chunk_size, expired) if tasks else []):
+            if key[0] == 'backtest':
+                backtest_scores[key[1]].extend(output)
+            elif output:
+                results[key[1]] = output
+                self._cache_result(fingerprints.get(key[1]), output, column, date_column, periods, key[1], dataset_id)
+        _report_timed_out(timed_out, [key[1] for key in expired])
+        
+        if scores is None:
+            scores = summarize_scores(backtest_scores, metric)
+        results = {method: results[method] for method in methods if method in results}
+        combined = combine_forecasts(results, ensemble_weights(scores, list(results), metric))
+        if combined is None:
+            return None
         
+        labels = ', '.join(f"{results[method]['method']} {weight:.0%}" for method, weight in combined['weights'].items())
+        result = {
+            'forecast': combined['forecast'].tolist(),
+            'method': f'Ensemble ({labels})',
+            'confidence': 'High' if len(combined['members']) > 1 else results[combined['members'][0]]['confidence'],
+            'weights': combined['weights'],
+            'members': {method: results[method]['method'] for method in combined['members']}
+        }
+        if 'lower_bound' in combined:
+            result['lower_bound'] = combined['lower_bound'].tolist()
+            result['upper_bound'] = combined['upper_bound'].tolist()
+            result['has_confidence_interval'] = True
+        
+        data = df_sorted[column].dropna()
+        return self._attach_history(result, df_sorted, data, date_column, len(result['forecast']))
+    
+    def compare_forecasts(self, df, column, date_column='Date', periods=30, methods=None, timeout=None, dataset_id=None,
+                          timed_out=None):
+        methods = methods or COMPARISON_METHODS
+        results = dict(self.iter_compare_forecasts(df, column, date_column, periods, methods, timeout, dataset_id, timed_out))
+        return {method: results[method] for method in methods if method in results}
+    
+    def iter_compare_forecasts(self, df, column, date_column='Date', periods=30, methods=None, timeout=None, dataset_id=None,
+                               timed_out=None):
+        methods = methods or COMPARISON_METHODS
+        timeout = FORECAST_TIMEOUT if timeout is None else timeout
+        
+        df_sorted = self._prepare_series(df, column, date_column)
+        if df_sorted is None:
+            return
+        
+        pending = []
+        fingerprints = {}
         for method in methods:
-            forecast_result = self.forecast_metric(df, column, date_column, periods, method)
-            if forecast_result:
-                results[method] = forecast_result
+            if self.cache is not None:
+                fingerprints[method] = self.cache.fingerprint(df_sorted, column, date_column, periods, method, MODEL_PARAMS)
+                cached = self.cache.get(fingerprints[method])
+                if cached is not None:
+                    yield method, cached
+                    continue
+            pending.append(method)
+        
+        if not pending:
+            return
+        
+        tasks = {method: (df_sorted, column, date_column, periods, method) for method in pending}
+        for method, result in run_tasks(_forecast_worker, tasks, timeout, timed_out):
+            if result:
+                self._cache_result(fingerprints.get(method), result, column, date_column, periods, method, dataset_id)
+                yield method, result
+    
+    def forecast_many(self, df, columns=None, date_column='Date', periods=30, method='auto', timeout=None, dataset_id=None,
+                      timed_out=None, how=None):
+        if df is None or df.empty:
+            return pd.DataFrame(columns=FORECAST_MANY_COLUMNS)
         
-        return results
+        if columns is None:
+            columns = [col for col in df.select_dtypes(include=[np.number]).columns if col != date_column]
+        columns = [col for col in columns if col in df.columns]
+        timeout = FORECAST_TIMEOUT if timeout is None else timeout
+        
+        # Sort, aggregate and cut the frame once for every series
+        df_sorted, freq = resample_frame(df, columns, date_column, MODEL_PARAMS['resample']['freq'], how or MODEL_PARAMS['resample']['how'])
+        base_columns = [date_column] if date_column in df_sorted.columns else []
+        
+        results = {}
+        fingerprints = {}
+        pending = []
+        for column in columns:
+            if df_sorted[column].count() < 10:
+                continue
+            if self.cache is not None:
+                fingerprints[column] = self.cache.fingerprint(df_sorted[base_columns + [column]], column, date_column, periods, method, MODEL_PARAMS)
+                cached = self.cache.get(fingerprints[column])
+                if cached is not None:
+                    results[column] = cached
+                    continue
+            pending.append(column)
+        
+        if method in VECTORIZED_METHODS and pending:
+            # Smoothing and trend regressions fit every series in one vectorised pass, so they skip the pool
+            fit = self._fit_vectorized(method, df_sorted[pending].to_numpy(dtype=float).T, periods)
+            dates = None
+            if date_column in df_sorted.columns:
+                dates = pd.to_datetime(df_sorted[date_column])
+                freq = freq or frame_frequency(df_sorted, date_column)
+                forecast_dates = future_dates(dates.iloc[-1], periods, freq).tolist()
+            unfitted = []
+            for i, column in enumerate(pending):
+                result = self._vectorized_result(method, fit, i)
+                if result is None:
+                    # Too few observations for this model; the pool path applies the usual fallback
+                    unfitted.append(column)
+                    continue
+                # Same history keys as _attach_history gives pool results, without re-deriving the dates per series
+                data = df_sorted[column].dropna()
+                if dates is not None:
+                    result['forecast_dates'] = forecast_dates
+                    result['historical_dates'] = dates[data.index].tail(90).tolist()
+                    result['frequency'] = freq
+                result['historical_data'] = data.tail(90).tolist()
+                results[column] = result
+                self._cache_result(fingerprints.get(column), result, column, date_column, periods, method, dataset_id)
+            pending = unfitted
+        
+        # One task per worker keeps pickling and scheduling overhead flat as the column count grows
+        batch_count = max(1, min(FORECAST_WORKERS, len(pending)))
+        batches = [pending[i::batch_count] for i in range(batch_count) if pending[i::batch_count]]
+        tasks = {
+            i: (df_sorted[base_columns + batch], batch, date_column, periods, method)
+            for i, batch in enumerate(batches)
+        }
+        batch_timeout = timeout * max((len(batch) for batch in batches), default=1)
+        expired = []
+        for _, batch_results in (run_tasks(_forecast_batch_worker, tasks, batch_timeout, expired) if tasks else []):
+            for column, result in batch_results:
+                if result:
+                    results[column] = result
+                    self._cache_result(fingerprints.get(column), result, column, date_column, periods, method, dataset_id)
+        _report_timed_out(timed_out, [column for i in expired for column in batches[i]])
+        
+        # Build the long frame column-wise in one go; a DataFrame per series dominates runtime at scale
+        rows = {name: [] for name in FORECAST_MANY_COLUMNS}
+        for column in columns:
+            result = results.get(column)
+            if result is None:
+                continue
+            horizon = len(result['forecast'])
+            rows['metric'].extend([column] * horizon)
+            rows['date'].extend((result.get('forecast_dates') or [pd.NaT] * horizon)[:horizon])
+            rows['step'].extend(range(1, horizon + 1))
+            rows['forecast'].extend(result['forecast'])
+            rows['lower_bound'].extend((result.get('lower_bound') or [np.nan] * horizon)[:horizon])
+            rows['upper_bound'].extend((result.get('upper_bound') or [np.nan] * horizon)[:horizon])
+            rows['method'].extend([result['method']] * horizon)
+            rows['confidence'].extend([result['confidence']] * horizon)
+        
+        if not rows['metric']:
+            return pd.DataFrame(columns=FORECAST_MANY_COLUMNS)
+        long_frame = pd.DataFrame(rows, columns=FORECAST_MANY_COLUMNS)
+        long_frame['date'] = pd.to_datetime(long_frame['date'])
+        long_frame['forecast'] = long_frame['forecast'].astype(float)
+        return long_frame
+    
+    def forecast_grouped(self, df, column, group_by, date_column='Date', periods=30, method='auto',
+                         reconciliation='bottom_up', timeout=None):
+        group_by = [group_by] if isinstance(group_by, str) else list(group_by)
+        output_columns = group_by + ['level', 'date', 'step', 'forecast', 'base_forecast', 'lower_bound', 'upper_bound', 'method']
+        
+        if df is None or df.empty or column not in df.columns or date_column not in df.columns:
+            return pd.DataFrame(columns=output_columns)
+        
+        # One reshape into a date x group matrix instead of slicing the frame per group;
+        # a date a group has no rows for stays a gap rather than becoming a zero
+        wide = df.dropna(subset=[column]).pivot_table(index=date_column, columns=group_by, values=column, aggfunc='sum',
+                                                      observed=True).sort_index()
+        if wide.empty:
+            return pd.DataFrame(columns=output_columns)
+        
+        nodes, summing_matrix = build_hierarchy(list(wide.columns), len(group_by))
+        node_names = [f'node_{i}' for i in range(len(nodes))]
+        # Parents sum the children observed on each date and are gaps only where none was
+        observed = ~np.isnan(wide.to_numpy())
+        node_values = np.nan_to_num(wide.to_numpy()) @ summing_matrix.T
+        node_values[(observed @ summing_matrix.T) == 0] = np.nan
+        node_frame = pd.DataFrame(node_values, columns=node_names)
+        node_frame.insert(0, date_column, pd.to_datetime(wide.index))
+        
+        long_forecasts = self.forecast_many(node_frame, node_names, date_column, periods, method, timeout=timeout)
+        if long_forecasts.empty:
+            return pd.DataFrame(columns=output_columns)
+        
+        by_node = {name: frame for name, frame in long_forecasts.groupby('metric', sort=False)}
+        horizon = min(len(frame) for frame in by_node.values())
+        forecast_dates = next(iter(by_node.values()))['date'].to_numpy()[:horizon]
+        
+        base = np.empty((len(nodes), horizon))
+        lower = np.full((len(nodes), horizon), np.nan)
+        upper = np.full((len(nodes), horizon), np.nan)
+        methods = []
+        for i, name in enumerate(node_names):
+            frame = by_node.get(name)
+            if frame is None:
+                # A fit that failed or timed out carries its last value forward
+                base[i] = node_frame[name].ffill().iloc[-1]
+                methods.append('Naive (last value)')
+                continue
+            base[i] = frame['forecast'].to_numpy()[:horizon]
+            lower[i] = frame['lower_bound'].to_numpy()[:horizon]
+            upper[i] = frame['upper_bound'].to_numpy()[:horizon]
+            methods.append(frame['method'].iloc[0])
+        
+        reconciled = reconcile(base, summing_matrix, reconciliation)
+        # Keep each node's interval width and move it with the reconciled point forecast
+        adjustment = reconciled - base
+        lower = lower + adjustment
+        upper = upper + adjustment
+        
+        result = {col: np.repeat([node['key'][k] if k < node['level'] else None for node in nodes], horizon)
+                  for k, col in enumerate(group_by)}
+        result.update({
+            'level': np.repeat([node['level'] for node in nodes], horizon),
+            'date': np.tile(forecast_dates, len(nodes)),
+            'step': np.tile(np.arange(1, horizon + 1), len(nodes)),
+            'forecast': reconciled.ravel(),
+            'base_forecast': base.ravel(),
+            'lower_bound': lower.ravel(),
+            'upper_bound': upper.ravel(),
+            'method': np.repeat(methods, horizon)
+        })
+        return pd.DataFrame(result, columns=output_columns)
     
     def calculate_growth_rate(self, data, period='monthly'):
         if len(data) < 2:
@@ -279,13 +928,7 @@ class ForecastingEngine:
         if len(data) < 10:
             return None
         
-        X = np.arange(len(data)).reshape(-1, 1)
-        y = data.values
-        
-        model = LinearRegression()
-        model.fit(X, y)
-        
-        slope = model.coef_[0]
+        slope = trend_regression(data.to_numpy(dtype=float), periods=0)['coefficients'][0, 1]
         
         recent_mean = data.tail(10).mean()
         older_mean = data.head(10).mean()
@@ -0,0 +1,38 @@
+import numpy as np
+
+RECONCILIATION_METHODS = ('bottom_up', 'ols', None)
+
+
+def build_hierarchy(bottom_keys, depth):
+    bottom_keys = [key if isinstance(key, tuple) else (key,) for key in bottom_keys]
+
+    nodes = []
+    rows = []
+    for level in range(depth + 1):
+        prefixes = {}
+        for j, key in enumerate(bottom_keys):
+            prefixes.setdefault(key[:level], []).append(j)
+        for prefix, members in prefixes.items():
+            row = np.zeros(len(bottom_keys))
+            row[members] = 1.0
+            nodes.append({'level': level, 'key': prefix})
+            rows.append(row)
+
+    return nodes, np.vstack(rows)
+
+
+def reconcile(base, summing_matrix, method='bottom_up'):
+    if method is None:
+        return base
+
+    n_bottom = summing_matrix.shape[1]
+
+    if method == 'bottom_up':
+        return summing_matrix @ base[-n_bottom:]
+
+    if method == 'ols':
+        # Project the base forecasts onto the coherent subspace spanned by S
+        bottom = np.linalg.lstsq(summing_matrix, base, rcond=None)[0]
+        return summing_matrix @ bottom
+
+    raise ValueError(f"Unsupported reconciliation method '{method}'. Choose one of {RECONCILIATION_METHODS}.")
@@ -0,0 +1,215 @@
+import os
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from utils.data_storage import register_invalidation_hook
+from utils.regression import regression_statistics, merge_statistics, solve_regression
+from utils.smoothing import Z_95, simple_exponential_smoothing, holt_winters, update_smoothing
+
+MODEL_REFIT_EVERY = int(os.environ.get('MODEL_REFIT_EVERY', '30'))
+MODEL_DRIFT_RATIO = float(os.environ.get('MODEL_DRIFT_RATIO', '2.0'))
+
+REGRESSION_STATE_METHODS = ('linear', 'polynomial')
+SMOOTHING_STATE_METHODS = ('exponential', 'holt', 'holt_winters')
+ARIMA_STATE_METHODS = ('arima', 'auto_arima')
+INCREMENTAL_METHODS = REGRESSION_STATE_METHODS + SMOOTHING_STATE_METHODS + ARIMA_STATE_METHODS
+
+
+def _to_json(value):
+    if isinstance(value, dict):
+        return {key: _to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _arima_filter(state, new_values, periods):
+    from statsmodels.tsa.arima.model import ARIMA
+    from statsmodels.tsa.statespace.initialization import Initialization
+
+    # Filter only the new observations, started from the stored state, with the forecast horizon
+    # appended as missing values so one pass yields both the updated state and the forecast
+    n_new = len(new_values)
+    endog = np.concatenate([np.asarray(new_values, dtype=float), np.full(periods, np.nan)])
+    model = ARIMA(endog, order=tuple(state['order']), seasonal_order=tuple(state['seasonal_order']))
+    model.ssm.initialization = Initialization(
+        model.k_states,
+        'known',
+        constant=np.asarray(state['state'], dtype=float),
+        stationary_cov=np.asarray(state['state_cov'], dtype=float)
+    )
+    filtered = model.filter(np.asarray(state['params'], dtype=float))
+
+    forecast = filtered.forecasts[0, n_new:]
+    spread = Z_95 * np.sqrt(filtered.forecasts_error_cov[0, 0, n_new:])
+    errors = filtered.forecasts_error[0, :n_new] / np.sqrt(filtered.forecasts_error_cov[0, 0, :n_new])
+
+    updated = dict(state)
+    updated['state'] = filtered.predicted_state[:, n_new]
+    updated['state_cov'] = filtered.predicted_state_cov[:, :, n_new]
+    output = {
+        'forecast': forecast[None, :],
+        'lower_bound': (forecast - spread)[None, :],
+        'upper_bound': (forecast + spread)[None, :]
+    }
+    return updated, output, errors
+
+
+def fit_model_state(method, values, periods=30, params=None):
+    params = params or {}
+    values = np.asarray(values, dtype=float)
+
+    if method in REGRESSION_STATE_METHODS:
+        degree = 1 if method == 'linear' else params.get('degree', 2)
+        stats = regression_statistics(values, degree)
+        fit = solve_regression(stats, periods)
+        state = {'statistics': stats}
+    elif method in SMOOTHING_STATE_METHODS:
+        if method == 'exponential':
+            fit = simple_exponential_smoothing(values, periods, alphas=params.get('alpha'))
+        elif method == 'holt':
+            fit = holt_winters(values, periods)
+        else:
+            fit = holt_winters(values, periods, season_length=params.get('season_length'))
+        state = {key: fit[key] for key in ('level', 'trend', 'season', 'alpha', 'beta', 'gamma', 'season_length',
+                                           'sse', 'n_errors', 'n_steps')}
+    elif method in ARIMA_STATE_METHODS:
+        from statsmodels.tsa.arima.model import ARIMA
+        from utils.arima_search import auto_arima
+
+        if method == 'auto_arima':
+            search_result = auto_arima(values, **params)
+            if search_result is None:
+                return None, None
+            fitted = search_result['fitted']
+            order = search_result['order']
+            seasonal_order = search_result['seasonal_order'] or (0, 0, 0, 0)
+        else:
+            order = tuple(params.get('order', (1, 1, 1)))
+            seasonal_order = (0, 0, 0, 0)
+            fitted = ARIMA(values, order=order).fit()
+        state = {
+            'order': order,
+            'seasonal_order': seasonal_order,
+            'params': np.asarray(fitted.params),
+            'state': fitted.predicted_state[:, -1],
+            'state_cov': fitted.predicted_state_cov[:, :, -1]
+        }
+        state, fit, _ = _arima_filter(state, [], periods)
+    else:
+        raise ValueError(f"Method '{method}' does not support incremental updates. Choose one of {INCREMENTAL_METHODS}.")
+
+    state.update({'method': method, 'n_obs': len(values), 'refit_n_obs': len(values)})
+    return state, fit
+
+
+def update_model_state(state, new_values, periods=30):
+    method = state['method']
+    new_values = np.asarray(new_values, dtype=float)
+
+    if method in REGRESSION_STATE_METHODS:
+        stats = state['statistics']
+        previous = solve_regression(stats, len(new_values))
+        errors = (new_values - previous['forecast'][0]) / previous['sigma'][0]
+        stats = merge_statistics(stats, regression_statistics(new_values, stats['degree'], stats['scale'], stats['n_steps']))
+        fit = solve_regression(stats, periods)
+        updated = dict(state, statistics=stats)
+    elif method in SMOOTHING_STATE_METHODS:
+        sigma = np.sqrt(np.asarray(state['sse'], dtype=float) / max(state['n_errors'], 1))
+        fit = update_smoothing(new_values, state, periods)
+        errors = np.sqrt(fit['new_sse'] / max(len(new_values), 1)) / sigma if len(new_values) else np.array([])
+        updated = dict(state)
+        updated.update({key: fit[key] for key in ('level', 'trend', 'season', 'sse', 'n_errors', 'n_steps')})
+    else:
+        updated, fit, errors = _arima_filter(state, new_values, periods)
+
+    errors = np.asarray(errors, dtype=float)
+    drift = float(np.sqrt(np.mean(errors ** 2))) if errors.size and np.isfinite(errors).all() else 0.0
+    updated['n_obs'] = state['n_obs'] + len(new_values)
+    return updated, fit, drift
+
+
+def refit_reason(state, values, dates=None):
+    # Returns None when the stored model can absorb the new rows, otherwise why it cannot
+    if state is None:
+        return 'initial'
+    n_obs = state['n_obs']
+    if len(values) < n_obs or not np.isclose(values[n_obs - 1], state['last_value']):
+        return 'history_changed'
+    if dates is not None and state.get('last_date') is not None and pd.Timestamp(dates[n_obs - 1]) != pd.Timestamp(state['last_date']):
+        return 'history_changed'
+    if len(values) - state['refit_n_obs'] >= MODEL_REFIT_EVERY:
+        return 'schedule'
+    return None
+
+
+class ModelStateStore:
+
+    def __init__(self, storage=None):
+        self.storage = storage
+        self.updates = 0
+        self.refits = 0
+        self._states = {}
+        self._lock = threading.Lock()
+        register_invalidation_hook(self.invalidate)
+
+    def get(self, dataset_id, metric_name, method):
+        key = (dataset_id, metric_name, method)
+        with self._lock:
+            state = self._states.get(key)
+        if state is None and self.storage is not None and dataset_id is not None:
+            state = self.storage.get_model_state(dataset_id, metric_name, method)
+            if state is not None:
+                with self._lock:
+                    self._states[key] = state
+        return state
+
+    def put(self, dataset_id, metric_name, method, state, result, refit=True):
+        state = _to_json(state)
+        state['fitted_at'] = datetime.utcnow().isoformat()
+        with self._lock:
+            self._states[(dataset_id, metric_name, method)] = state
+            if refit:
+                self.refits += 1
+            else:
+                self.updates += 1
+
+        if self.storage is not None and dataset_id is not None:
+            self.storage.save_model_state(
+                dataset_id,
+                metric_name,
+                method,
+                result,
+                state,
+                confidence_level=result.get('confidence', 'Medium'),
+                r2_score=result.get('r2_score'),
+                parameters={'model_update': result.get('model_update'), 'refit_reason': result.get('refit_reason')}
+            )
+        return state
+
+    def invalidate(self, dataset_id, start=None, end=None):
+        # Rows appended after a model's last observation leave it valid; anything earlier does not
+        with self._lock:
+            stale = [
+                key for key, state in self._states.items()
+                if key[0] == dataset_id and (start is None or state.get('last_date') is None
+                                             or pd.Timestamp(state['last_date']) >= pd.Timestamp(start))
+            ]
+            for key in stale:
+                del self._states[key]
+
+        if self.storage is not None:
+            self.storage.clear_model_states(dataset_id, start)
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'states': len(self._states), 'updates': self.updates, 'refits': self.refits}
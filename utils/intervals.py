@@ -0,0 +1,91 @@
+import os
+import numpy as np
+
+INTERVAL_PATHS = int(os.environ.get('INTERVAL_PATHS', '2000'))
+INTERVAL_QUANTILES = tuple(float(q) for q in os.environ.get('INTERVAL_QUANTILES', '0.025,0.975').split(','))
+INTERVAL_CHUNK_ELEMENTS = int(os.environ.get('INTERVAL_CHUNK_ELEMENTS', '4000000'))
+INTERVAL_SEED = int(os.environ.get('INTERVAL_SEED', '0'))
+INTERVAL_HISTORY = int(os.environ.get('INTERVAL_HISTORY', '180'))
+
+
+def _residual_pool(residuals):
+    # Valid residuals are packed to the front of each row so a draw is one index below the row's count
+    R = np.atleast_2d(np.asarray(residuals, dtype=float))
+    missing = np.isnan(R)
+    order = np.argsort(missing, axis=1, kind='stable')
+    return np.take_along_axis(R, order, axis=1), (~missing).sum(axis=1)
+
+
+def moving_average_residuals(values, window=7, horizon=1):
+    # In-sample errors of the moving average `horizon` steps ahead: each value against the mean
+    # of the window that ended `horizon` steps before it
+    Y = np.atleast_2d(np.asarray(values, dtype=float))
+    if Y.shape[1] < window + horizon:
+        return np.full((Y.shape[0], 0), np.nan)
+    cumulative = np.cumsum(np.concatenate([np.zeros((Y.shape[0], 1)), Y], axis=1), axis=1)
+    means = (cumulative[:, window:] - cumulative[:, :-window]) / window
+    return Y[:, window + horizon - 1:] - means[:, :-horizon]
+
+
+def error_profile(residuals, horizon_errors, horizon, periods):
+    # Fits the centred-shock model to a method's in-sample errors: the error h steps ahead is
+    # bias_h + d_h + p * (d_1 + ... + d_{h-1}) with zero-mean one-step shocks d. p is matched to the
+    # error variance `horizon` steps ahead (about 0 for noise around a level, 1 for a random walk)
+    # and the bias, e.g. a flat forecast falling behind a growing MRR, is extended linearly.
+    R = np.atleast_2d(residuals)
+    H = np.atleast_2d(horizon_errors)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nanmean(R, axis=1)
+        variance = np.nanvar(R, axis=1)
+        if horizon < 2:
+            return R - mean[:, None], np.zeros(len(R)), np.repeat(mean[:, None], periods, axis=1)
+        persistence = np.sqrt(np.clip((np.nanvar(H, axis=1) / variance - 1) / (horizon - 1), 0.0, 1.0))
+        slope = (np.nanmean(H, axis=1) - mean) / (horizon - 1)
+    steps = np.arange(periods)[None, :]
+    bias = np.nan_to_num(mean)[:, None] + np.nan_to_num(slope)[:, None] * steps
+    return R - mean[:, None], np.nan_to_num(persistence), bias
+
+
+def bootstrap_intervals(residuals, forecast, quantiles=None, n_paths=None, persistence=0.0, chunk_elements=None, seed=None):
+    forecast = np.atleast_2d(np.asarray(forecast, dtype=float))
+    quantiles = np.asarray(INTERVAL_QUANTILES if quantiles is None else quantiles, dtype=float)
+    n_paths = INTERVAL_PATHS if n_paths is None else n_paths
+    chunk_elements = INTERVAL_CHUNK_ELEMENTS if chunk_elements is None else chunk_elements
+    rng = np.random.default_rng(INTERVAL_SEED if seed is None else seed)
+
+    pool, n_valid = _residual_pool(residuals)
+    n_series, periods = forecast.shape
+    persistence = np.broadcast_to(np.asarray(persistence, dtype=float), (n_series,))[:, None, None]
+    rows = np.arange(n_series)[:, None, None]
+
+    # Paths are simulated a block of horizon steps at a time so memory stays at chunk_elements
+    # whatever the horizon; the running error sum carries each path across blocks
+    chunk = int(max(1, min(periods, chunk_elements // max(n_series * n_paths, 1))))
+    bounds = np.full((len(quantiles), n_series, periods), np.nan)
+    running = np.zeros((n_series, n_paths, 1))
+    usable = n_valid > 0
+    if not usable.any():
+        return _interval_output(quantiles, bounds)
+
+    for start in range(0, periods, chunk):
+        steps = min(chunk, periods - start)
+        index = (rng.random((n_series, n_paths, steps)) * n_valid[:, None, None]).astype(np.intp)
+        draws = pool[rows, np.minimum(index, pool.shape[1] - 1)]
+        # Error h steps ahead is that step's shock plus a share of every earlier shock:
+        # 0 for independent errors around a fitted trend, 1 for a random walk, alpha for smoothing
+        totals = running + np.cumsum(draws, axis=2)
+        paths = forecast[:, None, start:start + steps] + draws + persistence * (totals - draws)
+        bounds[:, :, start:start + steps] = np.quantile(paths, quantiles, axis=1)
+        running = totals[:, :, -1:]
+
+    bounds[:, ~usable] = np.nan
+    return _interval_output(quantiles, bounds)
+
+
+def _interval_output(quantiles, bounds):
+    return {
+        'quantiles': quantiles.tolist(),
+        'bounds': bounds,
+        'lower_bound': bounds[0],
+        'upper_bound': bounds[-1]
+    }
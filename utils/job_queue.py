@@ -0,0 +1,239 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import pandas as pd
+from utils.data_storage import DataStorage
+from utils.forecast_cache import series_fingerprint, forecast_fingerprint
+from utils.forecasting import ForecastingEngine, COMPARISON_METHODS
+from utils.serialization import hash_dataframe
+
+JOB_QUEUE_WORKERS = int(os.environ.get('JOB_QUEUE_WORKERS', '2'))
+JOB_STALE_AFTER = float(os.environ.get('JOB_STALE_AFTER', '600'))
+JOB_RETENTION_HOURS = float(os.environ.get('JOB_RETENTION_HOURS', '24'))
+JOB_PRUNE_EVERY = 300
+# A running fit touches its job this often so it never looks abandoned
+JOB_HEARTBEAT = JOB_STALE_AFTER / 4
+
+JOB_KINDS = ('forecast', 'compare', 'grouped')
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job_fingerprint(kind, df, column, date_column, periods, method, params=None):
+    return forecast_fingerprint(series_fingerprint(df, column, date_column), column, date_column, periods,
+                                method, dict(params or {}, kind=kind))
+
+
+def _restore_dates(result):
+    # Dates come back from JSON as strings
+    if isinstance(result, dict):
+        for key in ('forecast_dates', 'historical_dates'):
+            if result.get(key) is not None:
+                result[key] = pd.to_datetime(result[key]).tolist()
+    return result
+
+
+class ForecastJobQueue:
+
+    def __init__(self, storage=None, engine=None, max_workers=None):
+        self.storage = storage or DataStorage()
+        self.engine = engine or ForecastingEngine()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or JOB_QUEUE_WORKERS, thread_name_prefix='forecast-job')
+        self._futures = {}
+        self._last_prune = None
+        self._lock = threading.Lock()
+
+    def submit_forecast(self, df, column, date_column='Date', periods=30, method='auto', dataset_id=None):
+        # Model state is saved per dataset, so identical series from two datasets are separate jobs
+        job_key = job_fingerprint('forecast', df, column, date_column, periods, method, {'dataset_id': dataset_id})
+        return self._submit(job_key, 'forecast', self._run_forecast, (df, column, date_column, periods, method, dataset_id),
+                            dataset_id, column, method, {'periods': periods, 'date_column': date_column})
+
+    def submit_comparison(self, df, column, date_column='Date', periods=30, methods=None, dataset_id=None, backtest=False):
+        methods = list(methods or COMPARISON_METHODS)
+        job_key = job_fingerprint('compare', df, column, date_column, periods, ','.join(methods),
+                                  {'backtest': backtest, 'dataset_id': dataset_id})
+        return self._submit(job_key, 'compare', self._run_comparison,
+                            (df, column, date_column, periods, methods, dataset_id, backtest),
+                            dataset_id, column, ','.join(methods),
+                            {'periods': periods, 'date_column': date_column, 'backtest': backtest})
+
+    def submit_grouped(self, df, column, group_by, date_column='Date', periods=30, method='auto', reconciliation='bottom_up',
+                       dataset_id=None):
+        group_by = [group_by] if isinstance(group_by, str) else list(group_by)
+        # The group columns shape the hierarchy, so they are part of the key along with the series
+        job_key = forecast_fingerprint(hash_dataframe(df[[date_column] + group_by + [column]]), column, date_column, periods,
+                                       method, {'kind': 'grouped', 'group_by': group_by,
+                                                'reconciliation': reconciliation, 'dataset_id': dataset_id})
+        return self._submit(job_key, 'grouped', self._run_grouped,
+                            (df, column, group_by, date_column, periods, method, reconciliation),
+                            dataset_id, column, method,
+                            {'periods': periods, 'date_column': date_column, 'group_by': group_by,
+                             'reconciliation': reconciliation})
+
+    def _submit(self, job_key, kind, fn, args, dataset_id, metric_name, method, parameters):
+        self.prune()
+        with self._lock:
+            # Identical work already queued or running, here or in another process, is shared
+            job_id = self.storage.attach_job(job_key, JOB_STALE_AFTER)
+            if job_id is None:
+                job_id = self.storage.create_job(job_key, kind, dataset_id, metric_name, method, parameters)
+                self._futures[job_id] = self._executor.submit(self._execute, job_id, fn, args)
+        return job_id
+
+    def prune(self, force=False):
+        # Finished jobs keep their result only for JOB_RETENTION_HOURS
+        now = time.monotonic()
+        if not force and self._last_prune is not None and now - self._last_prune < JOB_PRUNE_EVERY:
+            return 0
+        self._last_prune = now
+        return self.storage.prune_jobs(datetime.utcnow() - timedelta(hours=JOB_RETENTION_HOURS))
+
+    def _execute(self, job_id, fn, args):
+        try:
+            if self._cancel_requested(job_id):
+                raise JobCancelled()
+            self.storage.update_job(job_id, status='running', started_at=datetime.utcnow(), message='Starting')
+
+            def report(progress, message):
+                # Progress reports double as cancellation checkpoints
+                if self._cancel_requested(job_id):
+                    raise JobCancelled()
+                self.storage.update_job(job_id, progress=progress, message=message)
+
+            result = fn(report, *args)
+            self.storage.update_job(job_id, status='completed', progress=1.0, message='Done', result=result,
+                                    finished_at=datetime.utcnow())
+        except JobCancelled:
+            self.storage.update_job(job_id, status='cancelled', message='Cancelled', finished_at=datetime.utcnow())
+        except Exception as e:
+            self.storage.update_job(job_id, status='failed', message='Failed', error=str(e), finished_at=datetime.utcnow())
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+
+    def _cancel_requested(self, job_id):
+        job = self.storage.get_job(job_id)
+        return job is None or job['cancel_requested']
+
+    def _run_forecast(self, report, df, column, date_column, periods, method, dataset_id):
+        result = self._with_heartbeat(report, 0.1, f'Fitting {method} model', self.engine.forecast_incremental,
+                                      df, column, date_column, periods, method, dataset_id)
+        if result is None:
+            raise ValueError('Insufficient data points for the selected method.')
+        return result
+
+    def _run_grouped(self, report, df, column, group_by, date_column, periods, method, reconciliation):
+        result = self._with_heartbeat(report, 0.1, f'Forecasting every {" / ".join(group_by)} group',
+                                      self.engine.forecast_grouped, df, column, group_by, date_column, periods, method,
+                                      reconciliation)
+        if result.empty:
+            raise ValueError('Insufficient data points for grouped forecasts.')
+        return {'forecasts': result.to_dict('records')}
+
+    def _with_heartbeat(self, report, progress, message, fn, *args):
+        # A single fit has no steps of its own to report, so a heartbeat keeps the job fresh meanwhile
+        report(progress, message)
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(report, stop, progress, message), daemon=True)
+        heartbeat.start()
+        try:
+            result = fn(*args)
+        finally:
+            stop.set()
+            heartbeat.join()
+        report(0.9, 'Finishing')
+        return result
+
+    def _heartbeat(self, report, stop, progress, message):
+        started = time.monotonic()
+        while not stop.wait(JOB_HEARTBEAT):
+            try:
+                report(progress, f'{message} ({time.monotonic() - started:.0f}s)')
+            except JobCancelled:
+                # The fit cannot be interrupted; the report after it raises instead
+                return
+
+    def _run_comparison(self, report, df, column, date_column, periods, methods, dataset_id, backtest):
+        steps = len(methods) + (1 if backtest else 0)
+        report(0.0, f'Fitting {len(methods)} models')
+
+        results = {}
+        timed_out = []
+        comparisons = self.engine.iter_compare_forecasts(df, column, date_column, periods, methods, dataset_id=dataset_id,
+                                                         timed_out=timed_out)
+        try:
+            for method, result in comparisons:
+                results[method] = result
+                report(len(results) / steps, f"{result['method']} finished ({len(results)} of {len(methods)} models)")
+        finally:
+            # Stops fits that have not started yet when the job is cancelled
+            comparisons.close()
+
+        output = {'results': {method: results[method] for method in methods if method in results}}
+        if backtest and output['results']:
+            report(len(methods) / steps, 'Backtesting models over rolling cutoffs')
+            summary = self.engine.backtest(df, column, date_column, periods, list(output['results']), timed_out=timed_out)
+            output['backtest'] = summary.to_dict('records')
+            # Combines the forecasts and scores above; no model is fitted again
+            output['ensemble'] = self.engine.ensemble_forecast(df, column, date_column, periods, list(output['results']),
+                                                               results=output['results'], scores=summary)
+        output['timed_out'] = timed_out
+        return output
+
+    def status(self, job_id):
+        job = self.storage.get_job(job_id)
+        if job is None:
+            return None
+
+        with self._lock:
+            owned = job_id in self._futures
+        # A job whose owning process died would otherwise stay queued or running for good
+        stale_before = datetime.utcnow() - timedelta(seconds=JOB_STALE_AFTER)
+        if (not owned and job['status'] not in FINISHED_STATUSES and job['updated_at'] is not None
+                and job['updated_at'] < stale_before and self.storage.expire_job(job_id, stale_before)):
+            job = self.storage.get_job(job_id)
+
+        result = job['result']
+        if result is not None:
+            if job['kind'] == 'compare':
+                for method_result in result.get('results', {}).values():
+                    _restore_dates(method_result)
+                _restore_dates(result.get('ensemble'))
+            elif job['kind'] == 'grouped':
+                forecasts = pd.DataFrame(result['forecasts'])
+                forecasts['date'] = pd.to_datetime(forecasts['date'])
+                job['result'] = forecasts
+            else:
+                _restore_dates(result)
+
+        end = job['finished_at'] or datetime.utcnow()
+        job['elapsed'] = (end - job['started_at']).total_seconds() if job['started_at'] else 0.0
+        job['finished'] = job['status'] in FINISHED_STATUSES
+        return job
+
+    def cancel(self, job_id):
+        job = self.storage.get_job(job_id)
+        if job is None or job['status'] in FINISHED_STATUSES:
+            return False
+
+        # A job shared by several requesters, in any process, keeps running until the last of them cancels
+        if not self.storage.release_job(job_id):
+            return True
+
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            # It never started, so no worker will record the outcome
+            self.storage.update_job(job_id, status='cancelled', message='Cancelled', finished_at=datetime.utcnow())
+            with self._lock:
+                self._futures.pop(job_id, None)
+        return True
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+FORECAST_WORKERS = int(os.environ.get('FORECAST_WORKERS', str(os.cpu_count() or 1)))
+FORECAST_TIMEOUT = float(os.environ.get('FORECAST_TIMEOUT', '60'))
+FORECAST_START_METHOD = os.environ.get('FORECAST_START_METHOD', 'spawn')
+TASK_POLL_INTERVAL = 0.1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned workers avoid forking a process that is running Streamlit's threads
+            _pool = ProcessPoolExecutor(
+                max_workers=FORECAST_WORKERS,
+                mp_context=multiprocessing.get_context(FORECAST_START_METHOD)
+            )
+        return _pool
+
+
+def reset_process_pool(pool=None):
+    global _pool
+    with _pool_lock:
+        # Another caller may already have swapped in a fresh pool
+        if pool is not None and _pool is not pool:
+            return
+        pool, _pool = _pool, None
+
+    if pool is None:
+        return
+
+    # Later submissions get fresh workers; work already queued on the old pool, other callers'
+    # fits included, still runs to completion before its workers exit
+    pool.shutdown(wait=False)
+
+
+class TaskTimeout(BaseException):
+    # A BaseException so the broad `except Exception` fallbacks inside the models cannot swallow it
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise TaskTimeout()
+
+
+def _call_with_deadline(fn, args, timeout):
+    # The timer runs inside the process doing the fit, so the deadline starts when the fit does and
+    # the worker is free again once it expires. Nested calls run under the outer task's deadline.
+    if timeout is None or not hasattr(signal, 'setitimer') or threading.current_thread() is not threading.main_thread() \
+            or signal.getitimer(signal.ITIMER_REAL)[0] > 0:
+        return fn(*args)
+
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return fn(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def run_tasks(fn, tasks, timeout=None, timed_out=None):
+    # Every task gets its own `timeout` seconds; keys of tasks that overrun are appended to `timed_out`
+    # and the caller moves on without them
+    timed_out = [] if timed_out is None else timed_out
+
+    # Tasks started from inside a pool worker run inline rather than nesting another pool
+    if FORECAST_WORKERS <= 1 or multiprocessing.parent_process() is not None:
+        for key, args in tasks.items():
+            try:
+                yield key, _call_with_deadline(fn, args, timeout)
+            except TaskTimeout:
+                timed_out.append(key)
+            except Exception:
+                continue
+        return
+
+    pool = get_process_pool()
+    futures = {pool.submit(_call_with_deadline, fn, args, timeout): key for key, args in tasks.items()}
+    pending = set(futures)
+    started = {}
+    abandoned = False
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=None if timeout is None else TASK_POLL_INTERVAL,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except TaskTimeout:
+                    timed_out.append(futures[future])
+                    continue
+                except Exception:
+                    continue
+                yield futures[future], result
+
+            if timeout is None:
+                continue
+            # Backstop for fits the timer cannot interrupt, e.g. stuck in native code or on platforms
+            # without SIGALRM. The pool marks a task running while it still waits in the call queue,
+            # where up to two rounds of deadline-bound fits can be ahead of it.
+            now = time.monotonic()
+            for future in [future for future in pending if future.running()]:
+                if now - started.setdefault(future, now) > 3 * timeout + TASK_POLL_INTERVAL:
+                    pending.discard(future)
+                    abandoned = True
+                    timed_out.append(futures[future])
+    except GeneratorExit:
+        # The caller stopped listening, e.g. a cancelled job; tasks that have not started never run
+        for future in futures:
+            future.cancel()
+        raise
+
+    if abandoned:
+        # A fit that ignored its deadline cannot be stopped without killing workers other callers share,
+        # so it is left to finish on a retired pool
+        reset_process_pool(pool)
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+from utils.data_processor import DataProcessor
+from utils.serialization import combine_hashes
+
+ALL_ROWS_KEY = '__all__'
+NO_DATE_KEY = '__null__'
+DEFAULT_PARTITION_FREQ = 'M'
+# Hidden per-row ordinal stored with each partition so loads can restore the saved row order
+ROW_ORDER_COLUMN = '__row__'
+
+
+def choose_partition_column(df, partition_by='auto'):
+    if partition_by is None:
+        return None
+
+    if partition_by != 'auto':
+        if partition_by not in df.columns:
+            raise ValueError(f"Partition column '{partition_by}' not found in dataset")
+        return partition_by
+
+    candidates = DataProcessor()._detect_date_columns(df)
+    datetime_candidates = [col for col in candidates if pd.api.types.is_datetime64_any_dtype(df[col])]
+
+    for col in datetime_candidates + [col for col in candidates if col not in datetime_candidates]:
+        parsed = pd.to_datetime(df[col].head(100), errors='coerce')
+        if parsed.notna().any():
+            return col
+
+    return None
+
+
+def split_partitions(df, partition_column=None, freq=DEFAULT_PARTITION_FREQ):
+    if partition_column is None:
+        yield {
+            'partition_key': ALL_ROWS_KEY,
+            'partition_start': None,
+            'min_date': None,
+            'max_date': None,
+            'frame': df
+        }
+        return
+
+    dates = pd.to_datetime(df[partition_column], errors='coerce')
+    if getattr(dates.dt, 'tz', None) is not None:
+        dates = dates.dt.tz_convert(None)
+
+    periods = dates.dt.to_period(freq)
+    for period, positions in periods.groupby(periods, sort=True).indices.items():
+        chunk_dates = dates.iloc[positions]
+        yield {
+            'partition_key': str(period),
+            'partition_start': period.start_time.to_pydatetime(),
+            'min_date': chunk_dates.min().to_pydatetime(),
+            'max_date': chunk_dates.max().to_pydatetime(),
+            'frame': df.iloc[positions]
+        }
+
+    missing = dates.isna().to_numpy().nonzero()[0]
+    if len(missing):
+        yield {
+            'partition_key': NO_DATE_KEY,
+            'partition_start': None,
+            'min_date': None,
+            'max_date': None,
+            'frame': df.iloc[missing]
+        }
+
+
+def with_row_order(df, start=0):
+    return df.assign(**{ROW_ORDER_COLUMN: np.arange(start, start + len(df), dtype='int64')})
+
+
+def restore_row_order(df):
+    if ROW_ORDER_COLUMN not in df.columns:
+        return df
+    return df.sort_values(ROW_ORDER_COLUMN, kind='stable').drop(columns=ROW_ORDER_COLUMN).reset_index(drop=True)
+
+
+def filter_date_range(df, date_column, start=None, end=None):
+    if df is None or date_column is None or date_column not in df.columns or (start is None and end is None):
+        return df
+
+    dates = pd.to_datetime(df[date_column], errors='coerce')
+    if getattr(dates.dt, 'tz', None) is not None:
+        dates = dates.dt.tz_convert(None)
+
+    mask = dates.notna()
+    if start is not None:
+        mask &= dates >= pd.Timestamp(start)
+    if end is not None:
+        mask &= dates <= pd.Timestamp(end)
+
+    return df[mask.to_numpy()]
+
+
+def hash_manifest(dtypes, manifest):
+    parts = [('__schema__', combine_hashes(dtypes.items()))]
+    parts.extend((key, manifest[key]['hash']) for key in sorted(manifest))
+    return combine_hashes(parts)
+
+
+def manifest_column_hashes(column_names, manifest):
+    return {
+        col: combine_hashes((key, manifest[key].get('columns', {}).get(col)) for key in sorted(manifest))
+        for col in column_names
+    }
@@ -0,0 +1,91 @@
+import numpy as np
+from utils.smoothing import Z_95
+
+
+def _design(x, degree):
+    return np.vander(x, degree + 1, increasing=True)
+
+
+def regression_statistics(values, degree=1, scale=None, offset=0):
+    Y = np.atleast_2d(np.asarray(values, dtype=float))
+    n_series, n_steps = Y.shape
+    k = degree + 1
+    # Time is rescaled so the normal equations stay well conditioned for higher degrees; the scale
+    # is fixed at the first fit so later observations can be added to the same statistics
+    scale = float(max(n_steps - 1, 1)) if scale is None else scale
+
+    # Missing observations are masked out of the fit rather than dropped per series
+    mask = ~np.isnan(Y)
+    Y0 = np.where(mask, Y, 0.0)
+    W = mask.astype(float)
+    X = _design(np.arange(offset, offset + n_steps) / scale, degree)
+
+    return {
+        'degree': degree,
+        'scale': scale,
+        'n_steps': offset + n_steps,
+        'n_obs': W.sum(axis=1),
+        'gram': (W @ np.einsum('ti,tj->tij', X, X).reshape(n_steps, k * k)).reshape(n_series, k, k),
+        'moment': Y0 @ X,
+        'sum_y': Y0.sum(axis=1),
+        'sum_y2': np.einsum('st,st->s', Y0, Y0)
+    }
+
+
+def merge_statistics(stats, new_stats):
+    merged = dict(new_stats)
+    for key in ('n_obs', 'gram', 'moment', 'sum_y', 'sum_y2'):
+        merged[key] = np.asarray(stats[key], dtype=float) + new_stats[key]
+    return merged
+
+
+def solve_regression(stats, periods=30):
+    degree = stats['degree']
+    k = degree + 1
+    scale = stats['scale']
+    n_steps = stats['n_steps']
+    n_obs = np.asarray(stats['n_obs'], dtype=float)
+    gram = np.array(stats['gram'], dtype=float)
+    moment = np.asarray(stats['moment'], dtype=float)
+    sum_y = np.asarray(stats['sum_y'], dtype=float)
+    sum_y2 = np.asarray(stats['sum_y2'], dtype=float)
+
+    valid = n_obs > k
+    gram[~valid] = np.eye(k)
+    gram_inv = np.linalg.inv(gram)
+    coefficients = np.einsum('sij,sj->si', gram_inv, moment)
+
+    # Residual and total sums of squares straight from the sufficient statistics
+    sse = np.maximum(sum_y2 - np.einsum('si,si->s', coefficients, moment), 0.0)
+    sst = sum_y2 - sum_y ** 2 / np.maximum(n_obs, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(sst > 0, 1 - sse / sst, 0.0)
+
+    X_future = _design(np.arange(n_steps, n_steps + periods) / scale, degree)
+    forecast = coefficients @ X_future.T
+    # Prediction interval: residual variance plus the uncertainty of the fitted trend at each future step
+    sigma2 = sse / np.maximum(n_obs - k, 1)
+    leverage = np.einsum('hi,sij,hj->sh', X_future, gram_inv, X_future)
+    spread = Z_95 * np.sqrt(sigma2[:, None] * (1 + leverage))
+
+    forecast[~valid] = np.nan
+    spread[~valid] = np.nan
+    r2[~valid] = np.nan
+    coefficients[~valid] = np.nan
+
+    return {
+        # Coefficients in per-step units, lowest power first: intercept, slope, ...
+        'coefficients': coefficients / scale ** np.arange(k),
+        'r2': r2,
+        'forecast': forecast,
+        'lower_bound': forecast - spread,
+        'upper_bound': forecast + spread,
+        'sigma': np.sqrt(sigma2),
+        'n_obs': n_obs.astype(int),
+        'degree': degree,
+        'statistics': stats
+    }
+
+
+def trend_regression(values, periods=30, degree=1):
+    return solve_regression(regression_statistics(values, degree), periods)
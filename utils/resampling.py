@@ -0,0 +1,106 @@
+import os
+import numpy as np
+import pandas as pd
+
+RESAMPLE_FREQ = os.environ.get('RESAMPLE_FREQ', 'auto')
+RESAMPLE_AGGREGATION = os.environ.get('RESAMPLE_AGGREGATION', 'mean')
+
+AGGREGATIONS = ('mean', 'sum', 'last', 'median', 'min', 'max')
+
+
+def resolve_aggregation(how, column):
+    # A name cannot tell a flow (sales, to be summed) from a stock or rate (users, margin), so the
+    # caller chooses per metric; anything unspecified is averaged, which is right for stocks and rates
+    aggregation = (how.get(column) if isinstance(how, dict) else how) or RESAMPLE_AGGREGATION
+    if aggregation not in AGGREGATIONS:
+        raise ValueError(f"Unsupported aggregation '{aggregation}'. Choose one of {AGGREGATIONS}.")
+    return aggregation
+
+
+def _anchor(start, end, on_end):
+    # Month, quarter and year labels follow the data: period starts unless most dates sit on period ends
+    return end if np.mean(on_end) > 0.5 else start
+
+
+def detect_frequency(dates):
+    dates = pd.DatetimeIndex(pd.to_datetime(pd.Series(dates)).dropna().unique()).sort_values()
+    if len(dates) < 3:
+        return None
+
+    freq = pd.infer_freq(dates)
+    if freq is not None:
+        return freq
+
+    # Irregular or gappy dates: classify the typical spacing
+    days = dates.to_series().diff().median() / pd.Timedelta(days=1)
+    if days < 1:
+        return pd.tseries.frequencies.to_offset(dates.to_series().diff().median()).freqstr
+    if days < 6:
+        return 'D'
+    if days < 25:
+        return f'W-{dates[-1].day_name()[:3].upper()}'
+    if days < 80:
+        return _anchor('MS', 'ME', dates.is_month_end)
+    if days < 300:
+        return _anchor('QS', 'QE', dates.is_quarter_end)
+    return _anchor('YS', 'YE', dates.is_year_end)
+
+
+def frame_frequency(df, date_column):
+    # The frequency resample_frame settled on travels with the frame; detect it for frames built elsewhere
+    if df.attrs.get('freq'):
+        return df.attrs['freq']
+    if date_column in df.columns:
+        return detect_frequency(df[date_column]) or 'D'
+    return 'D'
+
+
+def resample_frame(df, columns, date_column='Date', freq=None, how=None):
+    freq = RESAMPLE_FREQ if freq is None else freq
+    if date_column not in df.columns:
+        return df[columns], None
+
+    df_sorted = df[[date_column] + columns].sort_values(date_column)
+    if not freq or freq == 'none':
+        return df_sorted, None
+
+    dates = pd.to_datetime(df_sorted[date_column])
+    if freq == 'auto':
+        freq = detect_frequency(dates)
+        if freq is None:
+            return df_sorted, None
+
+    aggregations = {col: resolve_aggregation(how, col) for col in columns}
+    grouped = df_sorted[columns].set_axis(pd.DatetimeIndex(dates, name=date_column)).resample(freq)
+    resampled = grouped.agg(aggregations)
+    # Empty periods are gaps, not zero sales
+    counts = grouped.count()
+    resampled = resampled.where(counts[columns] > 0)
+
+    # A trailing period the data's next date would still fall into is not complete yet
+    # (a week observed through Wednesday); its sum would read as a sudden drop
+    native = detect_frequency(dates)
+    if native is not None and native != freq and len(resampled) > 2:
+        last_date = dates.iloc[-1]
+        next_date = future_dates(last_date, 1, native)[0]
+        if len(pd.Series(0, index=[last_date, next_date]).resample(freq).count()) == 1:
+            resampled = resampled.iloc[:-1]
+
+    resampled = resampled.reset_index()
+    resampled.attrs['freq'] = freq
+    resampled.attrs['aggregation'] = aggregations
+    return resampled, freq
+
+
+def future_dates(last_date, periods, freq='D'):
+    # Dates that do not sit on the frequency's anchor still get `periods` steps strictly after them
+    last_date = pd.Timestamp(last_date)
+    dates = pd.date_range(start=last_date, periods=periods + 1, freq=freq or 'D')
+    return dates[dates > last_date][:periods]
+
+
+def period_days(freq):
+    # Length of one step in days; the second step is measured so anchored offsets count a full period
+    start = pd.Timestamp('2000-01-01')
+    offset = pd.tseries.frequencies.to_offset(freq)
+    return ((start + 2 * offset) - (start + offset)) / pd.Timedelta(days=1)
@@ -0,0 +1,270 @@
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from utils.data_processor import DataProcessor
+from utils.data_storage import DataStorage, register_invalidation_hook, unregister_invalidation_hook
+from utils.forecast_cache import ForecastCache
+from utils.forecasting import ForecastingEngine
+
+SCHEDULER_INTERVAL = float(os.environ.get('SCHEDULER_INTERVAL', '60'))
+SCHEDULER_DAILY_AT = os.environ.get('SCHEDULER_DAILY_AT', '07:00')
+PRECOMPUTE_PERIODS = int(os.environ.get('PRECOMPUTE_PERIODS', '30'))
+PRECOMPUTE_METHOD = os.environ.get('PRECOMPUTE_METHOD', 'auto')
+SCHEDULER_PAGE_SIZE = 500
+# Writes committed just before a poll can carry an earlier timestamp, so consecutive polls overlap
+SCHEDULER_POLL_OVERLAP = timedelta(seconds=60)
+
+KPI_WINDOWS = {'Last 7 Days': 7, 'Last 30 Days': 30, 'Last 90 Days': 90, 'All Time': None}
+
+
+def _metric_columns(df, date_column=None):
+    return [col for col in df.select_dtypes(include=[np.number]).columns if col != date_column and 'id' not in col.lower()]
+
+
+def kpi_snapshot(df, date_column=None, columns=None):
+    columns = columns or _metric_columns(df, date_column)
+    df_sorted = df.sort_values(date_column) if date_column in df.columns else df
+
+    snapshot = {}
+    for window, days in KPI_WINDOWS.items():
+        df_window = df_sorted
+        if days is not None and date_column in df_sorted.columns:
+            cutoff_date = df_sorted[date_column].max() - pd.Timedelta(days=days)
+            df_window = df_sorted[df_sorted[date_column] >= cutoff_date]
+        if df_window.empty:
+            continue
+
+        # Same figures as the overview cards: latest value against the first one in the window
+        values = {}
+        for col in columns:
+            current_value = float(df_window[col].iloc[-1])
+            previous_value = float(df_window[col].iloc[0]) if len(df_window) > 1 else current_value
+            change = current_value - previous_value
+            values[col] = {
+                'current': current_value,
+                'previous': previous_value,
+                'change_pct': (change / previous_value * 100) if previous_value != 0 else 0.0
+            }
+        snapshot[window] = values
+    return snapshot
+
+
+def trend_snapshot(engine, df, date_column=None, columns=None):
+    columns = columns or _metric_columns(df, date_column)
+    df_sorted = df.sort_values(date_column) if date_column in df.columns else df
+
+    snapshot = {}
+    for col in columns:
+        data_series = df_sorted[col].dropna()
+        if len(data_series) <= 10:
+            continue
+        trend = engine.detect_trends(data_series)
+        if not trend:
+            continue
+        growth = engine.calculate_growth_rate(data_series)
+        snapshot[col] = {
+            'trend': trend['trend'],
+            'slope': float(trend['slope']),
+            'volatility': float(trend['volatility']),
+            'recent_average': float(trend['recent_average']),
+            'overall_average': float(trend['overall_average']),
+            'growth_rate': float(growth['growth_rate']) if growth else None
+        }
+    return snapshot
+
+
+def precompute_dataset(dataset_id, storage=None, engine=None, periods=None, method=None):
+    storage = storage or DataStorage()
+    engine = engine or ForecastingEngine(cache=ForecastCache(storage))
+    periods = PRECOMPUTE_PERIODS if periods is None else periods
+    method = PRECOMPUTE_METHOD if method is None else method
+
+    started = time.perf_counter()
+    content_hash = storage.get_dataset_hash(dataset_id)
+    df = storage.load_dataset(dataset_id)
+    if df is None or df.empty:
+        return None
+
+    key_metrics = DataProcessor().detect_key_metrics(df)
+    date_column = key_metrics['date_columns'][0] if key_metrics['date_columns'] else None
+    columns = _metric_columns(df, date_column)
+    computed_at = datetime.utcnow().isoformat()
+
+    # With a forecast cache attached every result is stored under the fingerprint the pages look up
+    forecasts = pd.DataFrame()
+    timed_out = []
+    if date_column is not None and columns:
+        forecasts = engine.forecast_many(df, columns, date_column, periods, method, dataset_id=dataset_id, timed_out=timed_out)
+
+    parameters = {'content_hash': content_hash, 'computed_at': computed_at, 'date_column': date_column}
+    if date_column is not None:
+        dates = pd.to_datetime(df[date_column])
+        parameters['start'] = str(dates.min())
+        parameters['end'] = str(dates.max())
+
+    storage.save_analytics_result(dataset_id, 'kpi_snapshot', kpi_snapshot(df, date_column, columns), parameters)
+    storage.save_analytics_result(dataset_id, 'trend_analysis', trend_snapshot(engine, df, date_column, columns), parameters)
+
+    return {
+        'dataset_id': dataset_id,
+        'content_hash': content_hash,
+        'metrics': len(columns),
+        'forecasts': forecasts['metric'].nunique() if not forecasts.empty else 0,
+        'timed_out': timed_out,
+        'computed_at': computed_at,
+        'elapsed': round(time.perf_counter() - started, 3)
+    }
+
+
+class PrecomputeScheduler:
+
+    def __init__(self, storage=None, interval=None, daily_at=None, periods=None, method=None):
+        self.storage = storage or DataStorage()
+        self.engine = ForecastingEngine(cache=ForecastCache(self.storage))
+        self.interval = SCHEDULER_INTERVAL if interval is None else interval
+        self.daily_at = SCHEDULER_DAILY_AT if daily_at is None else daily_at
+        self.periods = periods
+        self.method = method
+        self._computed = {}
+        self._dirty = set()
+        self._polled_at = None
+        self._last_daily = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        register_invalidation_hook(self.invalidate)
+
+    def invalidate(self, dataset_id, start=None, end=None):
+        # Saves in this process are picked up at once; other processes are caught by hash polling
+        with self._lock:
+            self._dirty.add(dataset_id)
+        self._wake.set()
+
+    def _daily_due(self, now):
+        if not self.daily_at:
+            return False
+        hour, minute = (int(part) for part in self.daily_at.split(':'))
+        scheduled = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return now >= scheduled and self._last_daily != now.date()
+
+    def due_datasets(self, now=None):
+        now = now or datetime.now()
+        daily = self._daily_due(now)
+        with self._lock:
+            dirty = set(self._dirty)
+            # Only datasets written since the last poll can have changed; the first poll and the daily run see all
+            since = None if daily or self._polled_at is None else self._polled_at - SCHEDULER_POLL_OVERLAP
+        polled_at = datetime.utcnow()
+
+        due = []
+        after_id = 0
+        while True:
+            page = self.storage.changed_datasets(since, dirty, after_id, SCHEDULER_PAGE_SIZE)
+            with self._lock:
+                cold = [dataset['id'] for dataset in page if dataset['id'] not in self._computed]
+            stored = self.storage.analytics_result_hashes(cold, 'kpi_snapshot') if cold else {}
+            with self._lock:
+                for dataset in page:
+                    dataset_id = dataset['id']
+                    if dataset_id not in self._computed and dataset['content_hash'] in stored.get(dataset_id, ()):
+                        # After a restart, results already in the database still count as computed
+                        self._computed[dataset_id] = dataset['content_hash']
+                    if daily or dataset_id in dirty or self._computed.get(dataset_id) != dataset['content_hash']:
+                        due.append(dataset_id)
+            if len(page) < SCHEDULER_PAGE_SIZE:
+                break
+            after_id = page[-1]['id']
+
+        with self._lock:
+            self._polled_at = polled_at
+        return due, daily
+
+    def run_once(self, now=None):
+        now = now or datetime.now()
+        due, daily = self.due_datasets(now)
+
+        summaries = []
+        for dataset_id in due:
+            with self._lock:
+                self._dirty.discard(dataset_id)
+            try:
+                summary = precompute_dataset(dataset_id, self.storage, self.engine, self.periods, self.method)
+            except Exception as e:
+                # Retried on the next poll even though the dataset will not show up as changed again
+                with self._lock:
+                    self._dirty.add(dataset_id)
+                summaries.append({'dataset_id': dataset_id, 'error': str(e)})
+                continue
+            if summary is not None:
+                with self._lock:
+                    self._computed[dataset_id] = summary['content_hash']
+                summaries.append(summary)
+
+        if daily:
+            self._last_daily = now.date()
+        return summaries
+
+    def run_forever(self, callback=None):
+        while not self._stop.is_set():
+            summaries = self.run_once()
+            if callback is not None and summaries:
+                callback(summaries)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self, callback=None):
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, args=(callback,), name='precompute-scheduler', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        unregister_invalidation_hook(self.invalidate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute forecasts, KPI snapshots and trend analyses for saved datasets')
+    parser.add_argument('--once', action='store_true', help='process due datasets and exit')
+    parser.add_argument('--interval', type=float, default=SCHEDULER_INTERVAL, help='seconds between polls for changed datasets')
+    parser.add_argument('--daily-at', default=SCHEDULER_DAILY_AT, help="HH:MM local time to recompute everything; '' disables")
+    parser.add_argument('--periods', type=int, default=PRECOMPUTE_PERIODS)
+    parser.add_argument('--method', default=PRECOMPUTE_METHOD)
+    args = parser.parse_args()
+
+    from utils.database import init_db
+    init_db()
+
+    scheduler = PrecomputeScheduler(interval=args.interval, daily_at=args.daily_at, periods=args.periods, method=args.method)
+
+    def report(summaries):
+        for summary in summaries:
+            if 'error' in summary:
+                print(f"dataset {summary['dataset_id']}: failed: {summary['error']}", flush=True)
+            else:
+                print(f"dataset {summary['dataset_id']}: {summary['forecasts']} forecasts, "
+                      f"{summary['metrics']} metrics in {summary['elapsed']}s", flush=True)
+
+    if args.once:
+        report(scheduler.run_once())
+        return
+
+    try:
+        scheduler.run_forever(report)
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == '__main__':
+    main()
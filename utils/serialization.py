@@ -0,0 +1,168 @@
+import hashlib
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+SUPPORTED_FORMATS = ('parquet', 'arrow', 'json')
+BINARY_FORMATS = ('parquet', 'arrow')
+# JSON records plus each column's dtype; used when a frame cannot be written as Arrow
+TYPED_JSON_FORMAT = 'typed_json'
+TEXT_FORMATS = ('json', TYPED_JSON_FORMAT)
+
+DEFAULT_STORAGE_FORMAT = os.environ.get('DATASET_STORAGE_FORMAT', 'parquet')
+DEFAULT_COMPRESSION = os.environ.get('DATASET_COMPRESSION', 'zstd')
+
+
+def resolve_storage_format(storage_format=None):
+    storage_format = (storage_format or DEFAULT_STORAGE_FORMAT).lower()
+
+    if storage_format not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported storage format '{storage_format}'. Choose one of {SUPPORTED_FORMATS}.")
+
+    if storage_format in BINARY_FORMATS and not PYARROW_AVAILABLE:
+        return TYPED_JSON_FORMAT
+
+    return storage_format
+
+
+def serialize_dataframe(df, storage_format='parquet', compression=None):
+    compression = compression or DEFAULT_COMPRESSION
+    frame = df.reset_index(drop=True)
+
+    if storage_format == 'parquet':
+        buffer = io.BytesIO()
+        frame.to_parquet(buffer, engine='pyarrow', compression=compression, index=False)
+        return buffer.getvalue()
+
+    if storage_format == 'arrow':
+        buffer = io.BytesIO()
+        frame.to_feather(buffer, compression=compression)
+        return buffer.getvalue()
+
+    if storage_format == 'json':
+        return frame.to_json(orient='records', date_format='iso')
+
+    if storage_format == TYPED_JSON_FORMAT:
+        return json.dumps({
+            'schema': dtype_schema(frame),
+            'records': json.loads(frame.to_json(orient='records', date_format='iso', date_unit='ns'))
+        }, default=str)
+
+    raise ValueError(f"Unsupported storage format '{storage_format}'")
+
+
+def dtype_schema(df):
+    schema = {}
+    for col, dtype in df.dtypes.items():
+        entry = {'dtype': str(dtype)}
+        if isinstance(dtype, pd.CategoricalDtype):
+            entry['categories'] = dtype.categories.tolist()
+            entry['ordered'] = bool(dtype.ordered)
+        schema[str(col)] = entry
+    return schema
+
+
+def restore_dtypes(df, schema):
+    for col, entry in schema.items():
+        if col not in df.columns:
+            continue
+        dtype = entry['dtype']
+        if 'categories' in entry:
+            df[col] = pd.Categorical(df[col], categories=entry['categories'], ordered=entry['ordered'])
+            continue
+        try:
+            target = pd.api.types.pandas_dtype(dtype)
+            if isinstance(target, pd.DatetimeTZDtype):
+                df[col] = pd.to_datetime(df[col], utc=True).dt.tz_convert(target.tz).astype(target)
+            elif pd.api.types.is_datetime64_dtype(target):
+                df[col] = pd.to_datetime(df[col]).astype(target)
+            elif pd.api.types.is_timedelta64_dtype(target):
+                df[col] = pd.to_timedelta(df[col]).astype(target)
+            else:
+                df[col] = df[col].astype(target)
+        except (TypeError, ValueError):
+            # Mixed-type object columns are the reason for the fallback and stay as decoded
+            pass
+    return df
+
+
+def deserialize_dataframe(payload, storage_format='parquet', columns=None):
+    if payload is None:
+        return None
+
+    if storage_format == 'parquet':
+        return pd.read_parquet(io.BytesIO(payload), engine='pyarrow', columns=columns)
+
+    if storage_format == 'arrow':
+        return pd.read_feather(io.BytesIO(payload), columns=columns)
+
+    if storage_format == 'json':
+        if isinstance(payload, bytes):
+            payload = payload.decode('utf-8')
+        df = pd.read_json(io.StringIO(payload))
+        if columns is not None:
+            df = df[[col for col in columns if col in df.columns]]
+        return df
+
+    if storage_format == TYPED_JSON_FORMAT:
+        if isinstance(payload, bytes):
+            payload = payload.decode('utf-8')
+        document = json.loads(payload)
+        schema = document['schema']
+        if columns is not None:
+            schema = {col: schema[col] for col in columns if col in schema}
+        df = pd.DataFrame.from_records(document['records'], columns=list(document['schema']))[list(schema)]
+        return restore_dtypes(df, schema)
+
+    raise ValueError(f"Unsupported storage format '{storage_format}'")
+
+
+def encode_dataframe(df, storage_format=None):
+    storage_format = resolve_storage_format(storage_format)
+
+    if storage_format in BINARY_FORMATS:
+        try:
+            return serialize_dataframe(df, storage_format), storage_format
+        except (pyarrow.ArrowException, TypeError, ValueError):
+            # Mixed-type object columns cannot be written as Arrow; the JSON fallback records every
+            # column's dtype so loads restore them, and the payload's format says it fell back
+            storage_format = TYPED_JSON_FORMAT
+
+    return serialize_dataframe(df, storage_format), storage_format
+
+
+def _hash_series(series):
+    try:
+        values = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    except TypeError:
+        values = pd.util.hash_pandas_object(series.astype(str), index=False).to_numpy()
+    return np.ascontiguousarray(values).tobytes()
+
+
+def column_hashes(df):
+    hashes = {}
+    for col in df.columns:
+        digest = hashlib.sha256()
+        digest.update(f'{col}\x00{df[col].dtype}\x00'.encode('utf-8'))
+        digest.update(_hash_series(df[col]))
+        hashes[str(col)] = digest.hexdigest()
+    return hashes
+
+
+def combine_hashes(parts):
+    digest = hashlib.sha256()
+    for key, value in parts:
+        digest.update(f'{key}\x00{value}\x00'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def hash_dataframe(df):
+    return combine_hashes(column_hashes(df).items())
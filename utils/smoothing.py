@@ -0,0 +1,199 @@
+import numpy as np
+
+SMOOTHING_GRID = {
+    'alpha': (0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9),
+    'beta': (0.01, 0.05, 0.1, 0.2, 0.3),
+    'gamma': (0.05, 0.1, 0.2, 0.4)
+}
+
+Z_95 = 1.96
+
+
+def fill_gaps(values):
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    if not np.isnan(values).any():
+        return values
+
+    # Carry the last observation forward, and back-fill any leading gap
+    filled = values.copy()
+    n_steps = filled.shape[1]
+    index = np.where(np.isnan(filled), 0, np.arange(n_steps))
+    np.maximum.accumulate(index, axis=1, out=index)
+    filled = np.take_along_axis(filled, index, axis=1)
+    first_valid = np.argmax(~np.isnan(values), axis=1)
+    leading = np.arange(n_steps) < first_valid[:, None]
+    filled[leading] = np.broadcast_to(values[np.arange(len(values)), first_valid][:, None], filled.shape)[leading]
+    return filled
+
+
+def simple_exponential_smoothing(values, periods=30, alphas=None):
+    # scipy.signal pulls in scipy.optimize, so keep it off the startup path
+    from scipy.signal import lfilter
+
+    Y = fill_gaps(values)
+    alphas = np.asarray(SMOOTHING_GRID['alpha'] if alphas is None else np.atleast_1d(alphas), dtype=float)
+    n_series, n_steps = Y.shape
+
+    best_sse = np.full(n_series, np.inf)
+    best_alpha = np.zeros(n_series)
+    best_level = np.zeros(n_series)
+    for alpha in alphas:
+        # level_t = alpha * y_t + (1 - alpha) * level_{t-1}, started at level_0 = y_0
+        levels = lfilter([alpha], [1.0, alpha - 1.0], Y, axis=1, zi=((1 - alpha) * Y[:, :1]))[0]
+        errors = Y[:, 1:] - levels[:, :-1]
+        sse = np.einsum('ij,ij->i', errors, errors)
+        better = sse < best_sse
+        best_sse[better] = sse[better]
+        best_alpha[better] = alpha
+        best_level[better] = levels[better, -1]
+
+    zeros = np.zeros(n_series)
+    return _smoothing_output(best_level, zeros, np.zeros((1, n_series)), best_alpha, zeros, zeros,
+                             best_sse, n_steps - 1, n_steps, None, periods)
+
+
+def _holt_winters_pass(Y, alpha, beta, gamma, m, seasonal):
+    # Every series is fitted with every parameter combination at once: states are (series, grid)
+    n_series, n_steps = Y.shape
+    n_grid = alpha.shape[1]
+
+    if seasonal:
+        first_season = Y[:, :m]
+        # Seasonal states are stored season-major so each step touches one contiguous block
+        season = np.repeat((first_season - first_season.mean(axis=1, keepdims=True)).T[:, :, None], n_grid, axis=2)
+        level = np.repeat(first_season.mean(axis=1, keepdims=True), n_grid, axis=1)
+        trend = np.repeat(((Y[:, m:2 * m].mean(axis=1) - first_season.mean(axis=1)) / m)[:, None], n_grid, axis=1)
+        start = m
+    else:
+        season = np.zeros((1, n_series, n_grid))
+        level = np.repeat(Y[:, :1], n_grid, axis=1)
+        trend = np.repeat(Y[:, 1:2] - Y[:, :1], n_grid, axis=1)
+        start = 1
+
+    sse, level, trend = _holt_winters_recursion(Y, level, trend, season, alpha, beta, gamma, m, seasonal, start)
+    return {'sse': sse, 'level': level, 'trend': trend, 'season': season, 'start': start}
+
+
+def _holt_winters_recursion(Y, level, trend, season, alpha, beta, gamma, m, seasonal, start=0, offset=0):
+    # Seasonal states are updated in place; offset is the time index of Y's first column
+    sse = np.zeros(level.shape)
+    Yt = np.ascontiguousarray(Y.T.reshape(Y.shape[1], *([Y.shape[0]] + [1] * (level.ndim - 1))))
+    for t in range(start, Y.shape[1]):
+        y = Yt[t]
+        s_prev = season[(offset + t) % m]
+        error = y - s_prev - level - trend
+        sse += error * error
+        # level_t = level_{t-1} + trend_{t-1} + alpha * error, which is the usual update rearranged
+        new_level = level + trend + alpha * error
+        trend = trend + beta * (new_level - level - trend)
+        if seasonal:
+            s_prev += gamma * (y - new_level - s_prev)
+        level = new_level
+    return sse, level, trend
+
+
+def _smoothing_output(level, trend, season, alpha, beta, gamma, sse, n_errors, n_steps, season_length, periods):
+    m = season_length or 1
+    horizon = np.arange(1, periods + 1)
+    season_index = (n_steps + horizon - 1) % m
+
+    forecast = level[:, None] + horizon[None, :] * trend[:, None]
+    if season_length:
+        forecast = forecast + season.T[:, season_index]
+
+    # Prediction interval variances for additive Holt-Winters, written with ETS smoothing weights;
+    # with beta = gamma = 0 this reduces to simple exponential smoothing
+    a = alpha[:, None]
+    b = (alpha * beta)[:, None]
+    g = ((1 - alpha) * gamma)[:, None]
+    h = horizon[None, :]
+    k = (h - 1) // m if season_length else 0
+    variance_factor = 1 + (h - 1) * (a ** 2 + a * b * h + b ** 2 * h * (2 * h - 1) / 6)
+    if season_length:
+        variance_factor = variance_factor + g * k * (2 * a + g + b * m * (k + 1))
+    sigma = np.sqrt(sse / max(n_errors, 1))[:, None]
+    spread = Z_95 * sigma * np.sqrt(variance_factor)
+
+    return {
+        'forecast': forecast,
+        'lower_bound': forecast - spread,
+        'upper_bound': forecast + spread,
+        'alpha': alpha,
+        'beta': beta,
+        'gamma': gamma if season_length else np.full(len(alpha), np.nan),
+        'season_length': season_length,
+        'sse': sse,
+        'level': level,
+        'trend': trend,
+        'season': season,
+        'n_errors': n_errors,
+        'n_steps': n_steps
+    }
+
+
+def update_smoothing(values, state, periods=30):
+    # Continue a fitted model through newly appended observations with its parameters held fixed
+    Y = fill_gaps(values)
+    n_series, n_new = Y.shape
+    season_length = state.get('season_length')
+    m = season_length or 1
+
+    alpha = np.asarray(state['alpha'], dtype=float)
+    beta = np.asarray(state['beta'], dtype=float)
+    gamma = np.nan_to_num(np.asarray(state['gamma'], dtype=float))
+    season = np.array(state['season'], dtype=float).reshape(m, n_series)
+
+    new_sse, level, trend = _holt_winters_recursion(
+        Y, np.asarray(state['level'], dtype=float), np.asarray(state['trend'], dtype=float), season,
+        alpha, beta, gamma, m, bool(season_length), offset=state['n_steps']
+    )
+    output = _smoothing_output(level, trend, season, alpha, beta, gamma, np.asarray(state['sse']) + new_sse,
+                               state['n_errors'] + n_new, state['n_steps'] + n_new, season_length, periods)
+    output['new_sse'] = new_sse
+    return output
+
+
+def _parameter_grid(n_series, alphas, betas, gammas):
+    grid = np.array(np.meshgrid(alphas, betas, gammas, indexing='ij'), dtype=float).reshape(3, -1)
+    return [np.repeat(row[None, :], n_series, axis=0) for row in grid]
+
+
+def _refine_grid(best, scales=(0.5, 1.0, 1.6)):
+    # Per-series neighbourhood around the coarse optimum, kept inside (0, 1)
+    values = [np.clip(param[:, None] * np.asarray(scales)[None, :], 0.01, 0.99) for param in best]
+    n_series = values[0].shape[0]
+    combos = np.array(np.meshgrid(*[np.arange(len(scales))] * 3, indexing='ij')).reshape(3, -1)
+    return [values[i][np.arange(n_series)[:, None], combos[i][None, :]] for i in range(3)]
+
+
+def holt_winters(values, periods=30, season_length=None, alphas=None, betas=None, gammas=None):
+    Y = fill_gaps(values)
+    n_series, n_steps = Y.shape
+    seasonal = bool(season_length) and season_length > 1 and n_steps >= 2 * season_length
+    m = season_length if seasonal else 1
+    rows = np.arange(n_series)
+
+    if alphas is None and betas is None and gammas is None:
+        # Coarse shared grid first, then a small per-series grid around each series' best point
+        coarse = _parameter_grid(n_series, SMOOTHING_GRID['alpha'][1::2], SMOOTHING_GRID['beta'][::2],
+                                 SMOOTHING_GRID['gamma'][::2] if seasonal else (0.0,))
+        fit = _holt_winters_pass(Y, *coarse, m, seasonal)
+        best = np.argmin(fit['sse'], axis=1)
+        candidates = _refine_grid([param[rows, best] for param in coarse])
+        if not seasonal:
+            candidates[2] = np.zeros_like(candidates[2])
+    else:
+        candidates = _parameter_grid(
+            n_series,
+            SMOOTHING_GRID['alpha'] if alphas is None else np.atleast_1d(alphas),
+            SMOOTHING_GRID['beta'] if betas is None else np.atleast_1d(betas),
+            (SMOOTHING_GRID['gamma'] if gammas is None else np.atleast_1d(gammas)) if seasonal else (0.0,)
+        )
+
+    fit = _holt_winters_pass(Y, *candidates, m, seasonal)
+    best = np.argmin(fit['sse'], axis=1)
+    alpha, beta, gamma = (param[rows, best] for param in candidates)
+
+    return _smoothing_output(fit['level'][rows, best], fit['trend'][rows, best], fit['season'][:, rows, best],
+                             alpha, beta, gamma, fit['sse'][rows, best], n_steps - fit['start'], n_steps,
+                             m if seasonal else None, periods)